@@ -1,11 +1,14 @@
 from fastapi import Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.core.dependencies import get_db, get_current_user
+from app.core.dependencies import get_principal
+from app.auth.principal import Principal
 from app.models.user import User
 from app.models.role import UserRole, RolePermission
+from app.core.tracing import span, traced
 
 class PermissionService:
     @staticmethod
+    @traced("PermissionService.check_permission")
     def check_permission(user_id: int, permission_code: str, db: Session):
         """Проверка наличия разрешения у пользователя"""
         user_roles = db.query(UserRole).filter(
@@ -31,15 +34,14 @@ class PermissionService:
         return permission_exists is not None
 
 def require_permission(permission_code: str):
-    """Декоратор для проверки разрешений"""
-    def permission_dependency(
-        current_user: User = Depends(get_current_user),
-        db: Session = Depends(get_db)
-    ):
-        if not PermissionService.check_permission(current_user.id, permission_code, db):
+    """Декоратор для проверки разрешений (по принципалу запроса, без запросов к БД)"""
+    def permission_dependency(principal: Principal = Depends(get_principal)):
+        with span("authz.require_permission", {"permission": permission_code}):
+            allowed = principal.has_permission(permission_code)
+        if not allowed:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail=f"Required permission: {permission_code}"
             )
-        return current_user
+        return principal
     return permission_dependency
\ No newline at end of file
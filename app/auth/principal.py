@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Dict, FrozenSet, Iterable, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.etag import BUMPED_SCOPES_KEY, POLICY_SCOPE, user_scope
+from app.core.metrics import registry
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Аутентифицированный пользователь запроса.
+
+    Неизменяемый снимок нужных колонок без привязки к сессии SQLAlchemy:
+    безопасно разделяется между потоками и кэшируется между запросами.
+    Обработчики, изменяющие пользователя, загружают ORM-объект по id.
+    """
+    id: int
+    username: str
+    email: str
+    birthday: date
+    is_active: bool
+    token_id: int
+    token_expires_at: datetime
+    role_ids: FrozenSet[int] = frozenset()
+    permissions: FrozenSet[str] = frozenset()
+
+    def has_permission(self, permission_code: str) -> bool:
+        return permission_code in self.permissions
+
+
+class PrincipalCache:
+    """
+    Потокобезопасный TTL-кэш принципалов по хешу access token.
+
+    Записи живут не дольше PRINCIPAL_CACHE_TTL и не дольше самого токена;
+    при отзыве токенов и изменении политики записи сбрасываются - но только
+    в процессе, выполнившем коммит. Другие воркеры и процессы (policy_loader,
+    seed_data) кэш не сбрасывают: там отозванный токен или снятая роль
+    действуют еще до TTL секунд. Поэтому по умолчанию кэш отключен (TTL = 0);
+    включать его стоит для одного процесса или при допустимом окне устаревания.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token_hash: str) -> Optional[Principal]:
+        if self.ttl <= 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._remove(token_hash)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token_hash: str, principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        token_ttl = (principal.token_expires_at - datetime.utcnow()).total_seconds()
+        expires = time.monotonic() + min(self.ttl, token_ttl)
+        with self._lock:
+            self._remove(token_hash)
+            self._entries[token_hash] = (expires, principal)
+            self._by_user.setdefault(principal.id, set()).add(token_hash)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> None:
+        """Сброс записей пользователей (отзыв токенов, смена пароля или ролей)"""
+        with self._lock:
+            for user_id in user_ids:
+                for token_hash in list(self._by_user.get(user_id, ())):
+                    self._remove(token_hash)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token_hash: str) -> None:
+        entry = self._entries.pop(token_hash, None)
+        if entry is not None:
+            hashes = self._by_user.get(entry[1].id)
+            if hashes is not None:
+                hashes.discard(token_hash)
+                if not hashes:
+                    del self._by_user[entry[1].id]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_TTL, settings.PRINCIPAL_CACHE_SIZE)
+
+registry.callback(
+    "cache_requests_total", "Обращения к кэшам по результату",
+    lambda: {("principal", "hit"): principal_cache.hits, ("principal", "miss"): principal_cache.misses},
+    ("cache", "result"), kind="counter"
+)
+registry.callback(
+    "cache_hit_ratio", "Доля попаданий в кэш",
+    lambda: {("principal",): principal_cache.hit_ratio}, ("cache",)
+)
+registry.callback(
+    "cache_entries", "Число записей в кэше",
+    lambda: {("principal",): len(principal_cache)}, ("cache",)
+)
+
+
+def invalidate_users_on_commit(db: Session, user_ids: Iterable[int]) -> None:
+    """Сброс записей пользователей после коммита текущей транзакции (например, при отзыве токенов)"""
+    db.info.setdefault(BUMPED_SCOPES_KEY, set()).update(user_scope(user_id) for user_id in user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    # Версии, увеличенные в транзакции (app.core.etag), сбрасывают кэш только после коммита,
+    # чтобы параллельный запрос не закэшировал данные до их фиксации
+    scopes = session.info.pop(BUMPED_SCOPES_KEY, None)
+    if not scopes:
+        return
+    if POLICY_SCOPE in scopes:
+        principal_cache.clear()
+        return
+    principal_cache.invalidate_users(
+        int(scope.split(":", 1)[1]) for scope in scopes if scope.startswith("user:")
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(BUMPED_SCOPES_KEY, None)
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import io
+
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request, Response, UploadFile, File, Query
 from sqlalchemy.orm import Session
 
-from app.core.dependencies import get_db, get_auth_service, get_current_user
+from app.core.dependencies import get_db, get_auth_service, get_principal, get_current_user, get_current_user_model
+from app.core.etag import user_scope, conditional_response
 from app.schemas.auth import (
     LoginRequest, 
     RegisterRequest, 
     UserResponse, 
     TokenResponse,
-    MessageResponse
+    MessageResponse,
+    ImportReport
 )
 from app.auth.service import AuthService
+from app.auth.principal import Principal
+from app.auth.permission_service import require_permission
+from app.core.config import settings
+from app.core.group_commit import GroupCommitOverloaded
 from app.models.user import User
 
 router = APIRouter()
@@ -20,7 +28,7 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     summary="Регистрация пользователя"
 )
-async def register(
+def register(
     register_data: RegisterRequest,
     auth_service: AuthService = Depends(get_auth_service)
 ):
@@ -47,7 +55,7 @@ async def register(
     response_model=TokenResponse,
     summary="Авторизация пользователя"
 )
-async def login(
+def login(
     login_data: LoginRequest,
     auth_service: AuthService = Depends(get_auth_service)
 ):
@@ -59,6 +67,8 @@ async def login(
     
     Возвращает пару токенов (access + refresh).
     """
+    # Синхронный обработчик выполняется в пуле потоков: argon2 и ожидание
+    # группового коммита не блокируют цикл событий
     try:
         user = auth_service.authenticate_user(login_data)
         tokens = auth_service.create_tokens(user)
@@ -68,20 +78,34 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e)
         )
+    except GroupCommitOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service overloaded, retry later",
+            headers={"Retry-After": "1"}
+        )
 
 @router.get(
     "/me",
     response_model=UserResponse,
     summary="Информация о текущем пользователе"
 )
-async def get_me(
-    current_user: User = Depends(get_current_user)
+def get_me(
+    request: Request,
+    response: Response,
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db)
 ):
     """
     Получение информации об авторизованном пользователе.
     
     Требуется передача access token в заголовке Authorization.
+    Поддерживается условный GET (ETag / If-None-Match) по версии пользователя.
     """
+    not_modified = conditional_response(request, response, db, user_scope(current_user.id))
+    if not_modified:
+        return not_modified
+
     return UserResponse(
         id=current_user.id,
         username=current_user.username,
@@ -94,9 +118,8 @@ async def get_me(
     response_model=MessageResponse,
     summary="Выход из системы"
 )
-async def logout(
-    token: str = Depends(get_current_user),
-    current_user: User = Depends(get_current_user),
+def logout(
+    principal: Principal = Depends(get_principal),
     auth_service: AuthService = Depends(get_auth_service)
 ):
     """
@@ -104,15 +127,15 @@ async def logout(
     
     Отзывает используемый access token.
     """
-    auth_service.logout(token, current_user)
+    auth_service.logout(principal)
     return MessageResponse(message="Успешный выход из системы")
 
 @router.get(
     "/tokens",
     summary="Список активных токенов пользователя"
 )
-async def get_tokens(
-    current_user: User = Depends(get_current_user),
+def get_tokens(
+    current_user: Principal = Depends(get_current_user),
     auth_service: AuthService = Depends(get_auth_service)
 ):
     """
@@ -128,8 +151,8 @@ async def get_tokens(
     response_model=MessageResponse,
     summary="Выход из всех устройств"
 )
-async def logout_all(
-    current_user: User = Depends(get_current_user),
+def logout_all(
+    current_user: Principal = Depends(get_current_user),
     auth_service: AuthService = Depends(get_auth_service)
 ):
     """
@@ -137,7 +160,7 @@ async def logout_all(
     
     Отзывает все активные токены пользователя.
     """
-    auth_service.logout_all(current_user)
+    auth_service.logout_all(current_user.id)
     return MessageResponse(message="Все токены успешно отозваны")
 
 @router.post(
@@ -145,7 +168,7 @@ async def logout_all(
     response_model=TokenResponse,
     summary="Обновление токенов"
 )
-async def refresh_tokens(
+def refresh_tokens(
     refresh_token: str = Body(..., embed=True),
     auth_service: AuthService = Depends(get_auth_service)
 ):
@@ -170,10 +193,10 @@ async def refresh_tokens(
     response_model=MessageResponse,
     summary="Смена пароля"
 )
-async def change_password(
+def change_password(
     current_password: str = Body(..., embed=True, alias="currentPassword"),
     new_password: str = Body(..., embed=True, alias="newPassword"),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     auth_service: AuthService = Depends(get_auth_service)
 ):
     """
@@ -191,4 +214,35 @@ async def change_password(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+@router.post(
+    "/import",
+    response_model=ImportReport,
+    summary="Массовый импорт пользователей"
+)
+def import_users_file(
+    file: UploadFile = File(...),
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    current_user: Principal = Depends(require_permission("create-user")),
+    db: Session = Depends(get_db)
+):
+    """
+    Массовый импорт пользователей из CSV или NDJSON.
+    
+    Колонки: username, email, birthday и password либо готовый argon2-хеш password_hash.
+    Строки проверяются по правилам регистрации, дубликаты пропускаются,
+    вставка идет пачками. Пароли хешируются в потоке запроса: пул процессов
+    на каждый запрос - это fork многопоточного воркера и захват лишних ядер
+    (IMPORT_WORKERS > 0 включает его явно; для больших файлов - CLI).
+    """
+    # Импортируется по требованию: модуль не нужен на горячем пути и при старте
+    from app.migrations.user_import import import_users
+
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    return import_users(
+        db.get_bind(), stream, format,
+        batch_size=batch_size,
+        workers=settings.IMPORT_WORKERS
+    )
\ No newline at end of file
@@ -1,41 +1,71 @@
+import uuid
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import jwt  # Используем PyJWT вместо python-jose
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, func, select, insert, update
+from sqlalchemy.exc import IntegrityError
 
-from app.models.user import User, Token
+from app.models.user import User, Token, RefreshFamily
+from app.models.role import UserRole, Role, RolePermission, Permission
+from app.auth.principal import Principal, principal_cache, invalidate_users_on_commit
+from app.auth.session_store import SessionStore, SqlSessionStore, create_session_store
 from app.schemas.auth import LoginRequest, RegisterRequest, UserResponse, TokenResponse
 from app.core.security import (
     verify_password, 
     get_password_hash, 
     create_access_token, 
     create_refresh_token,
-    verify_token
+    verify_token,
+    hash_token,
+    create_opaque_token,
+    opaque_token_type
 )
 from app.core.config import settings
+from app.core.database import release_connection
+from app.core.unit_of_work import unit_of_work, in_unit_of_work, on_commit
+from app.core.group_commit import GroupCommitWriter
+from app.core.etag import bump_version, user_scope
+from app.core.query_counter import QUERY_TAG_OPTION
+from app.core.tracing import traced
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        token_writer: Optional[GroupCommitWriter] = None,
+        session_store: Optional[SessionStore] = None
+    ):
         self.db = db
+        # Писатель группового коммита для вставки токенов при входе (None - обычный коммит)
+        self.token_writer = token_writer
+        # Хранилище токенов (по умолчанию - по настройке SESSION_STORE)
+        self.sessions = session_store or create_session_store(db)
 
-    def register_user(self, register_data: RegisterRequest) -> UserResponse:
-        """Регистрация нового пользователя"""
+    def _check_user_unique(self, register_data: RegisterRequest) -> None:
+        """Проверка уникальности username (без учета регистра) и email"""
         
-        # Проверяем уникальность username (без учета регистра)
         existing_user = self.db.query(User).filter(
-            User.username.ilike(register_data.username)
+            func.lower(User.username) == register_data.username.lower()
         ).first()
         if existing_user:
             raise ValueError("Пользователь с таким именем уже существует")
 
-        # Проверяем уникальность email
         existing_email = self.db.query(User).filter(
             User.email == register_data.email
         ).first()
         if existing_email:
             raise ValueError("Пользователь с таким email уже существует")
 
+    @traced("AuthService.register_user")
+    def register_user(self, register_data: RegisterRequest) -> UserResponse:
+        """Регистрация нового пользователя"""
+        
+        self._check_user_unique(register_data)
+
+        # Хеширование argon2 выполняется без удержания соединения
+        release_connection(self.db)
+
         # Создаем нового пользователя
         user = User(
             username=register_data.username,
@@ -44,9 +74,14 @@ class AuthService:
             birthday=register_data.birthday
         )
         
-        self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
+        try:
+            with unit_of_work(self.db):
+                self.db.add(user)
+        except IntegrityError:
+            # Параллельная регистрация успела между проверкой и вставкой
+            # (уникальные индексы username, lower(username), email)
+            self._check_user_unique(register_data)
+            raise ValueError("Пользователь с таким именем или email уже существует")
         
         return UserResponse(
             id=user.id,
@@ -55,17 +90,19 @@ class AuthService:
             birthday=user.birthday
         )
 
+    @traced("AuthService.authenticate_user")
     def authenticate_user(self, login_data: LoginRequest) -> User:
         """Аутентификация пользователя"""
         
         # Ищем пользователя (без учета регистра)
         user = self.db.query(User).filter(
-            User.username.ilike(login_data.username)
+            func.lower(User.username) == login_data.username.lower()
         ).first()
         
         if not user:
             raise ValueError("Неверное имя пользователя или пароль")
         
+        release_connection(self.db)
         if not verify_password(login_data.password, user.password_hash):
             raise ValueError("Неверное имя пользователя или пароль")
         
@@ -74,172 +111,316 @@ class AuthService:
         
         return user
 
-    def create_tokens(self, user: User) -> TokenResponse:
-        """Создание пары токенов (access + refresh)"""
-        
-        # Проверяем количество активных токенов
-        active_tokens_count = self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.is_active == True,
-                Token.expires_at > datetime.utcnow()
-            )
-        ).count()
-        
-        if active_tokens_count >= settings.MAX_ACTIVE_TOKENS:
-            raise ValueError(f"Превышено максимальное количество активных токенов: {settings.MAX_ACTIVE_TOKENS}")
+    def _issue_tokens(self, user: User, family_id: str, seq: int) -> Tuple[TokenResponse, List[Dict[str, Any]]]:
+        """
+        Формирование пары токенов и строк таблицы tokens (без обращения к БД).
 
-        # Создаем токены
-        token_data = {"sub": str(user.id), "username": user.username}
-        access_token = create_access_token(token_data)
-        refresh_token = create_refresh_token(token_data)
-        
-        # Сохраняем хеши токенов в БД
-        access_token_hash = get_password_hash(access_token)
-        refresh_token_hash = get_password_hash(refresh_token)
-        
-        access_token_expires = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        refresh_token_expires = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-        
-        # Сохраняем access token
-        access_token_record = Token(
-            user_id=user.id,
-            token_hash=access_token_hash,
-            expires_at=access_token_expires,
-            token_type="access"
-        )
-        self.db.add(access_token_record)
-        
-        # Сохраняем refresh token
-        refresh_token_record = Token(
-            user_id=user.id,
-            token_hash=refresh_token_hash,
-            expires_at=refresh_token_expires,
-            token_type="refresh"
-        )
-        self.db.add(refresh_token_record)
-        
-        self.db.commit()
-        
-        return TokenResponse(
-            access_token=access_token,
-            refresh_token=refresh_token
-        )
+        JWT refresh token содержит семейство (fam) и номер ротации (seq).
+        """
+        
+        if settings.TOKEN_MODE == "opaque":
+            access_token = create_opaque_token("access")
+            refresh_token = create_opaque_token("refresh")
+        else:
+            token_data = {"sub": str(user.id), "username": user.username}
+            access_token = create_access_token(token_data)
+            refresh_token = create_refresh_token({**token_data, "fam": family_id, "seq": seq})
+        
+        now = datetime.utcnow()
+        rows = [
+            {
+                "user_id": user.id,
+                "token_hash": hash_token(access_token),
+                "expires_at": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+                "token_type": "access",
+                "family_id": family_id
+            },
+            {
+                "user_id": user.id,
+                "token_hash": hash_token(refresh_token),
+                "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+                "token_type": "refresh",
+                "family_id": family_id
+            },
+        ]
+        return TokenResponse(access_token=access_token, refresh_token=refresh_token), rows
 
-    def get_current_user(self, token: str) -> User:
-        """Получение текущего пользователя по токену"""
+    def _parse_token(self, token: str, token_type: str, invalid_message: str) -> Optional[Dict[str, Any]]:
+        """
+        Проверка типа токена; возвращает claims JWT.
+
+        Для непрозрачного токена тип определяется по префиксу, а владелец
+        известен только из БД, поэтому возвращается None. Токены обоих видов
+        принимаются независимо от TOKEN_MODE (переключение режима без разлогина).
+        """
+        opaque_type = opaque_token_type(token)
+        if opaque_type is not None:
+            if opaque_type != token_type:
+                raise ValueError(f"Требуется {token_type} token")
+            return None
         
         payload = verify_token(token)
         if not payload:
-            raise ValueError("Невалидный токен")
+            raise ValueError(invalid_message)
         
-        if payload.get("type") != "access":
-            raise ValueError("Требуется access token")
+        if payload.get("type") != token_type:
+            raise ValueError(f"Требуется {token_type} token")
         
-        user_id = int(payload.get("sub"))
-        user = self.db.query(User).filter(User.id == user_id).first()
+        return payload
+
+    def _check_token_limit(self, user: User, replacing: int = 0) -> None:
+        """Проверка количества активных токенов (replacing - сколько из них заменяет операция)"""
         
-        if not user:
-            raise ValueError("Пользователь не найден")
+        active_tokens_count = self.sessions.count_active(user.id) - replacing
         
-        if not user.is_active:
-            raise ValueError("Учетная запись заблокирована")
+        if active_tokens_count >= settings.MAX_ACTIVE_TOKENS:
+            raise ValueError(f"Превышено максимальное количество активных токенов: {settings.MAX_ACTIVE_TOKENS}")
+
+    def _write_sessions(self, action, *args) -> None:
+        """
+        Изменение хранилища токенов в составе текущей единицы работы.
+
+        SQL-хранилище пишет в транзакцию сессии; внешнее (memory, kv) не откатывается
+        вместе с ней, поэтому изменение применяется только после коммита.
+        """
+        if isinstance(self.sessions, SqlSessionStore):
+            action(*args)
+        else:
+            on_commit(self.db, lambda: action(*args))
+
+    @traced("AuthService.create_tokens")
+    def create_tokens(self, user: User) -> TokenResponse:
+        """Создание пары токенов (access + refresh)"""
         
-        # Проверяем, что токен активен в БД
-        token_hash = get_password_hash(token)
-        token_record = self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.token_hash == token_hash,
-                Token.is_active == True,
-                Token.expires_at > datetime.utcnow(),
-                Token.token_type == "access"
+        # Каждый вход открывает новое семейство refresh-токенов.
+        # Токены формируются до начала транзакции: блокировка записи SQLite
+        # удерживается только на время проверки лимита и вставки
+        family_id = uuid.uuid4().hex
+        tokens, rows = self._issue_tokens(user, family_id, 0)
+        family = {"id": family_id, "user_id": user.id, "seq": 0}
+        
+        sql_store = isinstance(self.sessions, SqlSessionStore)
+        if sql_store and self.token_writer is not None and not in_unit_of_work(self.db):
+            # Групповой коммит: вставка уходит в общую транзакцию с параллельными входами,
+            # ответ возвращается после коммита пачки (не дольше GROUP_COMMIT_WAIT_TIMEOUT).
+            # Лимит проверяется вне транзакции пачки, поэтому он приблизительный:
+            # одновременные входы одного пользователя могут превысить MAX_ACTIVE_TOKENS
+            self._check_token_limit(user)
+            release_connection(self.db)
+            self.token_writer.write_many(
+                [(RefreshFamily.__table__, [family]), (Token.__table__, rows)],
+                timeout=settings.GROUP_COMMIT_WAIT_TIMEOUT
             )
-        ).first()
-        
-        if not token_record:
-            raise ValueError("Токен отозван или истек")
+            return tokens
         
-        return user
+        with unit_of_work(self.db):
+            self._check_token_limit(user)
+            self.db.execute(insert(RefreshFamily.__table__), [family])
+            self._write_sessions(self.sessions.create, rows)
+        return tokens
 
-    def logout(self, token: str, user: User) -> None:
-        """Выход из системы (отзыв токена)"""
-        
-        token_hash = get_password_hash(token)
-        token_record = self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.token_hash == token_hash,
-                Token.is_active == True
+    @traced("AuthService.get_principal")
+    def get_principal(self, token: str) -> Principal:
+        """
+        Аутентификация запроса по access token.
+
+        Пользователь, запись токена, активные роли и коды разрешений
+        загружаются одним Core-запросом (без ORM-объектов) по индексу хеша
+        токена и кэшируются по нему же: повторная проверка - SHA-256 и поиск в словаре.
+        Если токены хранятся вне основной БД, запись токена берется из хранилища,
+        а запрос загружает только пользователя и его права.
+        """
+        
+        payload = self._parse_token(token, "access", "Невалидный токен")
+        user_id = int(payload["sub"]) if payload else None
+        
+        token_hash = hash_token(token)
+        principal = principal_cache.get(token_hash)
+        if principal is not None:
+            return principal
+        
+        users, tokens = User.__table__, Token.__table__
+        user_roles, roles = UserRole.__table__, Role.__table__
+        role_permissions, permissions = RolePermission.__table__, Permission.__table__
+        if isinstance(self.sessions, SqlSessionStore):
+            record = None
+            token_columns = (tokens.c.id.label("token_id"), tokens.c.expires_at)
+            principal_from = users.join(tokens, and_(
+                tokens.c.user_id == users.c.id,
+                tokens.c.token_hash == token_hash,
+                tokens.c.is_active == True,
+                tokens.c.expires_at > datetime.utcnow(),
+                tokens.c.token_type == "access"
+            ))
+        else:
+            record = self.sessions.lookup(token_hash)
+            if record is None or not record.is_valid() or record.token_type != "access":
+                raise ValueError("Токен отозван или истек")
+            user_id = record.user_id
+            token_columns = ()
+            principal_from = users
+        query = select(
+            users.c.id, users.c.username, users.c.email, users.c.birthday, users.c.is_active,
+            *token_columns,
+            roles.c.id.label("role_id"), permissions.c.code.label("permission_code")
+        ).select_from(
+            principal_from.outerjoin(
+                user_roles, and_(user_roles.c.user_id == users.c.id, user_roles.c.is_active == True)
+            ).outerjoin(
+                roles, and_(roles.c.id == user_roles.c.role_id, roles.c.is_active == True)
+            ).outerjoin(
+                role_permissions, and_(
+                    role_permissions.c.role_id == roles.c.id, role_permissions.c.is_active == True
+                )
+            ).outerjoin(
+                permissions, and_(
+                    permissions.c.id == role_permissions.c.permission_id, permissions.c.is_active == True
+                )
             )
-        ).first()
+        ).execution_options(**{QUERY_TAG_OPTION: "auth"})
+        if user_id is not None:
+            query = query.where(users.c.id == user_id)
+        rows = self.db.execute(query).all()
+        
+        # Аутентификация только читает БД: соединение не удерживается до конца запроса
+        release_connection(self.db)
+        
+        if not rows:
+            raise ValueError("Токен отозван или истек")
+        
+        row = rows[0]
+        if not row.is_active:
+            raise ValueError("Учетная запись заблокирована")
         
-        if token_record:
-            token_record.is_active = False
-            self.db.commit()
+        principal = Principal(
+            id=row.id,
+            username=row.username,
+            email=row.email,
+            birthday=row.birthday,
+            is_active=row.is_active,
+            token_id=record.id if record else row.token_id,
+            token_expires_at=record.expires_at if record else row.expires_at,
+            role_ids=frozenset(r.role_id for r in rows if r.role_id is not None),
+            permissions=frozenset(r.permission_code for r in rows if r.permission_code is not None)
+        )
+        principal_cache.put(token_hash, principal)
+        return principal
 
-    def logout_all(self, user: User) -> None:
-        """Выход из всех устройств (отзыв всех токенов)"""
+    def get_current_user(self, token: str) -> User:
+        """Получение ORM-объекта текущего пользователя по токену (для изменения пользователя)"""
+        return self.db.get(User, self.get_principal(token).id)
+
+    @traced("AuthService.logout")
+    def logout(self, principal: Principal) -> None:
+        """Выход из системы (отзыв токена текущего запроса по его id)"""
         
-        self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.is_active == True
-            )
-        ).update({"is_active": False})
-        self.db.commit()
+        with unit_of_work(self.db):
+            self.sessions.revoke(principal.token_id)
+            invalidate_users_on_commit(self.db, [principal.id])
+
+    @traced("AuthService.logout_all")
+    def logout_all(self, user_id: int) -> None:
+        """Выход из всех устройств (отзыв всех токенов и семейств)"""
+        
+        with unit_of_work(self.db):
+            self.sessions.revoke_all(user_id)
+            self.db.query(RefreshFamily).filter(
+                RefreshFamily.user_id == user_id,
+                RefreshFamily.is_active == True
+            ).update({"is_active": False, "revoked_at": datetime.utcnow()})
+            invalidate_users_on_commit(self.db, [user_id])
 
+    @traced("AuthService.revoke_family")
+    def revoke_family(self, user_id: int, family_id: str) -> None:
+        """Отзыв одного семейства (сессии входа): запись семейства и все его токены"""
+        
+        with unit_of_work(self.db):
+            self.db.query(RefreshFamily).filter(
+                RefreshFamily.id == family_id,
+                RefreshFamily.is_active == True
+            ).update({"is_active": False, "revoked_at": datetime.utcnow()})
+            self.sessions.revoke_family(family_id)
+            invalidate_users_on_commit(self.db, [user_id])
+
+    @traced("AuthService.refresh_tokens")
     def refresh_tokens(self, refresh_token: str) -> TokenResponse:
-        """Обновление пары токенов"""
-        
-        payload = verify_token(refresh_token)
-        if not payload:
-            raise ValueError("Невалидный refresh token")
-        
-        if payload.get("type") != "refresh":
-            raise ValueError("Требуется refresh token")
+        """
+        Обновление пары токенов с ротацией внутри семейства.
+
+        Ротация - условный UPDATE одной строки refresh_families: номер seq
+        должен совпасть с номером из токена. Несовпадение означает повторное
+        использование старого токена; отзывается только это семейство,
+        остальные сессии пользователя не затрагиваются.
+        """
+        
+        payload = self._parse_token(refresh_token, "refresh", "Невалидный refresh token")
+        if payload is not None and payload.get("fam"):
+            user_id, family_id, seq = int(payload["sub"]), payload["fam"], int(payload.get("seq", 0))
+            record = None
+        else:
+            # Непрозрачный токен (или JWT без семейства): запись токена по хешу
+            record = self.sessions.lookup(hash_token(refresh_token))
+            if (record is None or record.token_type != "refresh" or record.family_id is None
+                    or record.expires_at <= datetime.utcnow()):
+                raise ValueError("Refresh token невалиден или уже использован")
+            user_id, family_id, seq = record.user_id, record.family_id, None
         
-        user_id = int(payload.get("sub"))
         user = self.db.query(User).filter(User.id == user_id).first()
         
         if not user or not user.is_active:
             raise ValueError("Пользователь не найден или заблокирован")
         
-        # Проверяем валидность refresh token в БД
-        refresh_token_hash = get_password_hash(refresh_token)
-        refresh_token_record = self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.token_hash == refresh_token_hash,
-                Token.is_active == True,
-                Token.expires_at > datetime.utcnow(),
-                Token.token_type == "refresh"
-            )
-        ).first()
-        
-        if not refresh_token_record:
-            # Если refresh token невалиден, отзываем все токены пользователя
-            self.logout_all(user)
+        # Ротация и выдача новой пары - одна транзакция. Лимит проверяется до изменений
+        # хранилища (старый refresh token заменяется новым), а внешнее хранилище
+        # меняется только после коммита: ошибка не оставляет сессию без refresh token
+        tokens, rows = self._issue_tokens(user, family_id, (seq or 0) + 1)
+        families = RefreshFamily.__table__
+        revoked_id = None
+        try:
+            with unit_of_work(self.db):
+                if record is None:
+                    rotated = self.db.execute(
+                        update(families).where(
+                            families.c.id == family_id,
+                            families.c.user_id == user.id,
+                            families.c.seq == seq,
+                            families.c.is_active == True
+                        ).values(seq=families.c.seq + 1)
+                    ).rowcount
+                    if rotated:
+                        self._check_token_limit(user, replacing=1)
+                        self._write_sessions(self.sessions.revoke_family, family_id, "refresh")
+                else:
+                    # Номер ротации непрозрачного токена - его активность: использованный токен уже отозван.
+                    # Отзыв - сравнение с обменом, поэтому выполняется сразу и компенсируется при откате
+                    if record.is_active:
+                        self._check_token_limit(user, replacing=1)
+                    rotated = self.sessions.revoke(record.id)
+                    if rotated:
+                        revoked_id = record.id
+                        rotated = self.db.execute(
+                            update(families).where(
+                                families.c.id == family_id,
+                                families.c.is_active == True
+                            ).values(seq=families.c.seq + 1)
+                        ).rowcount
+                if rotated:
+                    self._write_sessions(self.sessions.create, rows)
+        except Exception:
+            if revoked_id is not None and not isinstance(self.sessions, SqlSessionStore):
+                self.sessions.restore(revoked_id)
+            raise
+        
+        if not rotated:
+            # Повторное использование (или отозванное семейство): отзываем только эту сессию
+            self.revoke_family(user.id, family_id)
             raise ValueError("Refresh token невалиден или уже использован")
-        
-        # Отзываем использованный refresh token
-        refresh_token_record.is_active = False
-        self.db.commit()
-        
-        # Создаем новую пару токенов
-        return self.create_tokens(user)
+        return tokens
 
+    @traced("AuthService.get_user_tokens")
     def get_user_tokens(self, user: User) -> List[Dict[str, Any]]:
         """Получение списка активных токенов пользователя"""
         
-        tokens = self.db.query(Token).filter(
-            and_(
-                Token.user_id == user.id,
-                Token.is_active == True,
-                Token.expires_at > datetime.utcnow()
-            )
-        ).all()
-        
         return [
             {
                 "id": token.id,
@@ -248,12 +429,14 @@ class AuthService:
                 "expires_at": token.expires_at,
                 "is_active": token.is_active
             }
-            for token in tokens
+            for token in self.sessions.list(user.id)
         ]
 
+    @traced("AuthService.change_password")
     def change_password(self, user: User, current_password: str, new_password: str) -> None:
         """Смена пароля пользователя"""
         
+        release_connection(self.db)
         if not verify_password(current_password, user.password_hash):
             raise ValueError("Текущий пароль неверен")
         
@@ -269,8 +452,10 @@ class AuthService:
         if not any(char.islower() for char in new_password):
             raise ValueError("Должен содержать хотя бы одну строчную букву")
         
-        user.password_hash = get_password_hash(new_password)
-        self.db.commit()
+        password_hash = get_password_hash(new_password)
         
-        # Отзываем все токены пользователя при смене пароля
-        self.logout_all(user)
\ No newline at end of file
+        # Новый хеш, версия пользователя и отзыв всех токенов - одна транзакция
+        with unit_of_work(self.db):
+            user.password_hash = password_hash
+            bump_version(self.db, user_scope(user.id))
+            self.logout_all(user.id)
\ No newline at end of file
@@ -0,0 +1,482 @@
+"""
+Хранилища состояния токенов (сессий)
+
+SessionStore - интерфейс, через который AuthService создает, ищет и отзывает
+токены. Реализации:
+
+- SqlSessionStore - таблица tokens основной БД (участвует в транзакции сессии);
+- MemorySessionStore - словари в памяти процесса с индексом истечения
+  на основе timing wheel (только для одного процесса: воркеры не видят
+  токены друг друга);
+- KvSessionStore - встроенное дисковое KV-хранилище (отдельный файл SQLite
+  в режиме WAL), изолированное от основной БД.
+
+Хранилище выбирается настройкой SESSION_STORE (sql | memory | kv).
+Внешние хранилища (memory, kv) не участвуют в транзакции БД: AuthService
+применяет к ним создание токенов после коммита, а отзыв, от которого
+зависит ротация, компенсирует при откате (restore).
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import and_, insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import Token
+
+@dataclass(frozen=True, slots=True)
+class SessionRecord:
+    """Запись о выданном токене"""
+    id: int
+    user_id: int
+    token_hash: str
+    token_type: str
+    family_id: Optional[str]
+    created_at: datetime
+    expires_at: datetime
+    is_active: bool = True
+
+    def is_valid(self, now: Optional[datetime] = None) -> bool:
+        return self.is_active and self.expires_at > (now or datetime.utcnow())
+
+
+class SessionStore(ABC):
+    """
+    Интерфейс хранилища токенов.
+
+    Строки для create - словари с полями user_id, token_hash, token_type,
+    family_id, expires_at. lookup возвращает и отозванные записи (они нужны
+    для обнаружения повторного использования), истекшие могут быть уже удалены.
+    """
+
+    @abstractmethod
+    def create(self, rows: List[Dict]) -> None:
+        """Сохранение новых токенов"""
+
+    @abstractmethod
+    def lookup(self, token_hash: str) -> Optional[SessionRecord]:
+        """Поиск записи по хешу токена"""
+
+    @abstractmethod
+    def revoke(self, token_id: int) -> bool:
+        """Отзыв токена; True, если именно этот вызов его отозвал (сравнение с обменом)"""
+
+    @abstractmethod
+    def restore(self, token_id: int) -> bool:
+        """Отмена отзыва токена (компенсация операции, не дошедшей до коммита)"""
+
+    @abstractmethod
+    def revoke_family(self, family_id: str, token_type: Optional[str] = None) -> int:
+        """Отзыв токенов семейства (при token_type - только этого типа)"""
+
+    @abstractmethod
+    def revoke_all(self, user_id: int) -> int:
+        """Отзыв всех токенов пользователя"""
+
+    @abstractmethod
+    def list(self, user_id: int) -> List[SessionRecord]:
+        """Действующие (активные и не истекшие) токены пользователя"""
+
+    @abstractmethod
+    def count_active(self, user_id: int) -> int:
+        """Число действующих токенов пользователя"""
+
+    @abstractmethod
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Удаление истекших записей; возвращает число удаленных"""
+
+
+class SqlSessionStore(SessionStore):
+    """Токены в таблице tokens основной БД; изменения коммитит вызывающий код"""
+
+    table = Token.__table__
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self, rows: List[Dict]) -> None:
+        self.db.execute(insert(self.table), rows)
+
+    def lookup(self, token_hash: str) -> Optional[SessionRecord]:
+        token = self.db.query(Token).filter(Token.token_hash == token_hash).first()
+        return self._record(token) if token else None
+
+    def revoke(self, token_id: int) -> bool:
+        return bool(self.db.query(Token).filter(
+            Token.id == token_id, Token.is_active == True
+        ).update({"is_active": False}))
+
+    def restore(self, token_id: int) -> bool:
+        return bool(self.db.query(Token).filter(
+            Token.id == token_id, Token.is_active == False
+        ).update({"is_active": True}))
+
+    def revoke_family(self, family_id: str, token_type: Optional[str] = None) -> int:
+        query = self.db.query(Token).filter(Token.family_id == family_id, Token.is_active == True)
+        if token_type is not None:
+            query = query.filter(Token.token_type == token_type)
+        return query.update({"is_active": False})
+
+    def revoke_all(self, user_id: int) -> int:
+        return self.db.query(Token).filter(
+            Token.user_id == user_id, Token.is_active == True
+        ).update({"is_active": False})
+
+    def _active(self, user_id: int):
+        return self.db.query(Token).filter(
+            and_(
+                Token.user_id == user_id,
+                Token.is_active == True,
+                Token.expires_at > datetime.utcnow()
+            )
+        )
+
+    def list(self, user_id: int) -> List[SessionRecord]:
+        return [self._record(token) for token in self._active(user_id).order_by(Token.id)]
+
+    def count_active(self, user_id: int) -> int:
+        return self._active(user_id).count()
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        return self.db.query(Token).filter(
+            Token.expires_at <= (now or datetime.utcnow())
+        ).delete(synchronize_session=False)
+
+    @staticmethod
+    def _record(token: Token) -> SessionRecord:
+        return SessionRecord(
+            id=token.id, user_id=token.user_id, token_hash=token.token_hash,
+            token_type=token.token_type, family_id=token.family_id,
+            created_at=token.created_at, expires_at=token.expires_at, is_active=token.is_active
+        )
+
+
+class TimingWheel:
+    """
+    Хешированный timing wheel для индекса истечения.
+
+    Ключ помещается в слот своего тика истечения (по модулю числа слотов);
+    продвижение колеса просматривает только пройденные слоты, поэтому
+    удаление истекших стоит O(истекших + коллизий), а не O(всех записей).
+    """
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 3600):
+        self.tick_seconds = tick_seconds
+        self.slots: List[Dict[str, int]] = [dict() for _ in range(slots)]
+        # Последний пройденный тик
+        self._cursor = self._tick(datetime.utcnow()) - 1
+
+    def _tick(self, moment: datetime) -> int:
+        return int(_timestamp(moment) // self.tick_seconds)
+
+    def add(self, key: str, expires_at: datetime) -> None:
+        tick = self._tick(expires_at)
+        self.slots[tick % len(self.slots)][key] = tick
+
+    def discard(self, key: str, expires_at: datetime) -> None:
+        self.slots[self._tick(expires_at) % len(self.slots)].pop(key, None)
+
+    def advance(self, now: datetime) -> List[str]:
+        """Продвижение до момента now; возвращает ключи, срок которых истек"""
+        current = self._tick(now)
+        # Полный оборот покрывает все слоты: дальше идти бессмысленно
+        start = max(self._cursor + 1, current - len(self.slots) + 1)
+        expired = []
+        for tick in range(start, current + 1):
+            slot = self.slots[tick % len(self.slots)]
+            due = [key for key, expiry_tick in slot.items() if expiry_tick <= current]
+            for key in due:
+                del slot[key]
+            expired.extend(due)
+        self._cursor = max(self._cursor, current)
+        return expired
+
+
+class MemorySessionStore(SessionStore):
+    """Токены в памяти процесса; истекшие удаляются колесом при каждой операции записи"""
+
+    def __init__(self, tick_seconds: float = 1.0, slots: int = 3600):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._records: Dict[str, SessionRecord] = {}
+        self._by_id: Dict[int, str] = {}
+        self._by_user: Dict[int, Set[str]] = {}
+        self._by_family: Dict[str, Set[str]] = {}
+        self._wheel = TimingWheel(tick_seconds, slots)
+
+    def create(self, rows: List[Dict]) -> None:
+        now = datetime.utcnow()
+        with self._lock:
+            self._expire_locked(now)
+            for row in rows:
+                record = SessionRecord(
+                    id=next(self._ids), user_id=row["user_id"], token_hash=row["token_hash"],
+                    token_type=row["token_type"], family_id=row.get("family_id"),
+                    created_at=now, expires_at=row["expires_at"]
+                )
+                self._records[record.token_hash] = record
+                self._by_id[record.id] = record.token_hash
+                self._by_user.setdefault(record.user_id, set()).add(record.token_hash)
+                if record.family_id:
+                    self._by_family.setdefault(record.family_id, set()).add(record.token_hash)
+                self._wheel.add(record.token_hash, record.expires_at)
+
+    def lookup(self, token_hash: str) -> Optional[SessionRecord]:
+        return self._records.get(token_hash)
+
+    def revoke(self, token_id: int) -> bool:
+        with self._lock:
+            token_hash = self._by_id.get(token_id)
+            return token_hash is not None and self._deactivate(token_hash)
+
+    def restore(self, token_id: int) -> bool:
+        with self._lock:
+            token_hash = self._by_id.get(token_id)
+            if token_hash is None or self._records[token_hash].is_active:
+                return False
+            self._records[token_hash] = replace(self._records[token_hash], is_active=True)
+            return True
+
+    def revoke_family(self, family_id: str, token_type: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(
+                self._deactivate(token_hash)
+                for token_hash in list(self._by_family.get(family_id, ()))
+                if token_type is None or self._records[token_hash].token_type == token_type
+            )
+
+    def revoke_all(self, user_id: int) -> int:
+        with self._lock:
+            return sum(self._deactivate(token_hash) for token_hash in list(self._by_user.get(user_id, ())))
+
+    def list(self, user_id: int) -> List[SessionRecord]:
+        now = datetime.utcnow()
+        with self._lock:
+            records = [self._records[token_hash] for token_hash in self._by_user.get(user_id, ())]
+        return sorted((record for record in records if record.is_valid(now)), key=lambda record: record.id)
+
+    def count_active(self, user_id: int) -> int:
+        return len(self.list(user_id))
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        with self._lock:
+            return self._expire_locked(now or datetime.utcnow())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._by_id.clear()
+            self._by_user.clear()
+            self._by_family.clear()
+            self._wheel = TimingWheel(self._wheel.tick_seconds, len(self._wheel.slots))
+
+    def _deactivate(self, token_hash: str) -> bool:
+        record = self._records[token_hash]
+        if not record.is_active:
+            return False
+        self._records[token_hash] = replace(record, is_active=False)
+        return True
+
+    def _expire_locked(self, now: datetime) -> int:
+        expired = self._wheel.advance(now)
+        for token_hash in expired:
+            record = self._records.pop(token_hash, None)
+            if record is None:
+                continue
+            del self._by_id[record.id]
+            self._discard(self._by_user, record.user_id, token_hash)
+            if record.family_id:
+                self._discard(self._by_family, record.family_id, token_hash)
+        return len(expired)
+
+    @staticmethod
+    def _discard(index: Dict, key, token_hash: str) -> None:
+        hashes = index.get(key)
+        if hashes is not None:
+            hashes.discard(token_hash)
+            if not hashes:
+                del index[key]
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class KvSessionStore(SessionStore):
+    """
+    Токены во встроенном KV-хранилище на диске.
+
+    Отдельный файл SQLite (WAL, synchronous=NORMAL) с ключом token_hash и
+    вторичными индексами по id, пользователю, семейству и сроку истечения.
+    Не делит блокировки и транзакции с основной БД.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            token_hash TEXT NOT NULL UNIQUE,
+            user_id INTEGER NOT NULL,
+            token_type TEXT NOT NULL,
+            family_id TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS ix_sessions_user_id ON sessions (user_id);
+        CREATE INDEX IF NOT EXISTS ix_sessions_family_id ON sessions (family_id);
+        CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at);
+    """
+    COLUMNS = "id, user_id, token_hash, token_type, family_id, created_at, expires_at, is_active"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    # Соединение общее для потоков: выполнение и чтение результата - под одной блокировкой,
+    # наружу отдаются строки и счетчики, а не курсор
+    def _execute(self, sql: str, params=()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetchone(self, sql: str, params=()) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql: str, params=()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def create(self, rows: List[Dict]) -> None:
+        created_at = time.time()
+        values = [
+            (row["token_hash"], row["user_id"], row["token_type"], row.get("family_id"),
+             created_at, _timestamp(row["expires_at"]))
+            for row in rows
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO sessions (token_hash, user_id, token_type, family_id, created_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", values
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def lookup(self, token_hash: str) -> Optional[SessionRecord]:
+        row = self._fetchone(
+            f"SELECT {self.COLUMNS} FROM sessions WHERE token_hash = ?", (token_hash,)
+        )
+        return self._record(row) if row else None
+
+    def revoke(self, token_id: int) -> bool:
+        return self._execute(
+            "UPDATE sessions SET is_active = 0 WHERE id = ? AND is_active = 1", (token_id,)
+        ) == 1
+
+    def restore(self, token_id: int) -> bool:
+        return self._execute(
+            "UPDATE sessions SET is_active = 1 WHERE id = ? AND is_active = 0", (token_id,)
+        ) == 1
+
+    def revoke_family(self, family_id: str, token_type: Optional[str] = None) -> int:
+        if token_type is None:
+            return self._execute(
+                "UPDATE sessions SET is_active = 0 WHERE family_id = ? AND is_active = 1", (family_id,)
+            )
+        return self._execute(
+            "UPDATE sessions SET is_active = 0 WHERE family_id = ? AND token_type = ? AND is_active = 1",
+            (family_id, token_type)
+        )
+
+    def revoke_all(self, user_id: int) -> int:
+        return self._execute(
+            "UPDATE sessions SET is_active = 0 WHERE user_id = ? AND is_active = 1", (user_id,)
+        )
+
+    def list(self, user_id: int) -> List[SessionRecord]:
+        rows = self._fetchall(
+            f"SELECT {self.COLUMNS} FROM sessions "
+            "WHERE user_id = ? AND is_active = 1 AND expires_at > ? ORDER BY id",
+            (user_id, _timestamp(datetime.utcnow()))
+        )
+        return [self._record(row) for row in rows]
+
+    def count_active(self, user_id: int) -> int:
+        return self._fetchone(
+            "SELECT COUNT(*) FROM sessions WHERE user_id = ? AND is_active = 1 AND expires_at > ?",
+            (user_id, _timestamp(datetime.utcnow()))
+        )[0]
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        return self._execute(
+            "DELETE FROM sessions WHERE expires_at <= ?", (_timestamp(now or datetime.utcnow()),)
+        )
+
+    def clear(self) -> None:
+        self._execute("DELETE FROM sessions")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _record(row) -> SessionRecord:
+        return SessionRecord(
+            id=row[0], user_id=row[1], token_hash=row[2], token_type=row[3], family_id=row[4],
+            created_at=_from_timestamp(row[5]), expires_at=_from_timestamp(row[6]), is_active=bool(row[7])
+        )
+
+
+def _timestamp(moment: datetime) -> float:
+    """Наивное UTC-время -> секунды эпохи"""
+    return (moment - datetime(1970, 1, 1)).total_seconds()
+
+
+def _from_timestamp(value: float) -> datetime:
+    return datetime.utcfromtimestamp(value)
+
+
+_shared_stores: Dict[tuple, SessionStore] = {}
+_shared_lock = threading.Lock()
+
+
+def create_session_store(db: Session) -> SessionStore:
+    """
+    Хранилище токенов по настройке SESSION_STORE.
+
+    SQL-хранилище создается на каждую сессию БД; хранилища в памяти
+    и на диске - одно на процесс.
+    """
+    if settings.SESSION_STORE == "sql":
+        return SqlSessionStore(db)
+    if settings.SESSION_STORE == "memory":
+        key = ("memory", None)
+    else:
+        key = ("kv", settings.SESSION_KV_PATH)
+    with _shared_lock:
+        store = _shared_stores.get(key)
+        if store is None:
+            store = MemorySessionStore() if key[0] == "memory" else KvSessionStore(key[1])
+            _shared_stores[key] = store
+        return store
+
+
+def clear_session_store() -> None:
+    """Очистка общих хранилищ процесса (для тестов)"""
+    with _shared_lock:
+        for store in _shared_stores.values():
+            store.clear()
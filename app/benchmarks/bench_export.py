@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк потоковой выгрузки: пиковая память и скорость
+
+Выгружает таблицу tokens размером 10%, 50% и 100% от --rows и печатает
+пиковую память (tracemalloc). При потоковой выгрузке пик должен быть постоянным.
+
+Запуск: python app/benchmarks/bench_export.py --rows 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine, insert
+
+from app.core.export import stream_export
+from app.models.user import Base, Token
+
+
+def fill_tokens(engine, start: int, stop: int, chunk: int = 50_000):
+    """Массовая загрузка токенов через Core insert"""
+    expires = datetime.utcnow() + timedelta(days=1)
+    with engine.begin() as conn:
+        for offset in range(start, stop, chunk):
+            conn.execute(insert(Token.__table__), [
+                {"user_id": i % 1000, "token_hash": f"hash-{i}", "expires_at": expires,
+                 "token_type": "access", "is_active": True}
+                for i in range(offset, min(offset + chunk, stop))
+            ])
+
+
+def measure(engine, fmt: str):
+    """Время и пиковая память полной выгрузки"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+    for chunk in stream_export(engine, "tokens", fmt, batch_size=1000):
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк потоковой выгрузки")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default="ndjson")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        loaded = 0
+        print(f"{'строк':>10} {'время, с':>10} {'пик памяти, КБ':>16} {'объем, МБ':>10}")
+        for target in (args.rows // 10, args.rows // 2, args.rows):
+            fill_tokens(engine, loaded, target)
+            loaded = target
+            elapsed, peak, size = measure(engine, args.format)
+            print(f"{target:>10} {elapsed:>10.2f} {peak / 1024:>16.1f} {size / 1024 / 1024:>10.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк группового коммита при массовом входе пользователей
+
+Каждый поток многократно выдает токены своему пользователю (create_tokens,
+как при /auth/login без проверки пароля). Сравниваются отдельный коммит на
+каждый вход и групповой коммит (GroupCommitWriter) во временной файловой
+SQLite БД: число коммитов, пропускная способность и перцентили задержки.
+
+Запуск: python app/benchmarks/bench_group_commit.py --threads 16 --iterations 100
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.core.group_commit import GroupCommitWriter
+from app.models.user import Base, User
+import app.models.role  # noqa: F401
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_mode(group_commit: bool, threads: int, iterations: int, delay_ms: float) -> dict:
+    """Прогон одного режима на чистой БД"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+        db = Session()
+        users = []
+        for i in range(threads):
+            user = User(username=f"Benchuser{i}", email=f"bench{i}@example.com",
+                        password_hash="hash", birthday=date(2000, 1, 1))
+            db.add(user)
+            users.append(user)
+        db.commit()
+        db.close()
+
+        commits = [0]
+        lock = threading.Lock()
+
+        def on_commit(conn):
+            with lock:
+                commits[0] += 1
+
+        event.listen(engine, "commit", on_commit)
+        writer = GroupCommitWriter(engine, max_delay_ms=delay_ms).start() if group_commit else None
+        latencies = []
+
+        def worker(user: User):
+            local = []
+            for _ in range(iterations):
+                session = Session()
+                started = time.perf_counter()
+                try:
+                    AuthService(session, token_writer=writer).create_tokens(user)
+                finally:
+                    session.close()
+                local.append((time.perf_counter() - started) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(user,)) for user in users]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if writer is not None:
+            writer.stop()
+        engine.dispose()
+
+    total = threads * iterations
+    return {
+        "commits_per_op": commits[0] / total,
+        "ops_per_second": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк группового коммита")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="Окно сбора пачки")
+    args = parser.parse_args()
+
+    settings.MAX_ACTIVE_TOKENS = 10 ** 9
+
+    print(f"🔐 МАССОВЫЙ ВХОД: {args.threads} потоков x {args.iterations} входов")
+    print(f"   {'режим':<16} {'коммитов/вход':>14} {'входов/с':>9} {'p50, мс':>9} {'p99, мс':>9}")
+    for name, group_commit in (("коммит на вход", False), ("групповой", True)):
+        r = run_mode(group_commit, args.threads, args.iterations, args.delay_ms)
+        print(f"   {name:<16} {r['commits_per_op']:14.2f} {r['ops_per_second']:9.0f} "
+              f"{r['p50']:9.2f} {r['p99']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
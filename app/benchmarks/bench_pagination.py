@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк keyset-пагинации списка разрешений
+
+Заполняет временную БД N разрешениями и замеряет время выборки страницы
+в начале, середине и конце таблицы. Для keyset-пагинации время должно
+оставаться постоянным независимо от глубины страницы.
+
+Запуск: python app/benchmarks/bench_pagination.py --rows 1000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.pagination import keyset_page
+from app.models.user import Base
+from app.models.role import Permission
+
+
+def fill_permissions(engine, rows: int, chunk: int = 50_000):
+    """Массовая загрузка разрешений через Core insert"""
+    with engine.begin() as conn:
+        for start in range(0, rows, chunk):
+            conn.execute(insert(Permission), [
+                {"name": f"Permission {i}", "code": f"perm-{i}", "created_by": 1, "is_active": True}
+                for i in range(start, min(start + chunk, rows))
+            ])
+
+
+def time_page(db, after_id, limit: int, repeat: int) -> float:
+    """Медианное время выборки одной страницы (мс)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query = db.query(Permission).filter(Permission.is_active == True)
+        keyset_page(query, Permission.id, after_id, limit)
+        timings.append((time.perf_counter() - started) * 1000)
+        db.expunge_all()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк keyset-пагинации")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        print(f"📥 Загрузка {args.rows} разрешений...")
+        started = time.perf_counter()
+        fill_permissions(engine, args.rows)
+        print(f"   готово за {time.perf_counter() - started:.1f} с")
+
+        db = sessionmaker(bind=engine)()
+        try:
+            print(f"\n📄 Время страницы (limit={args.limit}, медиана из {args.repeat}):")
+            for label, after_id in [
+                ("начало", None),
+                ("середина", args.rows // 2),
+                ("конец", args.rows - args.limit - 1),
+            ]:
+                print(f"   {label:<10} {time_page(db, after_id, args.limit, args.repeat):8.3f} мс")
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарки примитивов безопасности с контролем регрессий
+
+Замеряются подпись и проверка JWT, хеширование и проверка пароля argon2,
+PermissionService.check_permission (SQLite в памяти, пользователь с ролью)
+и валидаторы схем LoginRequest / RegisterRequest. Каждый примитив
+выполняется --rounds раундов; число вызовов в раунде подбирается так,
+чтобы раунд длился не меньше --min-time секунд. Сравнивается лучший раунд:
+он меньше всего зависит от фоновой нагрузки.
+
+Сохранить базовую линию:  python app/benchmarks/bench_primitives.py --save
+Проверить регрессии:      python app/benchmarks/bench_primitives.py --compare --threshold 20
+Команда завершается с кодом 1, если какой-либо примитив стал медленнее
+базовой линии больше чем на порог (--threshold или --limit имя=процент).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.auth.permission_service import PermissionService
+from app.core.security import create_access_token, verify_token, get_password_hash, verify_password
+from app.migrations.policy_loader import sync_policy
+from app.models.role import Role, UserRole
+from app.models.user import Base, User
+from app.schemas.auth import LoginRequest, RegisterRequest
+
+DEFAULT_BASELINE = os.path.join("bench_results", "primitives-baseline.json")
+
+PASSWORD = "Secret123"
+REGISTER_DATA = {
+    "username": "Benchuser",
+    "email": "bench@example.com",
+    "password": PASSWORD,
+    "c_password": PASSWORD,
+    "birthday": date(2000, 1, 1),
+}
+
+
+def permission_fixture():
+    """БД в памяти: пользователь с ролью editor и несколькими разрешениями"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    user = User(username="Benchuser", email="bench@example.com", password_hash="hash", birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    codes = [f"{action}-{entity}" for entity in ("user", "role", "permission")
+             for action in ("get-list", "read", "create", "update", "delete", "restore")]
+    sync_policy(db, {
+        "permissions": [{"code": code, "name": code} for code in codes],
+        "roles": [
+            {"code": "editor", "name": "Редактор", "permissions": codes[:6]},
+            {"code": "viewer", "name": "Читатель", "permissions": ["get-list-user"]},
+        ],
+    })
+    for role in db.query(Role).all():
+        db.add(UserRole(user_id=user.id, role_id=role.id, created_by=1))
+    db.commit()
+    return db, user.id
+
+
+def build_benchmarks() -> Dict[str, Callable[[], object]]:
+    token = create_access_token({"sub": "1"})
+    password_hash = get_password_hash(PASSWORD)
+    db, user_id = permission_fixture()
+    return {
+        "jwt.create_access_token": lambda: create_access_token({"sub": "1"}),
+        "jwt.verify_token": lambda: verify_token(token),
+        "argon2.get_password_hash": lambda: get_password_hash(PASSWORD),
+        "argon2.verify_password": lambda: verify_password(PASSWORD, password_hash),
+        "permission.check_permission.granted": lambda: PermissionService.check_permission(user_id, "read-user", db),
+        "permission.check_permission.denied": lambda: PermissionService.check_permission(user_id, "delete-role", db),
+        "schema.LoginRequest": lambda: LoginRequest(username="Benchuser", password=PASSWORD),
+        "schema.RegisterRequest": lambda: RegisterRequest(**REGISTER_DATA),
+    }
+
+
+def measure(func: Callable[[], object], rounds: int, min_time: float) -> dict:
+    """Время одного вызова (мкс): лучший и медианный раунд"""
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        iterations = max(iterations * 2, int(iterations * min_time / max(elapsed, 1e-9)))
+    per_call = [elapsed / iterations]
+    for _ in range(rounds - 1):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        per_call.append((time.perf_counter() - started) / iterations)
+    return {
+        "best_us": min(per_call) * 1_000_000,
+        "median_us": statistics.median(per_call) * 1_000_000,
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+def find_regressions(baseline: Dict[str, dict], current: Dict[str, dict], threshold: float,
+                     limits: Dict[str, float]) -> List[str]:
+    """Примитивы, замедлившиеся больше порога (процент) относительно базовой линии"""
+    regressions = []
+    for name, result in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (result["best_us"] / old["best_us"] - 1) * 100
+        limit = limits.get(name, threshold)
+        if change > limit:
+            regressions.append(f"{name}: {old['best_us']:.2f} -> {result['best_us']:.2f} мкс "
+                               f"(+{change:.1f}% при пороге {limit:g}%)")
+    return regressions
+
+
+def parse_limits(values: List[str]) -> Dict[str, float]:
+    limits = {}
+    for value in values:
+        name, _, percent = value.partition("=")
+        limits[name] = float(percent)
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарки примитивов безопасности")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Минимальная длительность раунда, с")
+    parser.add_argument("--only", help="Имена примитивов через запятую")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="Сохранить базовую линию")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Сравнить с базовой линией")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Допустимое замедление, %%")
+    parser.add_argument("--limit", action="append", default=[], metavar="ИМЯ=ПРОЦЕНТ",
+                        help="Свой порог для примитива (повторяемый)")
+    args = parser.parse_args()
+
+    benchmarks = build_benchmarks()
+    if args.only:
+        names = args.only.split(",")
+        unknown = set(names) - set(benchmarks)
+        if unknown:
+            parser.error(f"неизвестные примитивы: {', '.join(sorted(unknown))}")
+        benchmarks = {name: benchmarks[name] for name in names}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(f"⏱️  ПРИМИТИВЫ: {args.rounds} раундов, не меньше {args.min_time} с на раунд")
+    print(f"   {'примитив':<38} {'лучший, мкс':>12} {'медиана, мкс':>13} {'вызовов':>8} {'изм.':>8}")
+    results = {}
+    for name, func in benchmarks.items():
+        r = results[name] = measure(func, args.rounds, args.min_time)
+        change = ""
+        if baseline and name in baseline["results"]:
+            change = f"{(r['best_us'] / baseline['results'][name]['best_us'] - 1) * 100:+.1f}%"
+        print(f"   {name:<38} {r['best_us']:12.2f} {r['median_us']:13.2f} {r['iterations']:8d} {change:>8}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.utcnow().isoformat(),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Базовая линия: {args.save}")
+
+    if baseline is not None:
+        if baseline.get("python") != platform.python_version():
+            print(f"\n⚠️  Базовая линия снята на Python {baseline.get('python')}")
+        regressions = find_regressions(baseline["results"], results, args.threshold, parse_limits(args.limit))
+        if regressions:
+            print("\n❌ РЕГРЕССИИ:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ Регрессий больше {args.threshold:g}% нет")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк обновления токенов (/auth/refresh) под конкурентной нагрузкой
+
+Сравнивает прежний порядок (отзыв refresh token с отдельным коммитом,
+затем create_tokens со своим коммитом) и единицу работы (один коммит на
+операцию). Каждый поток обновляет токены своего пользователя во временной
+файловой SQLite БД; выводятся число коммитов на операцию и перцентили задержки.
+
+Запуск: python app/benchmarks/bench_refresh.py --threads 8 --iterations 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.core.security import hash_token
+from app.models.user import Base, User, Token
+import app.models.role  # noqa: F401
+
+
+def legacy_refresh(service: AuthService, refresh_token: str):
+    """Прежний порядок: два коммита на одно обновление"""
+    record = service.db.query(Token).filter(
+        Token.token_hash == hash_token(refresh_token),
+        Token.is_active == True
+    ).first()
+    record.is_active = False
+    service.db.commit()
+    return service.create_tokens(service.db.get(User, record.user_id))
+
+
+MODES = {
+    "per-step": legacy_refresh,
+    "unit-of-work": lambda service, token: service.refresh_tokens(token),
+}
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_mode(mode: str, threads: int, iterations: int) -> dict:
+    """Прогон одного режима на чистой БД"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+        commits = [0]
+        lock = threading.Lock()
+
+        def on_commit(conn):
+            with lock:
+                commits[0] += 1
+
+        # Пользователи и стартовые токены создаются до начала замера
+        start_tokens = []
+        db = Session()
+        for i in range(threads):
+            user = User(username=f"Benchuser{i}", email=f"bench{i}@example.com",
+                        password_hash="hash", birthday=date(2000, 1, 1))
+            db.add(user)
+            db.commit()
+            start_tokens.append(AuthService(db).create_tokens(user).refresh_token)
+        db.close()
+
+        event.listen(engine, "commit", on_commit)
+        latencies = []
+        refresh = MODES[mode]
+
+        def worker(refresh_token: str):
+            local = []
+            for _ in range(iterations):
+                session = Session()
+                started = time.perf_counter()
+                try:
+                    refresh_token = refresh(AuthService(session), refresh_token).refresh_token
+                finally:
+                    session.close()
+                local.append((time.perf_counter() - started) * 1000)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(token,)) for token in start_tokens]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    total = threads * iterations
+    return {
+        "commits_per_op": commits[0] / total,
+        "ops_per_second": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк обновления токенов")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Ограничение активных токенов не должно прерывать длинный прогон
+    settings.MAX_ACTIVE_TOKENS = 10 ** 9
+
+    print(f"🔄 ОБНОВЛЕНИЕ ТОКЕНОВ: {args.threads} потоков x {args.iterations} операций")
+    print(f"   {'режим':<14} {'коммитов/оп':>12} {'оп/с':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for mode in MODES:
+        r = run_mode(mode, args.threads, args.iterations)
+        print(f"   {mode:<14} {r['commits_per_op']:12.2f} {r['ops_per_second']:8.0f} "
+              f"{r['p50']:9.2f} {r['p95']:9.2f} {r['p99']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Сравнительный бенчмарк хранилищ токенов (SessionStore)
+
+Для каждого хранилища (sql, memory, kv) во временном каталоге выполняются
+основные операции: выдача пары токенов, поиск по хешу (в один и в несколько
+потоков), список токенов пользователя, отзыв и удаление истекших.
+Изменения SQL-хранилища коммитятся после каждой операции, как в AuthService.
+
+Запуск: python app/benchmarks/bench_session_store.py --users 200 --tokens 2000 --threads 8
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.auth.session_store import SqlSessionStore, MemorySessionStore, KvSessionStore
+from app.core.security import hash_token
+from app.models.user import Base
+import app.models.role  # noqa: F401
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed(operation, items) -> dict:
+    """Выполнение операции для каждого элемента с замером задержек"""
+    latencies = []
+    started = time.perf_counter()
+    for item in items:
+        op_started = time.perf_counter()
+        operation(item)
+        latencies.append((time.perf_counter() - op_started) * 1_000_000)
+    elapsed = time.perf_counter() - started
+    return {
+        "ops_per_second": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def token_pair(user_id: int, index: int, ttl: timedelta) -> list:
+    now = datetime.utcnow()
+    return [
+        {"user_id": user_id, "token_hash": hash_token(f"{kind}-{index}"), "token_type": kind,
+         "family_id": f"fam-{index}", "expires_at": now + ttl}
+        for kind in ("access", "refresh")
+    ]
+
+
+def run_backend(name: str, tmp: str, users: int, tokens: int, threads: int) -> dict:
+    """Прогон всех операций на одном хранилище"""
+    engine = None
+    if name == "sql":
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+        def open_store():
+            return SqlSessionStore(Session())
+    elif name == "memory":
+        shared = MemorySessionStore()
+
+        def open_store():
+            return shared
+    else:
+        shared = KvSessionStore(os.path.join(tmp, "sessions.db"))
+
+        def open_store():
+            return shared
+
+    store = open_store()
+
+    def commit():
+        if isinstance(store, SqlSessionStore):
+            store.db.commit()
+
+    def create(index):
+        # Часть токенов выдается уже истекшими: их удалит expire
+        ttl = timedelta(minutes=30) if index % 10 else timedelta(seconds=-1)
+        store.create(token_pair(index % users + 1, index, ttl))
+        commit()
+
+    rng = random.Random(42)
+    hashes = [hash_token(f"access-{rng.randrange(tokens)}") for _ in range(tokens)]
+    results = {"create": timed(create, range(tokens))}
+    results["lookup"] = timed(store.lookup, hashes)
+    commit()
+
+    def lookup_worker(chunk):
+        local_store = open_store()
+        for token_hash in chunk:
+            local_store.lookup(token_hash)
+        if isinstance(local_store, SqlSessionStore):
+            local_store.db.close()
+
+    pool = [threading.Thread(target=lookup_worker, args=(hashes[i::threads],)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results["lookup_mt"] = {"ops_per_second": len(hashes) / (time.perf_counter() - started)}
+
+    results["list"] = timed(lambda user_id: (store.list(user_id), commit()), range(1, users + 1))
+    results["revoke"] = timed(
+        lambda token_id: (store.revoke(token_id), commit()), range(1, tokens * 2, 2)
+    )
+
+    started = time.perf_counter()
+    removed = store.expire()
+    commit()
+    # В памяти истекшие записи удаляются колесом попутно при выдаче, поэтому здесь их может не остаться
+    results["expire"] = {"p50": (time.perf_counter() - started) * 1_000_000, "removed": removed}
+
+    if isinstance(store, SqlSessionStore):
+        store.db.close()
+        engine.dispose()
+    elif isinstance(store, KvSessionStore):
+        store.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение хранилищ токенов")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=2000, help="Пар токенов")
+    parser.add_argument("--threads", type=int, default=8, help="Потоков для параллельного поиска")
+    parser.add_argument("--backends", default="sql,memory,kv")
+    args = parser.parse_args()
+
+    print(f"🗄️  ХРАНИЛИЩА ТОКЕНОВ: {args.tokens} пар, {args.users} пользователей")
+    for name in args.backends.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run_backend(name, tmp, args.users, args.tokens, args.threads)
+        print(f"\n📦 {name}")
+        print(f"   {'операция':<12} {'опер/с':>10} {'p50, мкс':>10} {'p99, мкс':>10}")
+        for operation, r in results.items():
+            if operation == "expire":
+                print(f"   {operation:<12} {'':>10} {r['p50']:10.0f} {'':>10}  (удалено {r['removed']})")
+            elif operation == "lookup_mt":
+                print(f"   {operation:<12} {r['ops_per_second']:10.0f}   ({args.threads} потоков)")
+            else:
+                print(f"   {operation:<12} {r['ops_per_second']:10.0f} {r['p50']:10.1f} {r['p99']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк холодного старта приложения
+
+1. Время импорта main и выполнения startup-событий в новом процессе
+   (как при старте воркера или перезапуске в режиме reload).
+2. Стоимость проверки схемы на уже инициализированной БД:
+   create_all с рефлексией (прежний способ) против ensure_schema (SELECT ревизии).
+
+Запуск: python app/benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+sys.path.insert(0, ROOT)
+
+STARTUP_SNIPPET = """
+import time
+started = time.perf_counter()
+import main
+import asyncio
+asyncio.run(main.app.router.startup())
+print(time.perf_counter() - started)
+"""
+
+
+def cold_start(runs: int, env: dict) -> list:
+    """Время старта в отдельных процессах (с)"""
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SNIPPET],
+            env=env, cwd=env["BENCH_CWD"], capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def schema_check(runs: int):
+    """Сравнение create_all и ensure_schema на готовой БД (мс)"""
+    from sqlalchemy import create_engine
+    from app.core.database import ensure_schema
+    from app.models.user import Base
+    import app.models.role  # noqa: F401
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        ensure_schema(engine)
+        results = {}
+        for name, check in (
+            ("create_all", lambda: Base.metadata.create_all(bind=engine)),
+            ("ensure_schema", lambda: ensure_schema(engine)),
+        ):
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                check()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк холодного старта")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=os.path.abspath(ROOT), BENCH_CWD=tmp,
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'app.db')}")
+        first = cold_start(1, env)[0]
+        warm = cold_start(args.runs, env)
+
+    print("🚀 ХОЛОДНЫЙ СТАРТ (import main + startup)")
+    print(f"   первый запуск (миграции):  {first * 1000:8.1f} мс")
+    print(f"   повторный, медиана:        {statistics.median(warm) * 1000:8.1f} мс")
+    print(f"   повторный, максимум:       {max(warm) * 1000:8.1f} мс")
+
+    print("\n🗄  ПРОВЕРКА СХЕМЫ НА ГОТОВОЙ БД (медиана)")
+    for name, value in schema_check(args.runs).items():
+        print(f"   {name:<14} {value:8.3f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк стоимости трассировки
+
+Сравнивается вызов функции без инструментирования, с декоратором traced()
+и блоком span() вне трассы (трассировка отключена или запрос не попал в
+выборку) и внутри записываемой трассы, а также выполнение SQL-запроса
+(SELECT 1 на SQLite в памяти) вне и внутри трассы.
+
+Запуск: python app/benchmarks/bench_tracing.py --calls 200000 --queries 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from sqlalchemy import create_engine, text
+
+from app.core.tracing import Span, Trace, span, traced
+import app.core.query_counter  # noqa: F401  (события SQLAlchemy со спанами SQL-запросов)
+
+
+def plain(a, b):
+    return a + b
+
+
+@traced("bench.traced")
+def instrumented(a, b):
+    return a + b
+
+
+def with_span(a, b):
+    with span("bench.span"):
+        return a + b
+
+
+def per_call_ns(func, calls: int) -> float:
+    started = time.perf_counter()
+    for i in range(calls):
+        func(i, 1)
+    return (time.perf_counter() - started) / calls * 1_000_000_000
+
+
+def in_trace(action):
+    """Выполнение внутри записываемой трассы; спаны сбрасываются, чтобы не копить память"""
+    root = Span(Trace(), "bench.root")
+    with root:
+        result = action()
+    root.trace.spans.clear()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Стоимость трассировки")
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"🔭 ТРАССИРОВКА: {args.calls} вызовов, {args.queries} SQL-запросов")
+    print(f"   {'сценарий':<32} {'нс/вызов':>10} {'+нс':>8}")
+    base = per_call_ns(plain, args.calls)
+    rows = [
+        ("функция без инструментирования", base),
+        ("traced() вне трассы", per_call_ns(instrumented, args.calls)),
+        ("span() вне трассы", per_call_ns(with_span, args.calls)),
+        ("traced() в трассе", in_trace(lambda: per_call_ns(instrumented, args.calls))),
+    ]
+    for name, ns in rows:
+        print(f"   {name:<32} {ns:10.0f} {ns - base:8.0f}")
+
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        select_one = text("SELECT 1")
+
+        def query_ns():
+            started = time.perf_counter()
+            for _ in range(args.queries):
+                conn.execute(select_one)
+            return (time.perf_counter() - started) / args.queries * 1_000_000_000
+
+        query_ns()  # прогрев кэша компиляции
+        # Лучший из трех прогонов: разница меньше разброса одного прогона
+        outside = min(query_ns() for _ in range(3))
+        inside = min(in_trace(query_ns) for _ in range(3))
+    print(f"\n🗄️  SELECT 1 вне трассы: {outside:.0f} нс, в трассе: {inside:.0f} нс "
+          f"(+{inside - outside:.0f} нс на спан запроса)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Пустой файл для обозначения пакета Python
\ No newline at end of file
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест сценариев авторизации
+
+Приложение запускается в том же процессе через ASGI-транспорт httpx
+(без сети и отдельного сервера) или, с флагом --uvicorn, отдельным
+процессом uvicorn на локальном порту. БД - временный файл SQLite
+(или --database-url), схема создается миграциями перед прогоном.
+
+Сценарии выполняются по очереди, каждый - заданным числом конкурентных
+клиентов; пользователи делятся между клиентами, поэтому цепочки refresh
+одного пользователя не пересекаются:
+register, login, me, permission (маршрут с require_permission от имени
+пользователя с ролью admin), refresh, logout_all.
+
+Для каждого сценария выводятся пропускная способность, p50/p95/p99 и
+среднее число SQL-запросов на HTTP-запрос (заголовок X-DB-Queries).
+Результаты сохраняются в JSON с хешем коммита для сравнения (--compare).
+
+Запуск: python app/benchmarks/load_test.py --users 50 --requests 500 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..")
+sys.path.insert(0, ROOT)
+
+import httpx
+
+SCENARIOS = ("register", "login", "me", "permission", "refresh", "logout_all")
+# Сценарии, которые выполняются ровно один раз на пользователя
+ONCE_PER_USER = {"register", "logout_all"}
+PASSWORD = "Secret123"
+PERMISSION_ROUTE = "/api/debug/profiles/"
+
+
+def configure_environment(database_url: str) -> None:
+    """
+    Настройки читаются при импорте app.core.config, поэтому окружение
+    задается до импорта приложения (и наследуется процессом uvicorn).
+    """
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["QUERY_COUNT_HEADERS"] = "true"
+    # Ограничение активных токенов не должно прерывать повторные входы
+    os.environ["MAX_ACTIVE_TOKENS"] = str(10 ** 9)
+    os.environ.setdefault("SECRET_KEY", "load-test-secret-key")
+
+
+def username(index: int) -> str:
+    """Имя из латинских букв (цифры в имени запрещены схемой регистрации)"""
+    suffix = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        suffix = chr(ord("a") + rest) + suffix
+    return f"Loaduser{suffix}"
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def bearer(user: dict) -> dict:
+    return {"Authorization": f"Bearer {user['access_token']}"}
+
+
+def store_tokens(user: dict, response: httpx.Response) -> None:
+    if response.status_code == 200:
+        user.update(response.json())
+
+
+async def call_register(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    return await client.post("/auth/register", json={
+        "username": user["username"], "email": f"{user['username'].lower()}@example.com",
+        "password": PASSWORD, "c_password": PASSWORD, "birthday": "2000-01-01",
+    })
+
+
+async def call_login(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    response = await client.post("/auth/login", json={"username": user["username"], "password": PASSWORD})
+    store_tokens(user, response)
+    return response
+
+
+async def call_me(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    return await client.get("/auth/me", headers=bearer(user))
+
+
+async def call_permission(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    return await client.get(PERMISSION_ROUTE, headers=bearer(user))
+
+
+async def call_refresh(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    response = await client.post("/auth/refresh", json={"refresh_token": user["refresh_token"]})
+    store_tokens(user, response)
+    return response
+
+
+async def call_logout_all(client: httpx.AsyncClient, user: dict) -> httpx.Response:
+    return await client.post("/auth/logout_all", headers=bearer(user))
+
+
+CALLS = {
+    "register": call_register,
+    "login": call_login,
+    "me": call_me,
+    "permission": call_permission,
+    "refresh": call_refresh,
+    "logout_all": call_logout_all,
+}
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, users: List[dict],
+                       requests: int, concurrency: int) -> dict:
+    """Прогон одного сценария: concurrency клиентов, у каждого своя часть пользователей"""
+    if name in ONCE_PER_USER:
+        requests = len(users)
+    concurrency = min(concurrency, len(users))
+    latencies: List[float] = []
+    statements: List[int] = []
+    statuses: Counter = Counter()
+    call = CALLS[name]
+
+    async def worker(index: int) -> None:
+        own = users[index::concurrency]
+        for i in range(requests // concurrency + (index < requests % concurrency)):
+            started = time.perf_counter()
+            response = await call(client, own[i % len(own)])
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+            if "X-DB-Queries" in response.headers:
+                statements.append(int(response.headers["X-DB-Queries"]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status >= 400),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "db_statements_per_request": statistics.mean(statements) if statements else None,
+    }
+
+
+def grant_admin(usernames: List[str]) -> None:
+    """Роль admin со всеми разрешениями для пользователей теста (сценарий permission)"""
+    from app.core.database import SessionLocal
+    from app.migrations.policy_loader import sync_policy
+    from app.models.role import Role, UserRole
+    from app.models.user import User
+
+    db = SessionLocal()
+    try:
+        sync_policy(db, {
+            "permissions": [{"code": "view-profiles", "name": "View profiles"}],
+            "roles": [{"code": "admin", "name": "Администратор", "permissions": "*"}],
+        })
+        role_id = db.query(Role.id).filter(Role.code == "admin").scalar()
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.username.in_(usernames))]
+        db.add_all(UserRole(user_id=user_id, role_id=role_id, created_by=1) for user_id in user_ids)
+        db.commit()
+    finally:
+        db.close()
+
+
+def start_uvicorn(port: int) -> subprocess.Popen:
+    """Отдельный процесс uvicorn на той же БД; ожидание готовности по /health"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=os.environ.copy()
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn не запустился за 30 секунд")
+
+
+async def run_load(args) -> Dict[str, dict]:
+    from app.core.database import ensure_schema
+
+    ensure_schema()
+    server = None
+    if args.uvicorn:
+        server = start_uvicorn(args.port)
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60,
+                                   limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        from main import app
+        client = httpx.AsyncClient(app=app, base_url="http://loadtest", timeout=60)
+
+    users = [{"username": username(i)} for i in range(args.users)]
+    results = {}
+    try:
+        async with client:
+            for name in args.scenarios.split(","):
+                results[name] = await run_scenario(client, name, users, args.requests, args.concurrency)
+                print_result(name, results[name])
+                if name == "register" and "permission" in args.scenarios:
+                    # Роль выдается до входа: принципалы сервера кэшируются по токену
+                    grant_admin([user["username"] for user in users])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    return results
+
+
+def print_result(name: str, r: dict) -> None:
+    statements = r["db_statements_per_request"]
+    print(f"   {name:<11} {r['requests']:6d} {r['errors']:6d} {r['rps']:8.1f} "
+          f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+          f"{statements if statements is None else round(statements, 1)!s:>6}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Изменение пропускной способности и p95 относительно прошлого прогона"""
+    print(f"\n📊 СРАВНЕНИЕ С {previous.get('commit') or '?'} ({previous.get('timestamp', '')})")
+    for name, r in current["scenarios"].items():
+        old = previous.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        rps = (r["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0
+        p95 = (r["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0
+        print(f"   {name:<11} оп/с {rps:+6.1f}%   p95 {p95:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сценариев авторизации")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500, help="Запросов на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--uvicorn", action="store_true", help="Через локальный процесс uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--database-url", help="По умолчанию - временный файл SQLite")
+    parser.add_argument("--output", help="Файл результатов (по умолчанию bench_results/load-<коммит>.json)")
+    parser.add_argument("--compare", help="Результаты прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_environment(args.database_url or f"sqlite:///{os.path.join(tmp, 'load.db')}")
+        mode = "uvicorn" if args.uvicorn else "asgi"
+        print(f"🚀 НАГРУЗКА ({mode}): {args.users} пользователей, {args.requests} запросов на сценарий, "
+              f"{args.concurrency} клиентов")
+        print(f"   {'сценарий':<11} {'запр.':>6} {'ошиб.':>6} {'оп/с':>8} {'p50, мс':>8} "
+              f"{'p95, мс':>8} {'p99, мс':>8} {'SQL':>6}")
+        results = asyncio.run(run_load(args))
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "mode": mode,
+        "users": args.users,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scenarios": results,
+    }
+    output = args.output or os.path.join("bench_results", f"load-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Результаты: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
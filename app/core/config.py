@@ -6,13 +6,64 @@ load_dotenv()
 class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "fallback-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
+    # jwt - подписанные JWT; opaque - случайные непрозрачные токены (проверка по SHA-256 в БД)
+    TOKEN_MODE: str = os.getenv("TOKEN_MODE", "jwt")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
     MAX_ACTIVE_TOKENS: int = int(os.getenv("MAX_ACTIVE_TOKENS", 5))
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")  # Добавляем эту строку
+    DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 500))
+    MAX_BULK_ITEMS: int = int(os.getenv("MAX_BULK_ITEMS", 10000))
+    # Процессов argon2 для /auth/import (0 - хеширование в потоке запроса; CLI задает --workers)
+    IMPORT_WORKERS: int = int(os.getenv("IMPORT_WORKERS", 0))
+    # Кэш принципалов между запросами, с (0 - отключен). Кэш локален для процесса: при
+    # нескольких воркерах выход, смена пароля или отзыв ролей в одном воркере (и запись
+    # политики из CLI) не сбрасывают кэш других - отозванный токен принимается еще до TTL секунд
+    PRINCIPAL_CACHE_TTL: float = float(os.getenv("PRINCIPAL_CACHE_TTL", 0))
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+    # Групповой коммит токенов входа; лимит MAX_ACTIVE_TOKENS в этом режиме приблизительный
+    GROUP_COMMIT_ENABLED: bool = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+    GROUP_COMMIT_MAX_DELAY_MS: float = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 5))
+    GROUP_COMMIT_MAX_ROWS: int = int(os.getenv("GROUP_COMMIT_MAX_ROWS", 500))
+    GROUP_COMMIT_QUEUE_SIZE: int = int(os.getenv("GROUP_COMMIT_QUEUE_SIZE", 10000))
+    # Сколько вход ждет коммита своей пачки, с (дольше - 503)
+    GROUP_COMMIT_WAIT_TIMEOUT: float = float(os.getenv("GROUP_COMMIT_WAIT_TIMEOUT", 5))
+    # Хранилище состояния токенов: sql (таблица tokens), memory (память процесса - только
+    # при одном процессе-воркере), kv (отдельный файл, общий для процессов одной машины)
+    SESSION_STORE: str = os.getenv("SESSION_STORE", "sql")
+    SESSION_KV_PATH: str = os.getenv("SESSION_KV_PATH", "./sessions.db")
+    QUERY_COUNT_HEADERS: bool = os.getenv("QUERY_COUNT_HEADERS", "false").lower() == "true"
+    # Сколько повторов одного SQL-запроса за HTTP-запрос считать признаком N+1 (0 - не проверять)
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", 3))
+    # Журнал медленных запросов (0 - отключен)
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", 200))
+    SLOW_QUERY_LOG_PATH: str = os.getenv("SLOW_QUERY_LOG_PATH", "./logs/slow_queries.log")
+    SLOW_QUERY_LOG_MAX_BYTES: int = int(os.getenv("SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024 * 1024))
+    SLOW_QUERY_LOG_BACKUPS: int = int(os.getenv("SLOW_QUERY_LOG_BACKUPS", 5))
+    SLOW_QUERY_EXPLAIN: bool = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() == "true"
+    # Профилирование запросов: по заголовку X-Profile с PROFILE_TOKEN или по доле запросов (0..1)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", 1))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "./profiles")
+    PROFILE_MAX_PER_ROUTE: int = int(os.getenv("PROFILE_MAX_PER_ROUTE", 100))
+    # Сторож цикла событий: пульс раз в LOOP_WATCHDOG_INTERVAL_MS, стек при блокировке дольше порога
+    LOOP_WATCHDOG_ENABLED: bool = os.getenv("LOOP_WATCHDOG_ENABLED", "true").lower() == "true"
+    LOOP_WATCHDOG_INTERVAL_MS: float = float(os.getenv("LOOP_WATCHDOG_INTERVAL_MS", 10))
+    LOOP_BLOCK_THRESHOLD_MS: float = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", 100))
+    # Трассировка: доля записываемых запросов без заголовка traceparent (0..1), файл спанов
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", 1))
+    TRACE_LOG_PATH: str = os.getenv("TRACE_LOG_PATH", "./logs/traces.jsonl")
     
     def __init__(self):
         if not self.SECRET_KEY or self.SECRET_KEY == "fallback-secret-key-change-in-production":
             raise ValueError("SECRET_KEY must be set in .env file")
+        if self.TOKEN_MODE not in ("jwt", "opaque"):
+            raise ValueError("TOKEN_MODE must be 'jwt' or 'opaque'")
+        if self.SESSION_STORE not in ("sql", "memory", "kv"):
+            raise ValueError("SESSION_STORE must be 'sql', 'memory' or 'kv'")
 
 settings = Settings()
\ No newline at end of file
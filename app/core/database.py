@@ -1,24 +1,178 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import sessionmaker, Session
 from app.core.config import settings
+from app.core.metrics import registry, db_pool_checkout_wait
+from app.core.unit_of_work import in_unit_of_work
+
+logger = logging.getLogger(__name__)
 
-# Настройка базы данных
+# Настройка базы данных.
+# expire_on_commit=False: после коммита загруженные объекты остаются доступными,
+# поэтому читающую транзакцию можно завершить сразу и вернуть соединение в пул.
 engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+class PoolMonitor:
+    """
+    Учет занятости пула соединений: сколько соединений выдано сейчас, пик,
+    время удержания и ожидание выдачи.
+
+    У пула нет события начала выдачи, поэтому ожидание замеряется оберткой
+    pool.connect; после engine.dispose() пул пересоздается и оборачивается заново.
+    """
+
+    def __init__(self, bind):
+        self._lock = threading.Lock()
+        self._checked_out_at = {}
+        self.checked_out = 0
+        self.peak = 0
+        self.checkouts = 0
+        self.hold_seconds = 0.0
+        self.wait_seconds = 0.0
+        event.listen(bind, "checkout", self._on_checkout)
+        event.listen(bind, "checkin", self._on_checkin)
+        event.listen(bind, "engine_disposed", lambda engine: self._wrap_pool(engine.pool))
+        self._wrap_pool(bind.pool)
+
+    def _wrap_pool(self, pool) -> None:
+        connect = pool.connect
+
+        def timed_connect():
+            started = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                waited = time.perf_counter() - started
+                db_pool_checkout_wait.observe(waited)
+                with self._lock:
+                    self.wait_seconds += waited
+
+        pool.connect = timed_connect
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._checked_out_at[id(connection_record)] = time.perf_counter()
+            self.checked_out += 1
+            self.checkouts += 1
+            self.peak = max(self.peak, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            started = self._checked_out_at.pop(id(connection_record), None)
+            if started is None:
+                return
+            self.checked_out -= 1
+            self.hold_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "checked_out": self.checked_out,
+                "peak": self.peak,
+                "checkouts": self.checkouts,
+                "hold_seconds": round(self.hold_seconds, 6),
+                "wait_seconds": round(self.wait_seconds, 6),
+            }
+
+pool_monitor = PoolMonitor(engine)
+# Занятость - gauge; накопленные значения монотонны и экспортируются счетчиками.
+# Пик зависит от момента создания монитора и остается только в /health.
+registry.callback(
+    "db_pool_connections_checked_out", "Соединений пула выдано сейчас",
+    lambda: {(): pool_monitor.checked_out}
+)
+registry.callback(
+    "db_pool_checkouts_total", "Выдач соединений из пула",
+    lambda: {(): pool_monitor.checkouts}, kind="counter"
+)
+registry.callback(
+    "db_pool_hold_seconds_total", "Суммарное время удержания соединений пула",
+    lambda: {(): pool_monitor.hold_seconds}, kind="counter"
+)
+registry.callback(
+    "db_pool_wait_seconds_total", "Суммарное ожидание выдачи соединений пула",
+    lambda: {(): pool_monitor.wait_seconds}, kind="counter"
+)
+
+# Ревизия Alembic, которой соответствуют модели.
+# Обновляется вместе с каждой новой миграцией в app/migrations/alembic/versions.
+SCHEMA_REVISION = "0004"
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../alembic.ini")
+
+def get_schema_revision(bind=None):
+    """Текущая ревизия схемы из alembic_version (None, если БД не версионирована)"""
+    bind = bind or engine
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except (OperationalError, ProgrammingError):
+        return None
+
+def run_migrations(bind=None, revision: str = "head"):
+    """Применение миграций Alembic (alembic upgrade head)"""
+    from alembic import command
+    from alembic.config import Config
+
+    bind = bind or engine
+    config = Config(ALEMBIC_INI)
+    config.set_main_option(
+        "script_location",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "../migrations/alembic")
+    )
+    config.attributes["configure_logger"] = False
+    with bind.begin() as conn:
+        config.attributes["connection"] = conn
+        command.upgrade(config, revision)
+
+def ensure_schema(bind=None) -> bool:
+    """
+    Проверка схемы при старте: один SELECT ревизии вместо create_all с рефлексией.
+
+    DDL выполняется, только если ревизия БД отличается от SCHEMA_REVISION.
+    Возвращает True, если были применены миграции.
+    """
+    bind = bind or engine
+    revision = get_schema_revision(bind)
+    if revision == SCHEMA_REVISION:
+        return False
+
+    logger.info("Схема БД устарела (%s -> %s), применяем миграции", revision, SCHEMA_REVISION)
+    run_migrations(bind)
+    return True
 
 def create_tables():
-    """Создание таблиц в БД"""
-    from app.models.user import Base
-    from app.models.role import Base as RoleBase
-    
-    print("Создание таблиц...")
-    Base.metadata.create_all(bind=engine)
-    print("Таблицы созданы успешно!")
+    """Создание таблиц в БД (через миграции Alembic)"""
+    if ensure_schema():
+        logger.info("Таблицы созданы успешно")
+
+def release_connection(db: Session) -> None:
+    """
+    Завершение текущей транзакции, чтобы соединение сразу вернулось в пул.
+
+    Вызывается перед долгими вычислениями без БД (argon2), чтобы запрос
+    не удерживал соединение на все время обработки. Внутри единицы работы
+    ничего не делает: транзакцию завершает только внешний блок.
+    """
+    if db.in_transaction() and not in_unit_of_work(db):
+        db.commit()
 
 def get_db():
-    """Зависимость для получения сессии БД"""
+    """
+    Зависимость для получения сессии БД.
+
+    Сессия создается одна на запрос (FastAPI кэширует зависимость) и берет
+    соединение из пула только при первом запросе к БД; соединение возвращается
+    в пул при коммите/откате, а не при завершении запроса.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
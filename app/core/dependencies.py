@@ -1,40 +1,59 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import Session
 
-from app.core.config import settings
+from app.core.database import get_db
+from app.core.group_commit import get_group_writer
 from app.auth.service import AuthService
-
-# Настройка базы данных (SQLite для примера)
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.auth.principal import Principal
+from app.models.user import User
 
 # Схема аутентификации
 security = HTTPBearer()
 
-def get_db():
-    """Зависимость для получения сессии БД"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
-    """Зависимость для получения сервиса аутентификации"""
-    return AuthService(db)
+    """Зависимость для получения сервиса аутентификации (один на запрос, общий с get_db)"""
+    return AuthService(db, token_writer=get_group_writer())
 
-def get_current_user(
+def get_principal(
+    request: Request,
     token: str = Depends(security),
     auth_service: AuthService = Depends(get_auth_service)
-):
-    """Зависимость для получения текущего пользователя"""
+) -> Principal:
+    """
+    Зависимость для получения принципала запроса.
+
+    Токен проверяется один раз на запрос; результат хранится в request.state
+    и переиспользуется всеми зависимостями (get_current_user, require_permission).
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
     try:
-        return auth_service.get_current_user(token.credentials)
+        principal = auth_service.get_principal(token.credentials)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=str(e),
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+    request.state.principal = principal
+    return principal
+
+def get_current_user(principal: Principal = Depends(get_principal)) -> Principal:
+    """Зависимость для получения текущего пользователя (неизменяемый принципал)"""
+    return principal
+
+def get_current_user_model(
+    principal: Principal = Depends(get_principal),
+    db: Session = Depends(get_db)
+) -> User:
+    """ORM-объект текущего пользователя - только для обработчиков, которые его изменяют"""
+    user = db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.role import PolicyVersion
+
+# Общая версия политики доступа (разрешения, роли, назначения ролей)
+POLICY_SCOPE = "policy"
+
+# Ключ session.info с областями, версии которых увеличены в текущей транзакции
+# (по нему после коммита сбрасываются зависимые кэши)
+BUMPED_SCOPES_KEY = "bumped_scopes"
+
+# INSERT с поддержкой ON CONFLICT для поддерживаемых СУБД
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def user_scope(user_id: int) -> str:
+    """Ключ версии данных конкретного пользователя"""
+    return f"user:{user_id}"
+
+
+def get_version(db: Session, scope: str) -> int:
+    """Текущая версия области (0, если изменений еще не было)"""
+    version = db.query(PolicyVersion.version).filter(PolicyVersion.scope == scope).scalar()
+    return version or 0
+
+
+def bump_versions(db: Session, scopes: Iterable[str]) -> None:
+    """
+    Увеличение версий нескольких областей в текущей транзакции.
+
+    Коммит выполняет вызывающий код вместе с основным изменением,
+    поэтому версия не может разойтись с данными. Отсутствующие области
+    создаются тем же INSERT ... ON CONFLICT (scope) DO UPDATE: первые
+    параллельные изменения не сталкиваются на первичном ключе.
+    """
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return
+    db.info.setdefault(BUMPED_SCOPES_KEY, set()).update(scopes)
+
+    versions = PolicyVersion.__table__
+    upsert = _UPSERT_INSERTS[db.get_bind().dialect.name](versions)
+    now = datetime.utcnow()
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[versions.c.scope],
+            set_={"version": versions.c.version + 1, "updated_at": now}
+        ),
+        [{"scope": scope, "version": 1, "updated_at": now} for scope in scopes]
+    )
+
+def bump_version(db: Session, scope: str = POLICY_SCOPE) -> None:
+    """Увеличение версии одной области"""
+    bump_versions(db, [scope])
+
+
+def make_etag(scope: str, version: int) -> str:
+    """Слабый ETag на основе версии области"""
+    return f'W/"{scope}-{version}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Проверка заголовка If-None-Match"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Сравнение слабых ETag: префикс W/ не учитывается
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def conditional_response(request: Request, response: Response, db: Session, scope: str) -> Optional[Response]:
+    """
+    Обработка условного GET по версии области.
+
+    Возвращает готовый ответ 304, если клиент уже имеет актуальную версию,
+    иначе добавляет ETag к ответу и возвращает None.
+    """
+    etag = make_etag(scope, get_version(db, scope))
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Потоковая выгрузка таблиц для аудита (NDJSON / CSV)
+
+Строки читаются курсором по возрастанию id пачками (yield_per) и сразу
+сериализуются, поэтому расход памяти не зависит от размера таблицы.
+Для продолжения прерванной выгрузки передается id последней полученной строки.
+
+Запуск: python -m app.core.export users --format csv --after-id 0 > users.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.models.user import User, Token
+from app.models.role import UserRole, RolePermission
+
+# Выгружаемые таблицы; секреты (хеши паролей и токенов) не выгружаются
+EXPORT_TABLES = {
+    "users": (User.__table__, ("password_hash",)),
+    "users_and_roles": (UserRole.__table__, ()),
+    "roles_and_permissions": (RolePermission.__table__, ()),
+    "tokens": (Token.__table__, ("token_hash",)),
+}
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def export_columns(table_name: str):
+    """Колонки, попадающие в выгрузку"""
+    table, excluded = EXPORT_TABLES[table_name]
+    return [column for column in table.columns if column.name not in excluded]
+
+
+def iter_rows(
+    engine,
+    table_name: str,
+    after_id: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """
+    Построчное чтение таблицы серверным курсором.
+
+    filters: is_active, user_id, created_after, created_before
+    (неприменимые к таблице фильтры игнорируются).
+    """
+    if table_name not in EXPORT_TABLES:
+        raise ValueError(f"Неизвестная таблица: {table_name}")
+    table, _ = EXPORT_TABLES[table_name]
+    columns = export_columns(table_name)
+
+    query = select(*columns).order_by(table.c.id)
+    if after_id is not None:
+        query = query.where(table.c.id > after_id)
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name == "created_after" and "created_at" in table.c:
+            query = query.where(table.c.created_at >= value)
+        elif name == "created_before" and "created_at" in table.c:
+            query = query.where(table.c.created_at < value)
+        elif name in table.c:
+            query = query.where(table.c[name] == value)
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=batch_size).execute(query)
+        for row in result:
+            yield row._asdict()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется")
+
+
+def to_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Сериализация строк в NDJSON (одна JSON-строка на запись)"""
+    for row in rows:
+        yield json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+
+
+def to_csv(rows: Iterator[Dict[str, Any]], fieldnames) -> Iterator[str]:
+    """Сериализация строк в CSV с заголовком; буфер переиспользуется"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Заголовок пустой выгрузки
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_export(engine, table_name: str, fmt: str = "ndjson", **kwargs) -> Iterator[str]:
+    """Поток сериализованных строк выгрузки"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+    rows = iter_rows(engine, table_name, **kwargs)
+    if fmt == "csv":
+        return to_csv(rows, [column.name for column in export_columns(table_name)])
+    return to_ndjson(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Потоковая выгрузка таблиц")
+    parser.add_argument("table", choices=sorted(EXPORT_TABLES))
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+    parser.add_argument("--after-id", type=int, default=None, help="Продолжить после указанного id")
+    parser.add_argument("--user-id", type=int, default=None)
+    parser.add_argument("--active-only", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("-o", "--output", default="-", help="Файл результата (по умолчанию stdout)")
+    args = parser.parse_args()
+
+    from app.core.database import engine
+
+    filters = {"user_id": args.user_id, "is_active": True if args.active_only else None}
+    chunks = stream_export(engine, args.table, args.format, after_id=args.after_id,
+                           filters=filters, batch_size=args.batch_size)
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8", newline="")
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, Table
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitOverloaded(RuntimeError):
+    """Очередь группового коммита переполнена или писатель остановлен"""
+
+
+class GroupCommitWriter:
+    """
+    Групповой коммит вставок (write-behind).
+
+    Вставки из параллельных запросов ставятся в ограниченную очередь и
+    записываются фоновым потоком одной транзакцией: пачка закрывается через
+    max_delay_ms после первой записи или при наборе max_rows строк. Вызывающий
+    получает подтверждение только после коммита своей пачки. При переполнении
+    очереди submit ждет submit_timeout и выбрасывает GroupCommitOverloaded.
+    """
+
+    def __init__(
+        self,
+        engine,
+        max_delay_ms: float = 5.0,
+        max_rows: int = 500,
+        queue_size: int = 10000,
+        submit_timeout: float = 1.0
+    ):
+        self.engine = engine
+        self.max_delay = max_delay_ms / 1000
+        self.max_rows = max_rows
+        self.submit_timeout = submit_timeout
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.rows = 0
+
+    def start(self) -> "GroupCommitWriter":
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit_many(self, writes: Sequence[Tuple[Table, List[Dict]]]) -> Future:
+        """
+        Постановка вставок в несколько таблиц, которые должны попасть в одну транзакцию;
+        результат - Future с числом вставленных строк
+        """
+        if self._stopping.is_set():
+            raise GroupCommitOverloaded("Писатель группового коммита остановлен")
+        future: Future = Future()
+        writes = [(table, list(rows)) for table, rows in writes]
+        try:
+            self._queue.put((writes, future), timeout=self.submit_timeout)
+        except queue.Full:
+            raise GroupCommitOverloaded("Очередь группового коммита переполнена")
+        return future
+
+    def submit(self, table: Table, rows: List[Dict]) -> Future:
+        """Постановка строк одной таблицы в очередь"""
+        return self.submit_many([(table, rows)])
+
+    def write_many(self, writes: Sequence[Tuple[Table, List[Dict]]], timeout: Optional[float] = None) -> int:
+        """
+        Вставка в несколько таблиц с ожиданием коммита пачки.
+
+        Если коммит не подтвержден за timeout секунд (писатель завис или остановлен),
+        выбрасывается GroupCommitOverloaded. Запись, еще стоящая в очереди, отменяется;
+        запись из уже выполняемой пачки может быть зафиксирована после ошибки.
+        """
+        return self._wait(self.submit_many(writes), timeout)
+
+    def write(self, table: Table, rows: List[Dict], timeout: Optional[float] = None) -> int:
+        """Вставка с ожиданием коммита пачки"""
+        return self._wait(self.submit(table, rows), timeout)
+
+    @staticmethod
+    def _wait(future: Future, timeout: Optional[float]) -> int:
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise GroupCommitOverloaded(f"Коммит пачки не подтвержден за {timeout} с")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Остановка с дозаписью всего, что уже стоит в очереди"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "rows": self.rows, "queued": self._queue.qsize()}
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            count = self._count(first)
+            deadline = time.monotonic() + self.max_delay
+            while count < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                count += self._count(item)
+            self._flush(batch)
+
+    def _flush(self, batch: List[tuple]) -> None:
+        """Запись пачки одной транзакцией; при ошибке - поштучно, чтобы не терять чужие строки"""
+        # Записи, отмененные по таймауту ожидания, не пишутся; остальные больше нельзя отменить
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            self._insert(batch)
+        except Exception:
+            logger.warning("Групповой коммит не удался, запись по одной", exc_info=True)
+            for item in batch:
+                try:
+                    self._insert([item])
+                except Exception as e:
+                    item[1].set_exception(e)
+                else:
+                    item[1].set_result(self._count(item))
+            return
+        for item in batch:
+            item[1].set_result(self._count(item))
+
+    @staticmethod
+    def _count(item: tuple) -> int:
+        return sum(len(rows) for _, rows in item[0])
+
+    def _insert(self, batch: List[tuple]) -> None:
+        # Таблицы вставляются в порядке первого появления в пачке
+        by_table: Dict[Table, List[Dict]] = {}
+        for writes, _ in batch:
+            for table, rows in writes:
+                by_table.setdefault(table, []).extend(rows)
+        with self.engine.begin() as conn:
+            for table, rows in by_table.items():
+                conn.execute(insert(table), rows)
+        self.batches += 1
+        self.rows += sum(len(rows) for rows in by_table.values())
+
+
+_writer: Optional[GroupCommitWriter] = None
+
+
+def get_group_writer() -> Optional[GroupCommitWriter]:
+    """Писатель группового коммита (None, если режим выключен)"""
+    return _writer
+
+
+def start_group_writer(engine) -> Optional[GroupCommitWriter]:
+    """Запуск писателя при старте приложения (GROUP_COMMIT_ENABLED=true)"""
+    global _writer
+    if settings.GROUP_COMMIT_ENABLED and _writer is None:
+        _writer = GroupCommitWriter(
+            engine,
+            max_delay_ms=settings.GROUP_COMMIT_MAX_DELAY_MS,
+            max_rows=settings.GROUP_COMMIT_MAX_ROWS,
+            queue_size=settings.GROUP_COMMIT_QUEUE_SIZE
+        ).start()
+    return _writer
+
+
+def stop_group_writer() -> None:
+    """Остановка писателя при завершении приложения (очередь дописывается)"""
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
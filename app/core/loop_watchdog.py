@@ -0,0 +1,179 @@
+"""
+Сторож цикла событий: задержка цикла и поиск блокирующего кода
+
+Задача-пульс на цикле событий засыпает на LOOP_WATCHDOG_INTERVAL_MS и
+измеряет, насколько позже положенного она проснулась (гистограмма
+event_loop_lag_seconds). Отдельный поток следит за пульсом: если цикл не
+отвечает дольше LOOP_BLOCK_THRESHOLD_MS, он снимает стек потока цикла и
+маршрут запроса, задача которого сейчас выполняется. Когда цикл оживает,
+блокировка пишется в журнал (маршрут, длительность, стек) и в метрики
+event_loop_blocks_total / event_loop_block_seconds по маршруту.
+
+Маршрут определяется по текущей задаче цикла: LoopWatchdogMiddleware
+запоминает scope запроса для задачи, в которой выполняется обработчик.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND_ROUTE = "background"
+
+event_loop_lag = metrics.registry.histogram(
+    "event_loop_lag_seconds", "Опоздание пульса цикла событий относительно расписания",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+event_loop_blocks = metrics.registry.counter(
+    "event_loop_blocks_total", "Блокировки цикла событий дольше порога по маршруту", ("route",)
+)
+event_loop_block_duration = metrics.registry.histogram(
+    "event_loop_block_seconds", "Длительность блокировок цикла событий по маршруту", ("route",)
+)
+
+
+class LoopWatchdog:
+    """Пульс на цикле событий и поток, снимающий стек при его остановке"""
+
+    def __init__(self, threshold_ms: float, interval_ms: float = 10, max_events: int = 100):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        # Последние блокировки для отладки (новые в конце)
+        self.events: Deque[Dict] = deque(maxlen=max_events)
+        # Задача цикла -> scope запроса, который она обслуживает
+        self.requests: Dict[asyncio.Task, dict] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._beat = 0.0
+        # Стек, снятый во время текущей блокировки (до следующего пульса)
+        self._captured: Optional[Dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._heartbeat_task is not None
+
+    def start(self) -> None:
+        """Запуск из цикла событий (обработчик startup)"""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._heartbeat_task.cancel()
+        try:
+            await self._heartbeat_task
+        except asyncio.CancelledError:
+            pass
+        self._heartbeat_task = None
+        self._thread.join()
+        self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            lag = max(0.0, now - expected)
+            event_loop_lag.observe(lag)
+            with self._lock:
+                self._beat = now
+                captured, self._captured = self._captured, None
+            if lag >= self.threshold:
+                self._report(lag, captured)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                overdue = time.perf_counter() - self._beat - self.interval
+                if overdue < self.threshold or self._captured is not None:
+                    continue
+            captured = self._capture()
+            with self._lock:
+                self._captured = captured
+
+    def _capture(self) -> Dict:
+        """Стек потока цикла и маршрут выполняющейся задачи (вызывается из потока сторожа)"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame) if frame is not None else []
+        scope = None
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+        if task is not None:
+            scope = self.requests.get(task)
+        if scope is None:
+            return {"route": BACKGROUND_ROUTE, "method": None, "stack": stack}
+        return {"route": metrics.route_template(scope), "method": scope.get("method"), "stack": stack}
+
+    def _report(self, duration: float, captured: Optional[Dict]) -> None:
+        if captured is None:
+            # Блокировка закончилась раньше, чем поток сторожа успел снять стек
+            captured = {"route": BACKGROUND_ROUTE, "method": None, "stack": []}
+        event = {"duration_ms": round(duration * 1000, 1), **captured}
+        self.events.append(event)
+        event_loop_blocks.inc(event["route"])
+        event_loop_block_duration.observe(duration, event["route"])
+        logger.warning(
+            "Цикл событий заблокирован на %.0f мс: %s %s\n%s",
+            event["duration_ms"], event["method"] or "", event["route"],
+            "".join(event["stack"]) or "(стек не снят)"
+        )
+
+    def culprits(self) -> List[Dict]:
+        """Маршруты, блокировавшие цикл, по убыванию суммарного времени блокировки"""
+        totals: Dict[str, Dict] = {}
+        for event in list(self.events):
+            item = totals.setdefault(event["route"], {"route": event["route"], "count": 0, "total_ms": 0.0})
+            item["count"] += 1
+            item["total_ms"] += event["duration_ms"]
+        return sorted(totals.values(), key=lambda item: item["total_ms"], reverse=True)
+
+
+class LoopWatchdogMiddleware:
+    """
+    ASGI-прослойка: связывает задачу цикла с scope обслуживаемого запроса.
+
+    Должна быть самой внутренней: BaseHTTPMiddleware выполняет вложенное
+    приложение в отдельной задаче, и маршрут нужен именно для нее.
+    """
+
+    def __init__(self, app, watchdog: "LoopWatchdog" = None):
+        self.app = app
+        self.watchdog = watchdog or loop_watchdog
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.watchdog.running:
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        self.watchdog.requests[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.watchdog.requests.pop(task, None)
+
+
+loop_watchdog = LoopWatchdog(settings.LOOP_BLOCK_THRESHOLD_MS, settings.LOOP_WATCHDOG_INTERVAL_MS)
@@ -0,0 +1,71 @@
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Query, Request, Response
+
+from app.core.config import settings
+
+
+def encode_cursor(last_id: int) -> str:
+    """Кодирование курсора (id последней записи страницы)"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Декодирование курсора, полученного от клиента"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def escape_like(value: str) -> str:
+    """Экранирование спецсимволов LIKE для фильтра по префиксу"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class PageParams:
+    """Параметры keyset-пагинации (курсор + размер страницы)"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Курсор следующей страницы"),
+        limit: int = Query(
+            settings.DEFAULT_PAGE_SIZE,
+            ge=1,
+            le=settings.MAX_PAGE_SIZE,
+            description="Размер страницы"
+        )
+    ):
+        self.after_id = decode_cursor(cursor) if cursor else None
+        self.limit = limit
+
+
+def keyset_page(query, id_column, after_id: Optional[int], limit: int):
+    """
+    Выборка одной страницы по ключу (WHERE id > :after ORDER BY id LIMIT n + 1).
+
+    Возвращает (записи, курсор следующей страницы или None).
+    Стоимость не зависит от глубины страницы, в отличие от OFFSET.
+    """
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+    return rows, next_cursor
+
+
+def set_next_link(request: Request, response: Response, next_cursor: Optional[str], limit: int):
+    """Добавление ссылки на следующую страницу в заголовки ответа"""
+    if not next_cursor:
+        return
+    next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
+    response.headers["X-Next-Cursor"] = next_cursor
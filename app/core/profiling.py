@@ -0,0 +1,178 @@
+"""
+Профилирование отдельных HTTP-запросов по требованию
+
+Запрос профилируется, если передан заголовок X-Profile со значением
+PROFILE_TOKEN (секрет администратора) или он попал в выборку
+PROFILE_SAMPLE_RATE. Профилировщик выборочный: отдельный поток с интервалом
+PROFILE_INTERVAL_MS снимает стеки всех потоков процесса (цикл событий и пул,
+где выполняются синхронные обработчики), простаивающие потоки отбрасываются.
+Результат - свернутые стеки (collapsed, формат flamegraph.pl / speedscope),
+по файлу на запрос в каталоге маршрута.
+
+Стеки снимаются со всего процесса: при параллельных запросах в профиль
+попадают и соседние запросы, поэтому на нагруженном процессе полезнее
+выборка (много профилей одного маршрута), чем единичный профиль.
+"""
+
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_EXTENSION = ".collapsed"
+
+# Листовые функции простаивающих потоков (ожидание задач, блокировок и ввода-вывода)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("base_events.py", "_run_once"),
+}
+
+_SLUG_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+
+
+def route_slug(route: str) -> str:
+    """Имя каталога маршрута: /auth/me -> auth_me, /roles/{role_id} -> roles_role_id"""
+    return _SLUG_UNSAFE.sub("_", route).strip("_") or "root"
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> Optional[str]:
+    """Стек потока в свернутом виде (от корня к листу); None для простаивающего потока"""
+    leaf = frame.f_code
+    if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Выборочный профилировщик стеков всех потоков процесса"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = collapse(frame)
+                if stack is not None:
+                    self.stacks[stack] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+
+class ProfileStore:
+    """Каталог профилей: <каталог>/<маршрут>/<время>-<метод>-<статус>-<мс>ms.collapsed"""
+
+    def __init__(self, directory: str, max_per_route: int = 100):
+        self.directory = directory
+        self.max_per_route = max_per_route
+        self._lock = threading.Lock()
+
+    def save(self, route: str, method: str, status_code: int, duration: float, stacks: Counter) -> str:
+        route_dir = os.path.join(self.directory, route_slug(route))
+        name = (f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{method}-{status_code}-"
+                f"{duration * 1000:.0f}ms{PROFILE_EXTENSION}")
+        with self._lock:
+            os.makedirs(route_dir, exist_ok=True)
+            path = os.path.join(route_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            self._prune(route_dir)
+        return path
+
+    def _prune(self, route_dir: str) -> None:
+        names = sorted(name for name in os.listdir(route_dir) if name.endswith(PROFILE_EXTENSION))
+        for name in names[:max(0, len(names) - self.max_per_route)]:
+            os.remove(os.path.join(route_dir, name))
+
+    def list(self) -> List[Dict]:
+        """Сохраненные профили, новые первыми"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for slug in sorted(os.listdir(self.directory)):
+            route_dir = os.path.join(self.directory, slug)
+            if not os.path.isdir(route_dir):
+                continue
+            for name in os.listdir(route_dir):
+                if name.endswith(PROFILE_EXTENSION):
+                    profiles.append({
+                        "route": slug,
+                        "name": name,
+                        "size": os.path.getsize(os.path.join(route_dir, name)),
+                    })
+        return sorted(profiles, key=lambda profile: profile["name"], reverse=True)
+
+    def path(self, slug: str, name: Optional[str] = None) -> Optional[str]:
+        """Путь к профилю (или каталогу маршрута) без выхода за пределы каталога профилей"""
+        if route_slug(slug) != slug or (name is not None and
+                                        (os.path.basename(name) != name or not name.endswith(PROFILE_EXTENSION))):
+            return None
+        path = os.path.join(self.directory, slug, *([name] if name else []))
+        return path if os.path.exists(path) else None
+
+    def merged(self, slug: str) -> Optional[str]:
+        """Все профили маршрута, сложенные в один (суммы по одинаковым стекам)"""
+        route_dir = self.path(slug)
+        if route_dir is None:
+            return None
+        total: Counter = Counter()
+        for name in os.listdir(route_dir):
+            if name.endswith(PROFILE_EXTENSION):
+                with open(os.path.join(route_dir, name), encoding="utf-8") as f:
+                    for line in f:
+                        stack, _, count = line.rstrip("\n").rpartition(" ")
+                        total[stack] += int(count)
+        return "".join(f"{stack} {count}\n" for stack, count in total.most_common())
+
+
+def should_profile(header_value: Optional[str]) -> bool:
+    """Профилировать ли запрос: по секрету администратора в заголовке или по выборке"""
+    if not settings.PROFILING_ENABLED:
+        return False
+    if header_value is not None and settings.PROFILE_TOKEN:
+        return secrets.compare_digest(header_value, settings.PROFILE_TOKEN)
+    return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+
+def start_profiler() -> SamplingProfiler:
+    return SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000).start()
+
+
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_PER_ROUTE)
@@ -0,0 +1,166 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import db_query_duration, route_template
+from app.core.slow_query import slow_query_log
+from app.core.tracing import child_span
+
+logger = logging.getLogger(__name__)
+
+# Опция выполнения, которой помечаются запросы для раздельного учета (например, "auth")
+QUERY_TAG_OPTION = "query_tag"
+
+_current_counter: ContextVar[Optional["QueryCounter"]] = ContextVar("query_counter", default=None)
+
+# Наблюдатели завершенных HTTP-запросов: (метод, шаблон маршрута, счетчик)
+_request_observers: List[Callable[[str, str, "QueryCounter"], None]] = []
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, выполненных в рамках одного HTTP-запроса"""
+
+    def __init__(self):
+        self.total = 0
+        self.by_tag: Dict[str, int] = {}
+        # Суммарное время выполнения запросов, секунды
+        self.seconds = 0.0
+        # Текст запроса -> число выполнений (параметры передаются отдельно,
+        # поэтому одинаковый текст - один и тот же запрос с разными значениями)
+        self.statements: Dict[str, int] = {}
+        # ASGI scope HTTP-запроса (маршрут известен после маршрутизации)
+        self.scope: Optional[dict] = None
+
+    def record(self, tag: Optional[str], statement: Optional[str] = None) -> None:
+        self.total += 1
+        if tag:
+            self.by_tag[tag] = self.by_tag.get(tag, 0) + 1
+        if statement is not None:
+            self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def count(self, tag: str) -> int:
+        return self.by_tag.get(tag, 0)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Запросы, выполненные не меньше threshold раз (признак N+1)"""
+        return {statement: n for statement, n in self.statements.items() if n >= threshold}
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Запрос превысил бюджет SQL-запросов или выполнил один запрос в цикле"""
+
+
+class QueryBudget:
+    """
+    Проверка бюджетов SQL-запросов по маршрутам.
+
+    Бюджеты задаются ключами "МЕТОД /шаблон/маршрута"; маршруты без бюджета
+    проверяются только на N+1 (повтор одного запроса не меньше repeat_threshold раз).
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, repeat_threshold: int = 3):
+        self.budgets = dict(budgets or {})
+        self.repeat_threshold = repeat_threshold
+        self.requests: List[Tuple[str, QueryCounter]] = []
+
+    def limit(self, route: str, queries: int) -> None:
+        self.budgets[route] = queries
+
+    def observe(self, method: str, route: str, counter: QueryCounter) -> None:
+        self.requests.append((f"{method} {route}", counter))
+
+    def violations(self) -> List[str]:
+        problems = []
+        for route, counter in self.requests:
+            budget = self.budgets.get(route)
+            if budget is not None and counter.total > budget:
+                problems.append(f"{route}: {counter.total} SQL-запросов при бюджете {budget}")
+            for statement, n in counter.repeated(self.repeat_threshold).items():
+                problems.append(f"{route}: N+1, запрос выполнен {n} раз: {statement[:120]}")
+        return problems
+
+    def check(self) -> None:
+        problems = self.violations()
+        if problems:
+            raise QueryBudgetExceeded("\n".join(problems))
+
+    @contextmanager
+    def watch(self) -> Iterator["QueryBudget"]:
+        """Сбор счетчиков HTTP-запросов, завершившихся внутри блока"""
+        _request_observers.append(self.observe)
+        try:
+            yield self
+        finally:
+            _request_observers.remove(self.observe)
+
+
+def notify_request(method: str, route: str, counter: QueryCounter, repeat_threshold: int) -> None:
+    """
+    Передача итогов HTTP-запроса наблюдателям; при повторе одного запроса
+    не меньше repeat_threshold раз пишется предупреждение о N+1.
+    """
+    repeated = counter.repeated(repeat_threshold) if repeat_threshold > 0 else {}
+    for statement, n in repeated.items():
+        logger.warning("Возможный N+1 в %s %s: запрос выполнен %d раз: %s", method, route, n, statement[:200])
+    for observer in list(_request_observers):
+        observer(method, route, counter)
+
+
+def current_counter() -> Optional[QueryCounter]:
+    """Счетчик текущего запроса (None вне запроса)"""
+    return _current_counter.get()
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Учет запросов внутри блока.
+
+    Счетчик хранится в contextvar и виден в потоках пула FastAPI,
+    куда контекст копируется при запуске синхронных обработчиков.
+    """
+    counter = QueryCounter()
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+def _query_tag(context) -> Optional[str]:
+    return context.execution_options.get(QUERY_TAG_OPTION) if context is not None else None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _on_before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        # Контекст выполнения свой у каждого запроса; при ошибке он просто отбрасывается
+        context._query_started = time.perf_counter()
+        context._trace_span = child_span("db.statement", {"db.statement": statement, "db.tag": _query_tag(context)})
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.record(_query_tag(context), statement)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _on_after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if context._trace_span is not None:
+        context._trace_span.set("db.rows", cursor.rowcount)
+        context._trace_span.finish()
+    db_query_duration.observe(elapsed, _query_tag(context) or "other")
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.seconds += elapsed
+    if slow_query_log.enabled and elapsed >= slow_query_log.threshold:
+        route = route_template(counter.scope) if counter is not None and counter.scope is not None else None
+        slow_query_log.observe(cursor, statement, parameters, elapsed, route, conn.dialect.name)
+
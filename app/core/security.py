@@ -1,16 +1,48 @@
+import hashlib
+import secrets
+import uuid
 from datetime import datetime, timedelta
 import jwt  # Используем PyJWT
 from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.metrics import password_hash_duration, jwt_duration
+from app.core.tracing import span, traced
 
 # Настройка для хеширования паролей
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
+@traced("security.verify_password")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with password_hash_duration.time("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
+@traced("security.get_password_hash")
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with password_hash_duration.time("hash"):
+        return pwd_context.hash(password)
+
+def hash_token(token: str) -> str:
+    """
+    Детерминированный хеш токена для хранения и поиска в БД.
+
+    Токены случайны и длинны, поэтому медленный соленый argon2 не нужен:
+    SHA-256 позволяет искать запись по равенству хеша.
+    """
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+# Префиксы непрозрачных токенов: тип определяется без обращения к БД
+OPAQUE_TOKEN_PREFIXES = {"access": "oat_", "refresh": "ort_"}
+
+def create_opaque_token(token_type: str) -> str:
+    """Непрозрачный токен: 256 случайных бит (43 символа base64url) с префиксом типа"""
+    return OPAQUE_TOKEN_PREFIXES[token_type] + secrets.token_urlsafe(32)
+
+def opaque_token_type(token: str):
+    """Тип непрозрачного токена по префиксу (None для JWT)"""
+    for token_type, prefix in OPAQUE_TOKEN_PREFIXES.items():
+        if token.startswith(prefix):
+            return token_type
+    return None
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -19,20 +51,24 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire, "type": "access"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    # jti делает каждый токен уникальным даже при выдаче в одну секунду
+    to_encode.update({"exp": expire, "type": "access", "jti": uuid.uuid4().hex})
+    with span("jwt.encode"), jwt_duration.time("encode"):
+        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    to_encode.update({"exp": expire, "type": "refresh", "jti": uuid.uuid4().hex})
+    with span("jwt.encode"), jwt_duration.time("encode"):
+        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        with span("jwt.decode"), jwt_duration.time("decode"):
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         return payload
     except jwt.InvalidTokenError:
         return None
\ No newline at end of file
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Журнал медленных SQL-запросов
+
+Запрос дольше SLOW_QUERY_MS записывается в ротируемый файл (JSON на строку):
+отпечаток нормализованного текста, текст, длительность, маршрут HTTP-запроса,
+типы параметров вместо значений (токены, хеши и e-mail в журнал не попадают)
+и план EXPLAIN QUERY PLAN, снятый на том же соединении.
+
+Сводка по отпечаткам: python -m app.core.slow_query logs/slow_queries.log
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Текст запроса без литералов и с одним ? вместо списков IN (?, ?, ...)"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint(statement: str) -> str:
+    """Короткий отпечаток нормализованного запроса"""
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:12]
+
+
+def _redact_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, (bool, int, float)):
+        return type(value).__name__
+    if isinstance(value, (datetime, date)):
+        return type(value).__name__
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def redact_parameters(parameters: Any) -> Any:
+    """Параметры запроса без значений: только типы и длины строк"""
+    if isinstance(parameters, dict):
+        return {name: _redact_value(value) for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany: формат первой строки и число строк
+            return {"rows": len(parameters), "first": redact_parameters(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def explain(cursor, statement: str, parameters: Any, dialect_name: str) -> Optional[List[str]]:
+    """
+    План запроса на том же DBAPI-соединении (новым курсором, минуя события SQLAlchemy).
+
+    Поддерживается SQLite (EXPLAIN QUERY PLAN); для остальных СУБД план не снимается.
+    """
+    if dialect_name != "sqlite" or not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+        return None
+    if isinstance(parameters, list) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+        parameters = parameters[0]
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        return [row[-1] for row in explain_cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN не выполнен: {e}"]
+    finally:
+        explain_cursor.close()
+
+
+class SlowQueryLog:
+    """Запись медленных запросов в ротируемый файл и сводка по отпечаткам в памяти"""
+
+    def __init__(
+        self,
+        threshold_ms: float,
+        path: str,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        capture_plan: bool = True
+    ):
+        self.threshold = threshold_ms / 1000
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.capture_plan = capture_plan
+        self._lock = threading.Lock()
+        self._logger: Optional[logging.Logger] = None
+        # Отпечаток -> сводка
+        self.summary: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def _get_logger(self) -> logging.Logger:
+        # Файл открывается при первом медленном запросе
+        if self._logger is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger(f"{__name__}.{id(self)}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def observe(self, cursor, statement: str, parameters: Any, elapsed: float,
+                route: Optional[str], dialect_name: str) -> Optional[Dict[str, Any]]:
+        """Учет выполненного запроса; возвращает запись журнала, если запрос медленный"""
+        if not self.enabled or elapsed < self.threshold:
+            return None
+        entry = {
+            "ts": datetime.utcnow().isoformat(),
+            "fingerprint": fingerprint(statement),
+            "duration_ms": round(elapsed * 1000, 3),
+            "route": route,
+            "statement": normalize_statement(statement),
+            "parameters": redact_parameters(parameters),
+            "plan": explain(cursor, statement, parameters, dialect_name) if self.capture_plan else None,
+        }
+        with self._lock:
+            self._get_logger().info(json.dumps(entry, ensure_ascii=False))
+            _add_to_summary(self.summary, entry)
+        return entry
+
+    def close(self) -> None:
+        with self._lock:
+            if self._logger is not None:
+                for handler in list(self._logger.handlers):
+                    handler.close()
+                    self._logger.removeHandler(handler)
+                self._logger = None
+
+
+def _add_to_summary(summary: Dict[str, Dict[str, Any]], entry: Dict[str, Any]) -> None:
+    item = summary.get(entry["fingerprint"])
+    if item is None:
+        item = summary[entry["fingerprint"]] = {
+            "statement": entry["statement"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "routes": set(), "plan": entry.get("plan"),
+        }
+    item["count"] += 1
+    item["total_ms"] += entry["duration_ms"]
+    item["max_ms"] = max(item["max_ms"], entry["duration_ms"])
+    if entry.get("route"):
+        item["routes"].add(entry["route"])
+
+
+def summarize(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Сводка журнала по отпечаткам, по убыванию суммарного времени"""
+    summary: Dict[str, Dict[str, Any]] = {}
+    for line in lines:
+        if line.strip():
+            _add_to_summary(summary, json.loads(line))
+    return sorted(
+        ({"fingerprint": key, **item, "routes": sorted(item["routes"])} for key, item in summary.items()),
+        key=lambda item: item["total_ms"], reverse=True
+    )
+
+
+def read_log(path: str) -> Iterable[str]:
+    """Строки журнала вместе с ротированными файлами (от старых к новым)"""
+    # Ротированные копии - path.1 ... path.N; прочие файлы рядом (path.bak, path.lock) пропускаются
+    rotated = [name for name in glob.glob(path + ".*") if name[len(path) + 1:].isdigit()]
+    rotated.sort(key=lambda name: -int(name[len(path) + 1:]))
+    for name in rotated + [path]:
+        if os.path.exists(name):
+            with open(name, encoding="utf-8") as f:
+                yield from f
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_MS,
+    settings.SLOW_QUERY_LOG_PATH,
+    settings.SLOW_QUERY_LOG_MAX_BYTES,
+    settings.SLOW_QUERY_LOG_BACKUPS,
+    settings.SLOW_QUERY_EXPLAIN,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сводка журнала медленных запросов")
+    parser.add_argument("path", nargs="?", default=settings.SLOW_QUERY_LOG_PATH)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    print("🐢 МЕДЛЕННЫЕ ЗАПРОСЫ ПО ОТПЕЧАТКАМ")
+    print("-" * 40)
+    for item in summarize(read_log(args.path))[:args.top]:
+        print(f"{item['fingerprint']}  x{item['count']}  всего {item['total_ms']:.0f} мс, "
+              f"макс {item['max_ms']:.0f} мс  {', '.join(item['routes'])}")
+        print(f"   {item['statement'][:200]}")
+        for step in item["plan"] or []:
+            print(f"   📋 {step}")
+
+
+if __name__ == "__main__":
+    main()
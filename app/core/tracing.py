@@ -0,0 +1,214 @@
+"""
+Локальная трассировка запросов (спаны в файл JSON Lines)
+
+Трасса начинается в прослойке HTTP: идентификатор трассы и родительский
+спан берутся из заголовка W3C traceparent, решение о записи - из его флага
+sampled, а без заголовка - по доле TRACE_SAMPLE_RATE (head sampling: решение
+принимается один раз в начале запроса). Спаны методов AuthService, проверки
+разрешений, argon2, JWT и SQL-запросов создаются только внутри записываемой
+трассы; вне ее span() возвращает общий пустой объект, а traced() сразу
+вызывает функцию - цена отключенной трассировки - одно чтение contextvar.
+
+Завершенная трасса пишется в TRACE_LOG_PATH по спану на строку (поля
+в духе OTLP: trace_id, span_id, parent_span_id, время в наносекундах).
+"""
+
+import functools
+import json
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+TRACEPARENT_HEADER = "traceparent"
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("trace_span", default=None)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace_id, parent_span_id, sampled) из заголовка traceparent; None, если заголовок некорректен"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, parent_id, flags = match.groups()
+    if version == "ff" or trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+class Trace:
+    """Спаны одной трассы; время спанов отсчитывается от начала трассы"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans: List["Span"] = []
+        self._wall_ns = time.time_ns()
+        self._started = time.perf_counter()
+
+    def unix_nano(self, perf: float) -> int:
+        return self._wall_ns + int((perf - self._started) * 1_000_000_000)
+
+
+class Span:
+    """Спан трассы; в блоке with становится текущим (родителем вложенных спанов)"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "attributes", "status", "start", "end", "_token")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.name = name
+        # Идентификаторы спанов не секретны: быстрый ГПСЧ вместо os.urandom
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.status = "ok"
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self._token = None
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.end = time.perf_counter()
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = type(error).__name__
+        self.trace.spans.append(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        self.finish(exc)
+        return False
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.trace.unix_nano(self.start),
+            "end_time_unix_nano": self.trace.unix_nano(self.end if self.end is not None else self.start),
+            "duration_ms": round(((self.end or self.start) - self.start) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Пустой спан вне записываемой трассы"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """Вложенный спан текущей трассы (для with); вне трассы - пустой спан"""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def child_span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+    """
+    Дочерний спан без смены текущего (для событий до/после, как у SQL-запросов);
+    завершается вызовом finish(). Вне трассы - None.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def traced(name: str):
+    """Декоратор: вызов функции внутри трассы записывается спаном name"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return func(*args, **kwargs)
+            with Span(parent.trace, name, parent.span_id):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class JsonLinesSink:
+    """Запись спанов в файл: объект JSON на строку"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in spans)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class Tracer:
+    """Решение о записи трассы запроса и выгрузка завершенных трасс"""
+
+    def __init__(self, enabled: bool, sample_rate: float, sink: JsonLinesSink):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.sink = sink
+
+    def start_request(self, traceparent: Optional[str], name: str,
+                      attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Корневой спан запроса или None, если трасса не записывается"""
+        if not self.enabled:
+            return None
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = None, None
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        if not sampled:
+            return None
+        return Span(Trace(trace_id), name, parent_id, attributes)
+
+    def export(self, root: Span) -> None:
+        self.sink.export(root.trace.spans)
+
+
+tracer = Tracer(settings.TRACING_ENABLED, settings.TRACE_SAMPLE_RATE, JsonLinesSink(settings.TRACE_LOG_PATH))
@@ -0,0 +1,64 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Ключ session.info с глубиной вложенности единиц работы
+UOW_DEPTH_KEY = "uow_depth"
+# Ключ session.info с действиями, отложенными до коммита текущей транзакции
+ON_COMMIT_KEY = "on_commit"
+
+
+def in_unit_of_work(db: Session) -> bool:
+    """Выполняется ли код внутри единицы работы"""
+    return db.info.get(UOW_DEPTH_KEY, 0) > 0
+
+
+@contextmanager
+def unit_of_work(db: Session, savepoint: bool = False) -> Iterator[Session]:
+    """
+    Единица работы: одна транзакция и один коммит на бизнес-операцию.
+
+    Внешний блок коммитит при успешном завершении и откатывает при исключении.
+    Вложенные блоки (например, create_tokens внутри refresh_tokens) присоединяются
+    к внешней транзакции; с savepoint=True вложенный блок выполняется в точке
+    сохранения, и его откат не затрагивает остальную операцию.
+    """
+    depth = db.info.get(UOW_DEPTH_KEY, 0)
+    db.info[UOW_DEPTH_KEY] = depth + 1
+    try:
+        if depth and savepoint:
+            with db.begin_nested():
+                yield db
+        else:
+            yield db
+        if depth == 0:
+            db.commit()
+    except BaseException:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[UOW_DEPTH_KEY] = depth
+
+
+def on_commit(db: Session, action: Callable[[], object]) -> None:
+    """
+    Выполнение действия после коммита текущей транзакции сессии.
+
+    Для изменений вне БД (внешние хранилища), которые нельзя откатить
+    вместе с транзакцией: при откате действие отбрасывается.
+    """
+    db.info.setdefault(ON_COMMIT_KEY, []).append(action)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session):
+    for action in session.info.pop(ON_COMMIT_KEY, ()):
+        action()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(ON_COMMIT_KEY, None)
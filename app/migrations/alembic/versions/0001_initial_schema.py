@@ -0,0 +1,176 @@
+"""Initial schema: users, tokens, roles, permissions, policy versions
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 14:04:02.078531
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _existing_indexes(table_name):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table_name):
+        return set()
+    return {index["name"] for index in inspector.get_indexes(table_name)}
+
+
+def _create_table(name, *columns):
+    """Создание таблицы, если ее еще нет (БД, созданные до Alembic через create_all)"""
+    if not sa.inspect(op.get_bind()).has_table(name):
+        op.create_table(name, *columns)
+
+
+def _create_index(batch_op, name, columns, unique):
+    if name not in _existing_indexes(batch_op.impl.table_name):
+        batch_op.create_index(name, columns, unique=unique)
+
+
+def upgrade() -> None:
+    _create_table('permissions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_by', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('permissions', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_permissions_code'), ['code'], unique=True)
+        _create_index(batch_op, batch_op.f('ix_permissions_id'), ['id'], unique=False)
+        _create_index(batch_op, batch_op.f('ix_permissions_name'), ['name'], unique=True)
+
+    _create_table('policy_versions',
+    sa.Column('scope', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope')
+    )
+    _create_table('roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('code', sa.String(length=50), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_by', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_roles_code'), ['code'], unique=True)
+        _create_index(batch_op, batch_op.f('ix_roles_id'), ['id'], unique=False)
+        _create_index(batch_op, batch_op.f('ix_roles_name'), ['name'], unique=True)
+
+    _create_table('tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('token_type', sa.String(length=20), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tokens', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_tokens_id'), ['id'], unique=False)
+
+    _create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('birthday', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_users_email'), ['email'], unique=True)
+        _create_index(batch_op, batch_op.f('ix_users_id'), ['id'], unique=False)
+        _create_index(batch_op, batch_op.f('ix_users_username'), ['username'], unique=True)
+    # Нормализованные индексы для регистронезависимого поиска
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        _create_index(batch_op, 'ix_users_username_lower', [sa.text('lower(username)')], unique=False)
+        _create_index(batch_op, 'ix_users_email_lower', [sa.text('lower(email)')], unique=False)
+
+    _create_table('roles_and_permissions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('role_id', sa.Integer(), nullable=False),
+    sa.Column('permission_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_by', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['permission_id'], ['permissions.id'], ),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('roles_and_permissions', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_roles_and_permissions_id'), ['id'], unique=False)
+
+    _create_table('users_and_roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('role_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.Column('deleted_by', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('users_and_roles', schema=None) as batch_op:
+        _create_index(batch_op, batch_op.f('ix_users_and_roles_id'), ['id'], unique=False)
+        _create_index(batch_op, 'ix_users_and_roles_user_id_id', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users_and_roles', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_and_roles_user_id_id')
+        batch_op.drop_index(batch_op.f('ix_users_and_roles_id'))
+
+    op.drop_table('users_and_roles')
+    with op.batch_alter_table('roles_and_permissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_roles_and_permissions_id'))
+
+    op.drop_table('roles_and_permissions')
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_username_lower', table_name='users')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_username'))
+        batch_op.drop_index(batch_op.f('ix_users_id'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    op.drop_table('users')
+    with op.batch_alter_table('tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tokens_id'))
+
+    op.drop_table('tokens')
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_roles_name'))
+        batch_op.drop_index(batch_op.f('ix_roles_id'))
+        batch_op.drop_index(batch_op.f('ix_roles_code'))
+
+    op.drop_table('roles')
+    op.drop_table('policy_versions')
+    with op.batch_alter_table('permissions', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_permissions_name'))
+        batch_op.drop_index(batch_op.f('ix_permissions_id'))
+        batch_op.drop_index(batch_op.f('ix_permissions_code'))
+
+    op.drop_table('permissions')
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Index tokens.token_hash for lookups by SHA-256 digest
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 16:20:41.512307
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes('tokens')}
+    if 'ix_tokens_token_hash' not in indexes:
+        with op.batch_alter_table('tokens', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_tokens_token_hash'), ['token_hash'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tokens_token_hash'))
@@ -0,0 +1,46 @@
+"""Refresh token families and tokens.family_id
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 17:05:12.384190
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('refresh_families'):
+        op.create_table('refresh_families',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('refresh_families', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_refresh_families_user_id'), ['user_id'], unique=False)
+
+    if 'family_id' not in {column['name'] for column in inspector.get_columns('tokens')}:
+        with op.batch_alter_table('tokens', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('family_id', sa.String(length=32), nullable=True))
+            batch_op.create_index(batch_op.f('ix_tokens_family_id'), ['family_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tokens_family_id'))
+        batch_op.drop_column('family_id')
+
+    with op.batch_alter_table('refresh_families', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_refresh_families_user_id'))
+
+    op.drop_table('refresh_families')
@@ -0,0 +1,27 @@
+"""Unique index on lower(username)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 19:12:37.640218
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Имена, различающиеся только регистром, запрещены на уровне БД: проверка
+    # в register_user больше не единственная защита от гонки. Индексы по выражениям
+    # SQLite не отражает, поэтому прежний индекс удаляется через IF EXISTS
+    op.drop_index('ix_users_username_lower', table_name='users', if_exists=True)
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_username_lower', table_name='users', if_exists=True)
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Загрузка политики доступа из декларативного файла (policy-as-code)
+
+Формат документа (YAML или JSON):
+
+    permissions:
+      - code: read-user
+        name: Read user
+        description: ...
+    roles:
+      - code: admin
+        name: Администратор
+        permissions: "*"            # или список кодов разрешений
+    prune: false                    # мягко удалять то, чего нет в документе
+
+Документ сравнивается с БД (по одному запросу на таблицу), после чего
+применяется минимальный набор пакетных INSERT/UPDATE в одной транзакции.
+
+Запуск: python -m app.migrations.policy_loader policy.yaml [--dry-run]
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+# Добавляем путь для импортов
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from sqlalchemy import insert, update, bindparam
+from sqlalchemy.orm import Session
+
+from app.core.etag import bump_version
+from app.models.role import Role, Permission, RolePermission
+
+# Поля справочников, которые синхронизируются из документа
+SYNC_FIELDS = ("name", "description")
+
+
+@dataclass
+class EntityPlan:
+    """План изменений одной таблицы-справочника"""
+    create: List[Dict[str, Any]] = field(default_factory=list)
+    update: List[Dict[str, Any]] = field(default_factory=list)
+    delete: List[int] = field(default_factory=list)
+
+
+@dataclass
+class PolicyPlan:
+    """Полный план применения политики"""
+    permissions: EntityPlan = field(default_factory=EntityPlan)
+    roles: EntityPlan = field(default_factory=EntityPlan)
+    grants_create: List[Tuple[str, str]] = field(default_factory=list)
+    grants_restore: List[int] = field(default_factory=list)
+    grants_delete: List[int] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not any([
+            self.permissions.create, self.permissions.update, self.permissions.delete,
+            self.roles.create, self.roles.update, self.roles.delete,
+            self.grants_create, self.grants_restore, self.grants_delete,
+        ])
+
+    def describe(self) -> List[str]:
+        """Человекочитаемое описание плана"""
+        lines = []
+        for title, plan in (("Разрешения", self.permissions), ("Роли", self.roles)):
+            lines.append(
+                f"{title}: +{len(plan.create)} ~{len(plan.update)} -{len(plan.delete)}"
+            )
+            lines.extend(f"   + {item['code']}" for item in plan.create)
+            lines.extend(f"   ~ {item['code']}" for item in plan.update)
+        lines.append(
+            f"Связи роль-разрешение: +{len(self.grants_create) + len(self.grants_restore)} "
+            f"-{len(self.grants_delete)}"
+        )
+        lines.extend(f"   + {role} -> {perm}" for role, perm in self.grants_create)
+        return lines
+
+
+def load_document(path: str) -> Dict[str, Any]:
+    """Чтение документа политики из YAML/JSON файла"""
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("Для YAML-файлов требуется пакет PyYAML")
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+
+def _validate_document(document: Dict[str, Any]) -> None:
+    """Проверка структуры документа"""
+    permission_codes = set()
+    for item in document.get("permissions", []):
+        if not item.get("code") or not item.get("name"):
+            raise ValueError(f"У разрешения должны быть code и name: {item}")
+        if item["code"] in permission_codes:
+            raise ValueError(f"Дублирующийся код разрешения: {item['code']}")
+        permission_codes.add(item["code"])
+
+    role_codes = set()
+    for item in document.get("roles", []):
+        if not item.get("code") or not item.get("name"):
+            raise ValueError(f"У роли должны быть code и name: {item}")
+        if item["code"] in role_codes:
+            raise ValueError(f"Дублирующийся код роли: {item['code']}")
+        role_codes.add(item["code"])
+
+
+def _load_rows(db: Session, model) -> Dict[str, Any]:
+    """Все записи справочника (code -> строка) одним запросом"""
+    columns = (model.id, model.code, model.name, model.description, model.is_active)
+    return {row.code: row for row in db.query(*columns)}
+
+
+def _plan_entities(existing: Dict[str, Any], desired: List[Dict[str, Any]], prune: bool) -> EntityPlan:
+    """Вычисление вставок, обновлений и мягких удалений справочника"""
+    plan = EntityPlan()
+    for item in desired:
+        values = {name: item.get(name) for name in SYNC_FIELDS}
+        row = existing.get(item["code"])
+        if row is None:
+            plan.create.append({"code": item["code"], **values})
+        elif not row.is_active or any(getattr(row, name) != value for name, value in values.items()):
+            plan.update.append({"b_id": row.id, "code": item["code"], **values})
+
+    if prune:
+        desired_codes = {item["code"] for item in desired}
+        plan.delete = [
+            row.id for code, row in existing.items() if row.is_active and code not in desired_codes
+        ]
+    return plan
+
+
+def build_plan(db: Session, document: Dict[str, Any]) -> PolicyPlan:
+    """Построение плана изменений: по одному запросу на каждую таблицу"""
+    _validate_document(document)
+    prune = bool(document.get("prune", False))
+    desired_permissions = document.get("permissions", [])
+    desired_roles = document.get("roles", [])
+
+    existing_permissions = _load_rows(db, Permission)
+    existing_roles = _load_rows(db, Role)
+
+    plan = PolicyPlan(
+        permissions=_plan_entities(existing_permissions, desired_permissions, prune),
+        roles=_plan_entities(existing_roles, desired_roles, prune),
+    )
+
+    # Текущие связи роль-разрешение в терминах кодов
+    permission_codes = {row.id: code for code, row in existing_permissions.items()}
+    role_codes = {row.id: code for code, row in existing_roles.items()}
+    existing_grants = {}
+    for grant in db.query(RolePermission.id, RolePermission.role_id,
+                          RolePermission.permission_id, RolePermission.is_active):
+        key = (role_codes.get(grant.role_id), permission_codes.get(grant.permission_id))
+        # При дублях приоритет у активной записи
+        if key not in existing_grants or grant.is_active:
+            existing_grants[key] = grant
+
+    # "*" - все разрешения документа; явные коды могут ссылаться и на уже существующие
+    # в БД активные разрешения (кроме удаляемых при prune)
+    all_permission_codes = [item["code"] for item in desired_permissions]
+    known_codes = set(all_permission_codes)
+    if not prune:
+        known_codes |= {code for code, row in existing_permissions.items() if row.is_active}
+    desired_grants = set()
+    for role in desired_roles:
+        grants = role.get("permissions", [])
+        codes = all_permission_codes if grants == "*" else grants
+        inactive = {code for code in set(codes) - known_codes if code in existing_permissions}
+        if inactive:
+            raise ValueError(
+                f"Роль {role['code']} ссылается на удаленные разрешения: {sorted(inactive)} "
+                f"(добавьте их в документ, чтобы восстановить)"
+            )
+        unknown = set(codes) - known_codes
+        if unknown:
+            raise ValueError(f"Роль {role['code']} ссылается на неизвестные разрешения: {sorted(unknown)}")
+        desired_grants.update((role["code"], code) for code in codes)
+
+    for key in sorted(desired_grants):
+        grant = existing_grants.get(key)
+        if grant is None:
+            plan.grants_create.append(key)
+        elif not grant.is_active:
+            plan.grants_restore.append(grant.id)
+
+    if prune:
+        # Связи удаляемых ролей и разрешений отключаются вместе с ними
+        managed_roles = {role["code"] for role in desired_roles}
+        deleted_role_ids = set(plan.roles.delete)
+        deleted_permission_ids = set(plan.permissions.delete)
+        pruned_roles = {code for code, row in existing_roles.items() if row.id in deleted_role_ids}
+        pruned_permissions = {
+            code for code, row in existing_permissions.items() if row.id in deleted_permission_ids
+        }
+        plan.grants_delete = [
+            grant.id for key, grant in existing_grants.items()
+            if grant.is_active and key not in desired_grants
+            and (key[0] in managed_roles or key[0] in pruned_roles or key[1] in pruned_permissions)
+        ]
+    return plan
+
+
+def _apply_entities(db: Session, model, plan: EntityPlan, actor_id: int, now: datetime) -> None:
+    """Пакетное применение плана справочника"""
+    table = model.__table__
+    if plan.create:
+        db.execute(insert(table), [
+            {**item, "created_by": actor_id, "created_at": now, "is_active": True}
+            for item in plan.create
+        ])
+    if plan.update:
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                name=bindparam("name"), description=bindparam("description"),
+                is_active=True, deleted_at=None, deleted_by=None
+            ),
+            [{"b_id": item["b_id"], "name": item["name"], "description": item["description"]}
+             for item in plan.update]
+        )
+    if plan.delete:
+        db.execute(
+            update(table).where(table.c.id.in_(plan.delete)).values(
+                is_active=False, deleted_at=now, deleted_by=actor_id
+            )
+        )
+
+
+def apply_plan(db: Session, plan: PolicyPlan, actor_id: int = 1, commit: bool = True) -> None:
+    """
+    Применение плана в одной транзакции.
+
+    commit=False оставляет изменения в транзакции сессии: коммит и откат -
+    на вызывающем (например, сиды добавляют администратора в ту же транзакцию).
+    """
+    if plan.is_empty:
+        return
+    now = datetime.utcnow()
+    try:
+        _apply_entities(db, Permission, plan.permissions, actor_id, now)
+        _apply_entities(db, Role, plan.roles, actor_id, now)
+
+        grants = RolePermission.__table__
+        if plan.grants_create:
+            # id новых ролей и разрешений известны только после вставки
+            role_ids = {code: row_id for row_id, code in db.query(Role.id, Role.code)}
+            permission_ids = {code: row_id for row_id, code in db.query(Permission.id, Permission.code)}
+            db.execute(insert(grants), [
+                {"role_id": role_ids[role], "permission_id": permission_ids[perm],
+                 "created_by": actor_id, "created_at": now, "is_active": True}
+                for role, perm in plan.grants_create
+            ])
+        if plan.grants_restore:
+            db.execute(
+                update(grants).where(grants.c.id.in_(plan.grants_restore)).values(
+                    is_active=True, deleted_at=None, deleted_by=None
+                )
+            )
+        if plan.grants_delete:
+            db.execute(
+                update(grants).where(grants.c.id.in_(plan.grants_delete)).values(
+                    is_active=False, deleted_at=now, deleted_by=actor_id
+                )
+            )
+
+        bump_version(db)
+        if commit:
+            db.commit()
+    except Exception:
+        if commit:
+            db.rollback()
+        raise
+
+
+def sync_policy(db: Session, document: Dict[str, Any], dry_run: bool = False, actor_id: int = 1,
+                commit: bool = True) -> PolicyPlan:
+    """Синхронизация БД с документом политики"""
+    plan = build_plan(db, document)
+    if not dry_run:
+        apply_plan(db, plan, actor_id, commit)
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Применение политики доступа из файла")
+    parser.add_argument("path", help="YAML/JSON документ политики")
+    parser.add_argument("--dry-run", action="store_true", help="Только показать план")
+    parser.add_argument("--actor-id", type=int, default=1, help="ID автора изменений")
+    args = parser.parse_args()
+
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        plan = sync_policy(db, load_document(args.path), dry_run=args.dry_run, actor_id=args.actor_id)
+        print("📋 ПЛАН ИЗМЕНЕНИЙ ПОЛИТИКИ" + (" (dry-run)" if args.dry_run else ""))
+        print("-" * 40)
+        for line in plan.describe():
+            print(line)
+        if plan.is_empty:
+            print("ℹ️  Изменений нет")
+        elif not args.dry_run:
+            print("✅ Политика применена")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
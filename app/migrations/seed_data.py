@@ -1,200 +1,241 @@
-from sqlalchemy.orm import Session
-from datetime import date
-import sys
+"""
+Начальные данные: роли, разрешения, их связи и администратор
+
+Роли, разрешения и связи (SEED_ROLES, SEED_PERMISSIONS, SEED_GRANTS)
+загружаются через policy_loader: существующие записи читаются одним
+запросом на таблицу, недостающие вставляются пакетно в одной транзакции,
+поэтому повторный запуск ничего не меняет.
+
+Снимок заполненной БД (SQLite backup API) позволяет пересоздавать
+тестовую и рабочую БД копированием страниц вместо миграций и сидов:
+см. save_snapshot / restore_snapshot и reset_and_seed.py.
+"""
+
+import hashlib
+import json
 import os
+import sqlite3
+import sys
+from datetime import date
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
 
 # Добавляем путь для импортов
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
-from app.core.database import SessionLocal
-from app.models.role import Role, Permission, RolePermission, UserRole
+from app.core.database import SessionLocal, SCHEMA_REVISION, engine
+from app.migrations.policy_loader import sync_policy
+from app.models.role import Role, Permission, UserRole
 from app.models.user import User
 from app.core.security import get_password_hash
 
+ADMIN_USERNAME = "Admin"
+ADMIN_EMAIL = "admin@example.com"
+ADMIN_PASSWORD = "Admin123!"
+
+SNAPSHOT_DIR = "./.seed_snapshots"
+
+
+def _entity_permissions():
+    entities = ["user", "role", "permission"]
+    actions = ["get-list", "read", "create", "update", "delete", "restore"]
+    return [
+        {
+            "name": f"{action.replace('-', ' ').title()} {entity}",
+            "code": f"{action}-{entity}",
+            "description": f"Разрешение на {action} для {entity}"
+        }
+        for entity in entities
+        for action in actions
+    ]
+
+
+SEED_ROLES = [
+    {"name": "Администратор", "code": "admin", "description": "Полный доступ ко всем функциям"},
+    {"name": "Пользователь", "code": "user", "description": "Обычный пользователь"},
+    {"name": "Гость", "code": "guest", "description": "Ограниченный доступ"}
+]
+
+SEED_PERMISSIONS = _entity_permissions() + [
+    # Специальные разрешения
+    {"name": "Manage User Roles", "code": "manage-user-roles", "description": "Управление ролями пользователей"},
+    {"name": "Manage Role Permissions", "code": "manage-role-permissions", "description": "Управление разрешениями ролей"},
+    {"name": "View Profiles", "code": "view-profiles", "description": "Просмотр профилей запросов"}
+]
+
+# Разрешения ролей; "*" у администратора - все разрешения, включая созданные вне сидов
+SEED_GRANTS = {
+    "admin": "*",
+    "user": ["get-list-user", "read-user", "update-user"],
+    "guest": ["get-list-user"],
+}
+
+
+def seed_policy(db: Session) -> Dict[str, Any]:
+    """Полный документ политики сидов для policy_loader"""
+    # policy_loader раскрывает "*" только в разрешения документа, а администратор
+    # получает и уже существующие в БД активные (один запрос)
+    all_codes = sorted({item["code"] for item in SEED_PERMISSIONS} | {
+        code for (code,) in db.query(Permission.code).filter(Permission.is_active == True)
+    })
+    return {
+        "permissions": SEED_PERMISSIONS,
+        "roles": [
+            {**role, "permissions": all_codes if SEED_GRANTS[role["code"]] == "*" else SEED_GRANTS[role["code"]]}
+            for role in SEED_ROLES
+        ],
+    }
+
+
 def create_initial_roles(db: Session):
     """Создание начальных ролей"""
     print("Создание начальных ролей...")
-    
-    roles_data = [
-        {"name": "Администратор", "code": "admin", "description": "Полный доступ ко всем функциям"},
-        {"name": "Пользователь", "code": "user", "description": "Обычный пользователь"},
-        {"name": "Гость", "code": "guest", "description": "Ограниченный доступ"}
-    ]
-    
-    for role_data in roles_data:
-        existing_role = db.query(Role).filter(Role.code == role_data["code"]).first()
-        if not existing_role:
-            role = Role(
-                name=role_data["name"],
-                code=role_data["code"],
-                description=role_data["description"],
-                created_by=1
-            )
-            db.add(role)
-    
-    db.commit()
-    print("Роли созданы успешно!")
+    plan = sync_policy(db, {"roles": SEED_ROLES})
+    print(f"Роли созданы успешно! (новых: {len(plan.roles.create)})")
+
 
 def create_initial_permissions(db: Session):
     """Создание начальных разрешений"""
     print("Создание начальных разрешений...")
-    
-    entities = ["user", "role", "permission"]
-    actions = ["get-list", "read", "create", "update", "delete", "restore"]
-    
-    permissions_data = []
-    
-    for entity in entities:
-        for action in actions:
-            permissions_data.append({
-                "name": f"{action.replace('-', ' ').title()} {entity}",
-                "code": f"{action}-{entity}",
-                "description": f"Разрешение на {action} для {entity}"
-            })
-    
-    # Специальные разрешения
-    permissions_data.extend([
-        {"name": "Manage User Roles", "code": "manage-user-roles", "description": "Управление ролями пользователей"},
-        {"name": "Manage Role Permissions", "code": "manage-role-permissions", "description": "Управление разрешениями ролей"}
-    ])
-    
-    for perm_data in permissions_data:
-        existing_perm = db.query(Permission).filter(Permission.code == perm_data["code"]).first()
-        if not existing_perm:
-            permission = Permission(
-                name=perm_data["name"],
-                code=perm_data["code"],
-                description=perm_data["description"],
-                created_by=1
-            )
-            db.add(permission)
-    
-    db.commit()
-    print("Разрешения созданы успешно!")
+    plan = sync_policy(db, {"permissions": SEED_PERMISSIONS})
+    print(f"Разрешения созданы успешно! (новых: {len(plan.permissions.create)})")
+
 
 def assign_permissions_to_roles(db: Session):
     """Назначение разрешений ролям"""
     print("Назначение разрешений ролям...")
-    
-    # Получаем роли
-    admin_role = db.query(Role).filter(Role.code == "admin").first()
-    user_role = db.query(Role).filter(Role.code == "user").first()
-    guest_role = db.query(Role).filter(Role.code == "guest").first()
-    
-    if not admin_role or not user_role or not guest_role:
-        print("Ошибка: не все роли созданы")
-        return
-    
-    # Получаем все разрешения
-    all_permissions = db.query(Permission).all()
-    
-    # Админ получает все разрешения
-    for permission in all_permissions:
-        existing = db.query(RolePermission).filter(
-            RolePermission.role_id == admin_role.id,
-            RolePermission.permission_id == permission.id
-        ).first()
-        if not existing:
-            role_perm = RolePermission(
-                role_id=admin_role.id,
-                permission_id=permission.id,
-                created_by=1
-            )
-            db.add(role_perm)
-    
-    # Пользователь получает базовые разрешения для пользователей
-    user_permissions = db.query(Permission).filter(
-        Permission.code.in_(["get-list-user", "read-user", "update-user"])
-    ).all()
-    
-    for permission in user_permissions:
-        existing = db.query(RolePermission).filter(
-            RolePermission.role_id == user_role.id,
-            RolePermission.permission_id == permission.id
-        ).first()
-        if not existing:
-            role_perm = RolePermission(
-                role_id=user_role.id,
-                permission_id=permission.id,
-                created_by=1
-            )
-            db.add(role_perm)
-    
-    # Гость получает только получение списка пользователей
-    guest_permission = db.query(Permission).filter(Permission.code == "get-list-user").first()
-    if guest_permission:
-        existing = db.query(RolePermission).filter(
-            RolePermission.role_id == guest_role.id,
-            RolePermission.permission_id == guest_permission.id
-        ).first()
-        if not existing:
-            role_perm = RolePermission(
-                role_id=guest_role.id,
-                permission_id=guest_permission.id,
-                created_by=1
-            )
-            db.add(role_perm)
-    
-    db.commit()
-    print("Разрешения назначены ролям успешно!")
-
-def create_admin_user(db: Session):
-    """Создание администратора и назначение ему роли"""
+    # Документ содержит и роли: недостающие создаются вместе со связями
+    plan = sync_policy(db, seed_policy(db))
+    print(f"Разрешения назначены ролям успешно! (новых связей: {len(plan.grants_create)})")
+
+
+def create_admin_user(db: Session, commit: bool = True):
+    """Создание администратора и назначение ему роли (одна транзакция; commit=False - в транзакции вызывающего)"""
     print("Создание администратора...")
-    
-    # Создаем администратора
-    admin_user = db.query(User).filter(User.username == "Admin").first()
-    if not admin_user:
+
+    admin_user = db.query(User).filter(User.username == ADMIN_USERNAME).first()
+    admin_role_id = db.query(Role.id).filter(Role.code == "admin").scalar()
+    if admin_user is None:
+        # argon2 - только при создании: повторный запуск не хеширует пароль
         admin_user = User(
-            username="Admin",
-            email="admin@example.com",
-            password_hash=get_password_hash("Admin123!"),
+            username=ADMIN_USERNAME,
+            email=ADMIN_EMAIL,
+            password_hash=get_password_hash(ADMIN_PASSWORD),
             birthday=date(2000, 1, 1)
         )
         db.add(admin_user)
-        db.commit()
-        db.refresh(admin_user)
+        db.flush()
         print(f"Администратор создан с ID: {admin_user.id}")
     else:
         print(f"Администратор уже существует с ID: {admin_user.id}")
-    
-    # Назначаем роль администратора
-    admin_role = db.query(Role).filter(Role.code == "admin").first()
-    if admin_role:
-        existing_user_role = db.query(UserRole).filter(
-            UserRole.user_id == admin_user.id,
-            UserRole.role_id == admin_role.id
-        ).first()
-        if not existing_user_role:
-            user_role = UserRole(
-                user_id=admin_user.id,
-                role_id=admin_role.id,
-                created_by=1
-            )
-            db.add(user_role)
+
+    if admin_role_id is None:
+        if commit:
             db.commit()
-            print("Роль администратора назначена успешно!")
-        else:
-            print("Роль администратора уже назначена")
-    else:
         print("Ошибка: роль администратора не найдена")
+        return
 
-def run_all_seeds():
-    """Запуск всех сидов"""
+    assigned = db.query(UserRole.id).filter(
+        UserRole.user_id == admin_user.id,
+        UserRole.role_id == admin_role_id
+    ).first()
+    if assigned is None:
+        db.add(UserRole(user_id=admin_user.id, role_id=admin_role_id, created_by=1))
+        print("Роль администратора назначена успешно!")
+    else:
+        print("Роль администратора уже назначена")
+    if commit:
+        db.commit()
+
+
+def run_all_seeds() -> bool:
+    """
+    Запуск всех сидов одной транзакцией: политика и администратор
+    коммитятся вместе, при ошибке не остается ни того, ни другого.
+
+    Возвращает False, если сиды завершились ошибкой: по такой БД нельзя
+    снимать снимок, иначе частично заполненная БД восстанавливалась бы при
+    каждом следующем запуске reset_and_seed.py.
+    """
     db = SessionLocal()
     try:
-        create_initial_roles(db)
-        create_initial_permissions(db)
-        assign_permissions_to_roles(db)
-        create_admin_user(db)
+        plan = sync_policy(db, seed_policy(db), commit=False)
+        if plan.is_empty:
+            print("Политика уже загружена, изменений нет")
+        else:
+            # Итоги по таблицам, без построчного списка
+            print("\n".join(line for line in plan.describe() if not line.startswith(" ")))
+        create_admin_user(db, commit=False)
+        db.commit()
         print("Все сиды выполнены успешно!")
+        return True
     except Exception as e:
         print(f"Ошибка при выполнении сидов: {e}")
         import traceback
         traceback.print_exc()
         db.rollback()
+        return False
     finally:
         db.close()
 
+
+def seed_fingerprint() -> str:
+    """Отпечаток схемы и данных сидов: снимок с другим отпечатком устарел"""
+    # Пароль администратора входит в отпечаток: в снимке лежит его хеш
+    payload = json.dumps(
+        [SCHEMA_REVISION, SEED_ROLES, SEED_PERMISSIONS, SEED_GRANTS, ADMIN_USERNAME, ADMIN_EMAIL, ADMIN_PASSWORD],
+        ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def snapshot_path(directory: str = SNAPSHOT_DIR) -> str:
+    """Путь снимка для текущих схемы и сидов"""
+    return os.path.join(directory, f"seed-{seed_fingerprint()}.db")
+
+
+def _sqlite_connection(bind):
+    if bind.dialect.name != "sqlite":
+        raise ValueError("Снимки БД поддерживаются только для SQLite")
+    return bind.raw_connection()
+
+
+def save_snapshot(path: str, bind=None) -> None:
+    """Копия БД в файл через SQLite backup API (согласованная даже при открытых соединениях)"""
+    bind = bind or engine
+    connection = _sqlite_connection(bind)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    target = sqlite3.connect(f"{path}.tmp")
+    try:
+        connection.driver_connection.backup(target)
+    finally:
+        target.close()
+        connection.close()
+    # Замена готовым файлом: прерванное копирование не оставит битый снимок
+    os.replace(f"{path}.tmp", path)
+
+
+def restore_snapshot(path: str, bind=None) -> bool:
+    """
+    Восстановление БД из снимка постраничным копированием.
+
+    Пул соединений сбрасывается, чтобы новые соединения не держали старую схему.
+    Возвращает False, если снимка нет.
+    """
+    if not os.path.exists(path):
+        return False
+    bind = bind or engine
+    connection = _sqlite_connection(bind)
+    source = sqlite3.connect(path)
+    try:
+        source.backup(connection.driver_connection)
+    finally:
+        source.close()
+        connection.close()
+    bind.dispose()
+    return True
+
+
 if __name__ == "__main__":
-    run_all_seeds()
\ No newline at end of file
+    sys.exit(0 if run_all_seeds() else 1)
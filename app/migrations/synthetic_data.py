@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Генератор синтетического набора данных для нагрузочного тестирования
+
+Заполняет БД пользователями, ролями, разрешениями, связями и историей
+токенов в заданных количествах. Набор воспроизводим: все значения
+выводятся из --seed и --reference-date (от нее отсчитываются даты).
+Распределения скошены по закону Ципфа: немногие роли есть у большинства
+пользователей, немногие разрешения входят в большинство ролей, у активных
+пользователей больше всего токенов.
+
+Загрузка - пакетные Core insert (executemany) в крупных транзакциях;
+вторичные индексы на время загрузки удаляются и создаются заново,
+в конце выполняется ANALYZE. Всем пользователям назначается один хеш
+пароля --password (argon2 для миллионов строк занял бы часы).
+
+Готовые размеры: --scale small | medium | large (5M пользователей, 50k ролей,
+10k разрешений, 20M токенов); отдельные параметры переопределяют размер.
+
+Запуск: python -m app.migrations.synthetic_data --database-url sqlite:///./scale.db --scale medium
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from itertools import accumulate, islice
+from math import gcd
+from typing import Callable, Dict, Iterable, Iterator, List
+
+# Добавляем путь для импортов
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from sqlalchemy import create_engine, event, func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.models.user import User, Token
+from app.models.role import Role, Permission, UserRole, RolePermission
+
+# Владелец синтетических записей (created_by)
+SYSTEM_USER_ID = 1
+# Доля неистекших активных токенов в истории
+ACTIVE_TOKEN_SHARE = 0.02
+
+# Таблица -> модель, в порядке загрузки
+TABLES = {
+    "users": User,
+    "roles": Role,
+    "permissions": Permission,
+    "roles_and_permissions": RolePermission,
+    "users_and_roles": UserRole,
+    "tokens": Token,
+}
+
+
+@dataclass(frozen=True)
+class DatasetConfig:
+    """Размеры и распределения набора"""
+    users: int
+    roles: int
+    permissions: int
+    tokens: int
+    roles_per_user: float = 2.0
+    permissions_per_role: float = 20.0
+    skew: float = 1.1
+    history_days: int = 365
+    seed: int = 42
+    # Даты отсчитываются от нее: действующие токены истекают после этой даты
+    reference_date: date = field(default_factory=date.today)
+
+
+SCALES = {
+    "small": DatasetConfig(users=10_000, roles=200, permissions=100, tokens=40_000),
+    "medium": DatasetConfig(users=500_000, roles=5_000, permissions=1_000, tokens=2_000_000),
+    "large": DatasetConfig(users=5_000_000, roles=50_000, permissions=10_000, tokens=20_000_000),
+}
+
+
+class ZipfSampler:
+    """
+    Выбор id из 1..n с вероятностью ранга k пропорциональной 1/k^s.
+
+    Ранги переставлены мультипликативным отображением k -> (k * step) mod n,
+    чтобы популярные записи не были просто первыми id.
+    """
+
+    def __init__(self, n: int, skew: float, rng: random.Random):
+        self.n = n
+        self.rng = rng
+        self._cumulative = array("d", accumulate(1.0 / rank ** skew for rank in range(1, n + 1)))
+        self._total = self._cumulative[-1]
+        step = 1_000_003 % n or 1
+        while gcd(step, n) != 1:
+            step += 1
+        self._step = step
+
+    def sample(self) -> int:
+        rank = bisect_right(self._cumulative, self.rng.random() * self._total)
+        return min(rank, self.n - 1) * self._step % self.n + 1
+
+    def distinct(self, k: int) -> List[int]:
+        """k разных id (k не больше n)"""
+        chosen = set()
+        while len(chosen) < min(k, self.n):
+            chosen.add(self.sample())
+        return sorted(chosen)
+
+
+def _count(rng: random.Random, mean: float, limit: int) -> int:
+    """Число связей записи: не меньше одной, в среднем mean, с длинным хвостом"""
+    if mean <= 1:
+        return 1
+    return min(limit, 1 + int(rng.expovariate(1 / (mean - 1))))
+
+
+def _name(prefix: str, index: int) -> str:
+    """Имя из латинских букв (правила имени пользователя запрещают цифры)"""
+    letters = ""
+    index += 1
+    while index:
+        index, rest = divmod(index - 1, 26)
+        letters = chr(ord("a") + rest) + letters
+    return prefix + letters
+
+
+def _timestamp(rng: random.Random, now: datetime, days: int) -> datetime:
+    return now - timedelta(seconds=rng.randrange(days * 86400))
+
+
+def generate_users(config: DatasetConfig, password_hash: str, now: datetime) -> Iterator[dict]:
+    rng = random.Random(f"{config.seed}-users")
+    for i in range(config.users):
+        yield {
+            "id": i + 1,
+            "username": _name("Synth", i),
+            "email": f"synth{i}@example.com",
+            "password_hash": password_hash,
+            "birthday": date(1960, 1, 1) + timedelta(days=rng.randrange(40 * 365)),
+            "created_at": _timestamp(rng, now, config.history_days),
+            "is_active": rng.random() >= 0.01,
+        }
+
+
+def generate_references(count: int, prefix: str, label: str, config: DatasetConfig,
+                        now: datetime) -> Iterator[dict]:
+    rng = random.Random(f"{config.seed}-{prefix}")
+    for i in range(count):
+        yield {
+            "id": i + 1,
+            "code": f"{prefix}-{i}",
+            "name": f"{label} {i}",
+            "description": None,
+            "created_at": _timestamp(rng, now, config.history_days),
+            "created_by": SYSTEM_USER_ID,
+            "is_active": True,
+        }
+
+
+def generate_grants(config: DatasetConfig, now: datetime) -> Iterator[dict]:
+    rng = random.Random(f"{config.seed}-grants")
+    permissions = ZipfSampler(config.permissions, config.skew, rng)
+    for role_id in range(1, config.roles + 1):
+        count = _count(rng, config.permissions_per_role, config.permissions)
+        for permission_id in permissions.distinct(count):
+            yield {
+                "role_id": role_id,
+                "permission_id": permission_id,
+                "created_at": _timestamp(rng, now, config.history_days),
+                "created_by": SYSTEM_USER_ID,
+                "is_active": True,
+            }
+
+
+def generate_memberships(config: DatasetConfig, now: datetime) -> Iterator[dict]:
+    rng = random.Random(f"{config.seed}-memberships")
+    roles = ZipfSampler(config.roles, config.skew, rng)
+    for user_id in range(1, config.users + 1):
+        for role_id in roles.distinct(_count(rng, config.roles_per_user, config.roles)):
+            yield {
+                "user_id": user_id,
+                "role_id": role_id,
+                "created_at": _timestamp(rng, now, config.history_days),
+                "created_by": SYSTEM_USER_ID,
+                "is_active": rng.random() >= 0.05,
+            }
+
+
+def generate_tokens(config: DatasetConfig, now: datetime) -> Iterator[dict]:
+    """История токенов: в основном истекшие и отозванные, с небольшой долей действующих"""
+    rng = random.Random(f"{config.seed}-tokens")
+    users = ZipfSampler(config.users, config.skew, rng)
+    for i in range(config.tokens):
+        token_type = "access" if i % 2 == 0 else "refresh"
+        active = rng.random() < ACTIVE_TOKEN_SHARE
+        created_at = now - timedelta(minutes=rng.randrange(30)) if active else _timestamp(rng, now, config.history_days)
+        lifetime = timedelta(minutes=30) if token_type == "access" else timedelta(days=7)
+        yield {
+            "user_id": users.sample(),
+            "token_hash": hashlib.sha256(f"{config.seed}-token-{i}".encode()).hexdigest(),
+            "token_type": token_type,
+            "family_id": None,
+            "is_active": active,
+            "created_at": created_at,
+            "expires_at": created_at + lifetime,
+        }
+
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _bulk_pragmas(dbapi_connection, connection_record) -> None:
+    # Загрузка одноразовая: журнал и fsync не нужны, при сбое набор генерируется заново
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=OFF")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("PRAGMA cache_size=-262144")
+    cursor.close()
+
+
+def bulk_engine(database_url: str) -> Engine:
+    """Движок для загрузки; для SQLite - без журнала и fsync"""
+    engine = create_engine(database_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _bulk_pragmas)
+    return engine
+
+
+def load(
+    engine: Engine,
+    config: DatasetConfig,
+    password_hash: str,
+    batch_size: int = 50_000,
+    commit_every: int = 1_000_000,
+    drop_indexes: bool = True,
+    progress: Callable[[str, int, float], None] = lambda table, rows, seconds: None
+) -> Dict[str, int]:
+    """
+    Загрузка набора в пустые таблицы (схема уже создана).
+
+    Строки пишутся пакетами по batch_size, транзакция фиксируется каждые
+    commit_every строк. Возвращает число строк по таблицам.
+    """
+    with engine.connect() as conn:
+        for name, model in TABLES.items():
+            if conn.execute(select(func.count()).select_from(model.__table__)).scalar():
+                raise ValueError(f"Таблица {name} не пуста: генератор заполняет только пустые таблицы")
+
+    now = datetime.combine(config.reference_date, datetime.min.time())
+    sources = {
+        "users": generate_users(config, password_hash, now),
+        "roles": generate_references(config.roles, "role", "Role", config, now),
+        "permissions": generate_references(config.permissions, "perm", "Permission", config, now),
+        "roles_and_permissions": generate_grants(config, now),
+        "users_and_roles": generate_memberships(config, now),
+        "tokens": generate_tokens(config, now),
+    }
+    counts = {}
+    for name, model in TABLES.items():
+        table = model.__table__
+        indexes = [index for index in table.indexes if not index.unique] if drop_indexes else []
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            for index in indexes:
+                # IF EXISTS: индексы по выражениям SQLAlchemy не отражает и checkfirst их не видит
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            conn.commit()
+            rows = pending = 0
+            for batch in _batches(sources[name], batch_size):
+                conn.execute(insert(table), batch)
+                rows += len(batch)
+                pending += len(batch)
+                if pending >= commit_every:
+                    conn.commit()
+                    pending = 0
+            conn.commit()
+            for index in indexes:
+                index.create(conn)
+            conn.commit()
+        counts[name] = rows
+        progress(name, rows, time.perf_counter() - started)
+
+    with engine.connect() as conn:
+        # Статистика для планировщика: EXPLAIN на таком наборе показывает реальные планы
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетического набора данных")
+    parser.add_argument("--database-url", help="По умолчанию DATABASE_URL из настроек")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--roles", type=int)
+    parser.add_argument("--permissions", type=int)
+    parser.add_argument("--tokens", type=int)
+    parser.add_argument("--roles-per-user", type=float)
+    parser.add_argument("--permissions-per-role", type=float)
+    parser.add_argument("--skew", type=float, help="Показатель распределения Ципфа")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--reference-date", type=date.fromisoformat,
+                        help="Дата, от которой отсчитывается история (ГГГГ-ММ-ДД)")
+    parser.add_argument("--password", default="Secret123", help="Пароль всех синтетических пользователей")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--commit-every", type=int, default=1_000_000)
+    parser.add_argument("--keep-indexes", action="store_true", help="Не удалять индексы на время загрузки")
+    args = parser.parse_args()
+
+    overrides = {
+        name: getattr(args, name)
+        for name in ("users", "roles", "permissions", "tokens", "roles_per_user",
+                     "permissions_per_role", "skew", "seed", "reference_date")
+        if getattr(args, name) is not None
+    }
+    config = replace(SCALES[args.scale], **overrides)
+
+    from app.core.config import settings
+    from app.core.database import ensure_schema
+    from app.core.security import get_password_hash
+
+    engine = bulk_engine(args.database_url or settings.DATABASE_URL)
+    ensure_schema(engine)
+
+    print(f"🧪 СИНТЕТИЧЕСКИЙ НАБОР (seed={config.seed}, skew={config.skew}): {config.users} пользователей, "
+          f"{config.roles} ролей, {config.permissions} разрешений, {config.tokens} токенов")
+
+    def progress(table: str, rows: int, seconds: float) -> None:
+        print(f"   📥 {table:<22} {rows:>11,} строк за {seconds:7.1f} с ({rows / max(seconds, 1e-9):,.0f} строк/с)")
+
+    started = time.perf_counter()
+    try:
+        counts = load(engine, config, get_password_hash(args.password), args.batch_size,
+                      args.commit_every, not args.keep_indexes, progress)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        engine.dispose()
+    print(f"✅ Загружено {sum(counts.values()):,} строк за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
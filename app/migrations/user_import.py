@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Массовый импорт пользователей из CSV / NDJSON
+
+Конвейер: чтение пачки -> валидация по правилам RegisterRequest ->
+дедупликация по нормализованным индексам (lower(username), lower(email)) ->
+хеширование паролей argon2 в пуле процессов -> многострочная вставка пачки
+в отдельной транзакции. Хеширование следующей пачки идет параллельно
+со вставкой текущей. Готовые argon2-хеши (поле password_hash) не пересчитываются.
+
+Запуск: python -m app.migrations.user_import users.csv --workers 8 --batch-size 1000
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+# Добавляем путь для импортов
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+
+from pydantic import ValidationError
+from sqlalchemy import insert, func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.schemas.auth import ImportUserRow, ImportReport
+
+# Сколько сообщений об ошибках хранится в отчете
+MAX_REPORTED_ERRORS = 100
+
+
+def read_rows(stream: Iterable[str], fmt: str) -> Iterator[Union[Dict[str, str], str]]:
+    """
+    Потоковое чтение строк CSV (с заголовком) или NDJSON.
+
+    Строки NDJSON возвращаются как есть и разбираются при валидации:
+    ошибка в одной строке попадает в отчет, а не прерывает импорт.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    elif fmt == "ndjson":
+        for line in stream:
+            if line.strip():
+                yield line
+    else:
+        raise ValueError(f"Неизвестный формат: {fmt}")
+
+
+def parse_row(raw: Union[Dict[str, str], str]) -> Dict[str, str]:
+    """Поля строки импорта; строка NDJSON должна быть JSON-объектом"""
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise TypeError(f"ожидается JSON-объект, получено: {type(raw).__name__}")
+    return raw
+
+
+def detect_format(path: str) -> str:
+    """Формат файла по расширению"""
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+
+class UserImporter:
+    """Конвейерный импорт пользователей пачками"""
+
+    def __init__(
+        self,
+        engine,
+        batch_size: int = 1000,
+        workers: int = 0,
+        progress: Optional[Callable[[ImportReport], None]] = None
+    ):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+        self.report = ImportReport()
+
+    def _error(self, line: int, message: str) -> None:
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(f"Строка {line}: {message}")
+
+    def _validate(self, batch: List[tuple]) -> List[tuple]:
+        """Валидация пачки по правилам регистрации"""
+        valid = []
+        for line, raw in batch:
+            try:
+                fields = parse_row(raw)
+                valid.append((line, ImportUserRow(**{k: v for k, v in fields.items() if v not in ("", None)})))
+            except (ValidationError, json.JSONDecodeError, TypeError) as e:
+                self.report.invalid += 1
+                self._error(line, str(e).replace("\n", " "))
+        return valid
+
+    def _dedupe(self, rows: List[tuple], in_flight: Set[str]) -> List[tuple]:
+        """
+        Отбрасывание дублей внутри пачки, в еще не вставленной предыдущей
+        пачке и в БД (по одному запросу на каждый нормализованный индекс).
+        """
+        names = {row.username.lower() for _, row in rows}
+        emails = {row.email.lower() for _, row in rows}
+        taken = set(in_flight)
+        with self.engine.connect() as conn:
+            taken.update(
+                "u:" + name for (name,) in conn.execute(
+                    select(func.lower(User.username)).where(func.lower(User.username).in_(names))
+                )
+            )
+            taken.update(
+                "e:" + email for (email,) in conn.execute(
+                    select(func.lower(User.email)).where(func.lower(User.email).in_(emails))
+                )
+            )
+
+        fresh = []
+        for line, row in rows:
+            keys = ("u:" + row.username.lower(), "e:" + row.email.lower())
+            if keys[0] in taken or keys[1] in taken:
+                self.report.duplicates += 1
+                self._error(line, f"дубликат {row.username} / {row.email}")
+                continue
+            taken.update(keys)
+            fresh.append((line, row))
+        return fresh
+
+    def _hash(self, executor, rows: List[tuple]):
+        """Запуск хеширования паролей пачки (результат - ленивый итератор)"""
+        passwords = [row.password for _, row in rows if row.password]
+        if executor is None:
+            return iter([get_password_hash(password) for password in passwords])
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return executor.map(get_password_hash, passwords, chunksize=chunksize)
+
+    def _insert(self, rows: List[tuple], hashes) -> None:
+        """Вставка пачки одной транзакцией"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        values = [
+            {
+                "username": row.username,
+                "email": row.email,
+                "password_hash": row.password_hash or next(hashes),
+                "birthday": row.birthday,
+                "created_at": now,
+                "is_active": True,
+            }
+            for _, row in rows
+        ]
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(User.__table__), values)
+            self.report.imported += len(values)
+        except IntegrityError:
+            # Пользователь, созданный после проверки дублей, откатывает всю пачку:
+            # строки вставляются по одной, ошибка попадает в отчет только для своей строки
+            self._insert_rows(rows, values)
+
+    def _insert_rows(self, rows: List[tuple], values: List[dict]) -> None:
+        """Построчная вставка пачки, отвергнутой целиком"""
+        for (line, _), value in zip(rows, values):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(insert(User.__table__), value)
+                self.report.imported += 1
+            except IntegrityError as e:
+                self.report.failed += 1
+                self._error(line, f"не вставлена: {e.orig}")
+
+    def _batches(self, rows: Iterable[Union[Dict[str, str], str]]) -> Iterator[List[tuple]]:
+        numbered = enumerate(rows, start=1)
+        while True:
+            batch = list(islice(numbered, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def run(self, rows: Iterable[Union[Dict[str, str], str]]) -> ImportReport:
+        """Выполнение импорта"""
+        started = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 0 else None
+        pending = None
+        in_flight: Set[str] = set()
+        try:
+            for batch in self._batches(rows):
+                self.report.total += len(batch)
+                fresh = self._dedupe(self._validate(batch), in_flight)
+                hashes = self._hash(executor, fresh)
+                # Пока пул хеширует текущую пачку, вставляем предыдущую
+                if pending:
+                    self._insert(*pending)
+                pending = (fresh, hashes)
+                in_flight = {
+                    key for _, row in fresh
+                    for key in ("u:" + row.username.lower(), "e:" + row.email.lower())
+                }
+                self._update_speed(started)
+                if self.progress:
+                    self.progress(self.report)
+            if pending:
+                self._insert(*pending)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self._update_speed(started)
+        return self.report
+
+    def _update_speed(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self.report.elapsed_seconds = round(elapsed, 3)
+        self.report.rows_per_second = round(self.report.total / elapsed, 1) if elapsed else 0.0
+
+
+def import_users(engine, stream: Iterable[str], fmt: str, **kwargs) -> ImportReport:
+    """Импорт пользователей из текстового потока"""
+    return UserImporter(engine, **kwargs).run(read_rows(stream, fmt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Массовый импорт пользователей")
+    parser.add_argument("path", help="CSV или NDJSON файл")
+    parser.add_argument("--format", choices=("csv", "ndjson"), default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Процессов для хеширования argon2 (0 - в текущем процессе)")
+    args = parser.parse_args()
+
+    from app.core.database import engine
+
+    def progress(report: ImportReport):
+        print(f"\r⏳ {report.total} строк, импортировано {report.imported}, "
+              f"{report.rows_per_second:.0f} строк/с", end="", flush=True)
+
+    with open(args.path, encoding="utf-8", newline="") as f:
+        report = import_users(engine, f, args.format or detect_format(args.path),
+                              batch_size=args.batch_size, workers=args.workers, progress=progress)
+
+    print("\n📊 ИТОГИ ИМПОРТА")
+    print("-" * 40)
+    print(f"Всего строк: {report.total}")
+    print(f"✅ Импортировано: {report.imported}")
+    print(f"🔁 Дубликатов: {report.duplicates}")
+    print(f"❌ Невалидных: {report.invalid}, не вставлено: {report.failed}")
+    print(f"⏱  {report.elapsed_seconds:.1f} с, {report.rows_per_second:.0f} строк/с")
+    for error in report.errors[:10]:
+        print(f"   - {error}")
+
+
+if __name__ == "__main__":
+    main()
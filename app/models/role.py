@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.models.user import Base  # Используем существующий Base
@@ -38,6 +38,10 @@ class Permission(Base):
 
 class UserRole(Base):
     __tablename__ = "users_and_roles"
+    __table_args__ = (
+        # Индекс для keyset-пагинации ролей пользователя
+        Index("ix_users_and_roles_user_id_id", "user_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -66,4 +70,12 @@ class RolePermission(Base):
     
     # Связи
     role = relationship("Role", back_populates="role_permissions")
-    permission = relationship("Permission", back_populates="role_permissions")
\ No newline at end of file
+    permission = relationship("Permission", back_populates="role_permissions")
+
+class PolicyVersion(Base):
+    __tablename__ = "policy_versions"
+    
+    # "policy" - общая версия политики доступа, "user:<id>" - версия пользователя
+    scope = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
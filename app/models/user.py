@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Boolean, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -19,13 +19,31 @@ class User(Base):
     # Добавляем отношения для ролей
     user_roles = relationship("UserRole", back_populates="user")
 
+# Нормализованные индексы для регистронезависимого поиска и дедупликации
+# (имя уникально без учета регистра)
+Index("ix_users_username_lower", func.lower(User.username), unique=True)
+Index("ix_users_email_lower", func.lower(User.email))
+
 class Token(Base):
     __tablename__ = "tokens"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    token_hash = Column(String(255), nullable=False)
+    token_hash = Column(String(255), nullable=False, index=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     expires_at = Column(DateTime, nullable=False)
-    token_type = Column(String(20), nullable=False)  # 'access' or 'refresh'
\ No newline at end of file
+    token_type = Column(String(20), nullable=False)  # 'access' or 'refresh'
+    # Семейство refresh-токенов (сессия входа); NULL у токенов, выданных до введения семейств
+    family_id = Column(String(32), nullable=True, index=True)
+
+class RefreshFamily(Base):
+    """Семейство refresh-токенов: одна запись на вход, seq растет при каждой ротации"""
+    __tablename__ = "refresh_families"
+    
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    seq = Column(Integer, nullable=False, default=0)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
\ No newline at end of file
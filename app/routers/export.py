@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_db, get_principal
+from app.core.export import EXPORT_TABLES, EXPORT_FORMATS, stream_export
+from app.auth.principal import Principal
+
+router = APIRouter(prefix="/api/ref/export", tags=["export"])
+
+# Разрешение, необходимое для выгрузки каждой таблицы
+EXPORT_PERMISSIONS = {
+    "users": "get-list-user",
+    "users_and_roles": "manage-user-roles",
+    "roles_and_permissions": "manage-role-permissions",
+    "tokens": "get-list-user",
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+@router.get("/{table_name}")
+def export_table(
+    table_name: str,
+    format: str = Query("ndjson", description="ndjson или csv"),
+    after_id: Optional[int] = Query(None, description="Продолжить выгрузку после указанного id"),
+    user_id: Optional[int] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    batch_size: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    principal: Principal = Depends(get_principal)
+):
+    """
+    Потоковая выгрузка таблицы для аудита.
+
+    Строки передаются по мере чтения из БД, память не растет с размером таблицы.
+    Для продолжения прерванной выгрузки передайте id последней полученной строки в after_id.
+    """
+    if table_name not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail="Export table not found")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+
+    permission_code = EXPORT_PERMISSIONS[table_name]
+    if not principal.has_permission(permission_code):
+        raise HTTPException(status_code=403, detail=f"Required permission: {permission_code}")
+
+    # Выгрузка читает через отдельное соединение: сессия запроса закрывается раньше потока
+    chunks = stream_export(
+        db.get_bind(), table_name, format,
+        after_id=after_id,
+        filters={
+            "user_id": user_id,
+            "is_active": is_active,
+            "created_after": created_after,
+            "created_before": created_before,
+        },
+        batch_size=batch_size
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table_name}.{format}"'}
+    )
@@ -1,43 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.dependencies import get_db, get_current_user
+from app.auth.principal import Principal
+from app.core.pagination import PageParams, keyset_page, set_next_link, escape_like
+from app.core.etag import POLICY_SCOPE, bump_version, conditional_response
 from app.schemas.role import PermissionResponse, PermissionCreate, PermissionUpdate
 from app.models.role import Permission
-from app.models.user import User  # Добавляем импорт User
 
 router = APIRouter(prefix="/api/ref/policy/permission", tags=["permissions"])
 
-@router.get("/")
-def get_permissions():
-    return {"message": "Permissions router works"}
-
 @router.get("/", response_model=List[PermissionResponse])
 def get_permissions(
+    request: Request,
+    response: Response,
+    code_prefix: Optional[str] = Query(None, description="Фильтр по префиксу кода"),
+    is_active: bool = Query(True, description="Фильтр по активности"),
+    created_by: Optional[int] = Query(None, description="Фильтр по автору"),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)  # Теперь User импортирован
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Получение списка разрешений"""
-    permissions = db.query(Permission).filter(Permission.is_active == True).all()
+    """
+    Получение списка разрешений (keyset-пагинация по id).
+
+    Ссылка на следующую страницу передается в заголовках Link и X-Next-Cursor.
+    Поддерживается условный GET (ETag / If-None-Match) по версии политики.
+    """
+    not_modified = conditional_response(request, response, db, POLICY_SCOPE)
+    if not_modified:
+        return not_modified
+
+    query = db.query(Permission).filter(Permission.is_active == is_active)
+    if code_prefix:
+        query = query.filter(Permission.code.like(f"{escape_like(code_prefix)}%", escape="\\"))
+    if created_by is not None:
+        query = query.filter(Permission.created_by == created_by)
+
+    permissions, next_cursor = keyset_page(query, Permission.id, page.after_id, page.limit)
+    set_next_link(request, response, next_cursor, page.limit)
     return permissions
 
 @router.get("/{permission_id}", response_model=PermissionResponse)
 def get_permission(
     permission_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Получение конкретного разрешения"""
+    # Сначала существование: ETag политики не должен превращать 404 в 304
     permission = db.query(Permission).filter(Permission.id == permission_id, Permission.is_active == True).first()
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
+
+    not_modified = conditional_response(request, response, db, POLICY_SCOPE)
+    if not_modified:
+        return not_modified
     return permission
 
 @router.post("/", response_model=PermissionResponse)
 def create_permission(
     permission_data: PermissionCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Создание разрешения"""
     # Проверка уникальности
@@ -52,8 +79,8 @@ def create_permission(
         created_by=current_user.id
     )
     db.add(permission)
+    bump_version(db)
     db.commit()
-    db.refresh(permission)
     return permission
 
 @router.put("/{permission_id}", response_model=PermissionResponse)
@@ -61,7 +88,7 @@ def update_permission(
     permission_id: int,
     permission_data: PermissionUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Обновление разрешения"""
     permission = db.query(Permission).filter(Permission.id == permission_id, Permission.is_active == True).first()
@@ -80,15 +107,15 @@ def update_permission(
     for field, value in permission_data.dict(exclude_unset=True).items():
         setattr(permission, field, value)
     
+    bump_version(db)
     db.commit()
-    db.refresh(permission)
     return permission
 
 @router.delete("/{permission_id}")
 def delete_permission_hard(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Жесткое удаление разрешения"""
     permission = db.query(Permission).filter(Permission.id == permission_id).first()
@@ -96,6 +123,7 @@ def delete_permission_hard(
         raise HTTPException(status_code=404, detail="Permission not found")
     
     db.delete(permission)
+    bump_version(db)
     db.commit()
     return {"message": "Permission deleted successfully"}
 
@@ -103,7 +131,7 @@ def delete_permission_hard(
 def delete_permission_soft(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Мягкое удаление разрешения"""
     permission = db.query(Permission).filter(Permission.id == permission_id, Permission.is_active == True).first()
@@ -112,6 +140,7 @@ def delete_permission_soft(
     
     permission.is_active = False
     permission.deleted_by = current_user.id
+    bump_version(db)
     db.commit()
     return {"message": "Permission soft deleted successfully"}
 
@@ -119,7 +148,7 @@ def delete_permission_soft(
 def restore_permission(
     permission_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Восстановление мягко удаленного разрешения"""
     permission = db.query(Permission).filter(Permission.id == permission_id, Permission.is_active == False).first()
@@ -128,5 +157,6 @@ def restore_permission(
     
     permission.is_active = True
     permission.deleted_by = None
+    bump_version(db)
     db.commit()
     return {"message": "Permission restored successfully"}
\ No newline at end of file
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.auth.permission_service import require_permission
+from app.auth.principal import Principal
+from app.core.profiling import profile_store
+
+router = APIRouter(prefix="/api/debug/profiles", tags=["profiling"])
+
+@router.get("/")
+def list_profiles(
+    principal: Principal = Depends(require_permission("view-profiles"))
+):
+    """Список сохраненных профилей запросов (новые первыми)"""
+    return profile_store.list()
+
+@router.get("/{route}", response_class=PlainTextResponse)
+def get_route_profile(
+    route: str,
+    principal: Principal = Depends(require_permission("view-profiles"))
+):
+    """Все профили маршрута, сложенные в один (свернутые стеки для flamegraph)"""
+    merged = profile_store.merged(route)
+    if merged is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return merged
+
+@router.get("/{route}/{name}")
+def download_profile(
+    route: str,
+    name: str,
+    principal: Principal = Depends(require_permission("view-profiles"))
+):
+    """Скачивание одного профиля"""
+    path = profile_store.path(route, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=name)
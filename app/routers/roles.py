@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import insert, update, tuple_, bindparam
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from app.core.dependencies import get_db, get_current_user
-from app.schemas.role import UserRoleResponse, UserRoleCreate
+from app.auth.principal import Principal
+from app.core.pagination import PageParams, keyset_page, set_next_link
+from app.core.etag import POLICY_SCOPE, bump_versions, user_scope, conditional_response
+from app.schemas.role import UserRoleResponse, UserRoleCreate, BulkUserRoleRequest, BulkUserRoleResponse
 from app.models.role import UserRole, Role
 from app.models.user import User
 
@@ -15,14 +20,28 @@ def get_roles():
 @router.get("/{user_id}/role", response_model=List[UserRoleResponse])
 def get_user_roles(
     user_id: int,
+    request: Request,
+    response: Response,
+    is_active: bool = Query(True, description="Фильтр по активности"),
+    created_by: Optional[int] = Query(None, description="Фильтр по автору"),
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
-    """Получение ролей пользователя"""
-    user_roles = db.query(UserRole).filter(
+    """Получение ролей пользователя (keyset-пагинация по id, условный GET по версии политики)"""
+    not_modified = conditional_response(request, response, db, POLICY_SCOPE)
+    if not_modified:
+        return not_modified
+
+    query = db.query(UserRole).filter(
         UserRole.user_id == user_id,
-        UserRole.is_active == True
-    ).all()
+        UserRole.is_active == is_active
+    )
+    if created_by is not None:
+        query = query.filter(UserRole.created_by == created_by)
+
+    user_roles, next_cursor = keyset_page(query, UserRole.id, page.after_id, page.limit)
+    set_next_link(request, response, next_cursor, page.limit)
     return user_roles
 
 @router.post("/{user_id}/role", response_model=UserRoleResponse)
@@ -30,7 +49,7 @@ def assign_role_to_user(
     user_id: int,
     role_data: UserRoleCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Присвоение ролей пользователю"""
     # Проверяем существование пользователя
@@ -59,8 +78,8 @@ def assign_role_to_user(
         created_by=current_user.id
     )
     db.add(user_role)
+    bump_versions(db, [POLICY_SCOPE, user_scope(user_id)])
     db.commit()
-    db.refresh(user_role)
     return user_role
 
 @router.delete("/{user_id}/role/{role_id}")
@@ -68,7 +87,7 @@ def remove_role_from_user_hard(
     user_id: int,
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Жесткое удаление роли у пользователя"""
     user_role = db.query(UserRole).filter(
@@ -80,6 +99,7 @@ def remove_role_from_user_hard(
         raise HTTPException(status_code=404, detail="User role not found")
     
     db.delete(user_role)
+    bump_versions(db, [POLICY_SCOPE, user_scope(user_id)])
     db.commit()
     return {"message": "User role deleted successfully"}
 
@@ -88,7 +108,7 @@ def remove_role_from_user_soft(
     user_id: int,
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Мягкое удаление роли у пользователя"""
     user_role = db.query(UserRole).filter(
@@ -102,6 +122,7 @@ def remove_role_from_user_soft(
     
     user_role.is_active = False
     user_role.deleted_by = current_user.id
+    bump_versions(db, [POLICY_SCOPE, user_scope(user_id)])
     db.commit()
     return {"message": "User role soft deleted successfully"}
 
@@ -110,7 +131,7 @@ def restore_user_role(
     user_id: int,
     role_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """Восстановление мягко удаленной роли у пользователя"""
     user_role = db.query(UserRole).filter(
@@ -124,5 +145,125 @@ def restore_user_role(
     
     user_role.is_active = True
     user_role.deleted_by = None
+    bump_versions(db, [POLICY_SCOPE, user_scope(user_id)])
     db.commit()
-    return {"message": "User role restored successfully"}
\ No newline at end of file
+    return {"message": "User role restored successfully"}
+
+def _existing_ids(db: Session, column, ids) -> set:
+    """Множество существующих активных id одним запросом"""
+    if not ids:
+        return set()
+    entity = column.class_
+    return {
+        row_id for (row_id,) in db.query(column).filter(column.in_(ids), entity.is_active == True)
+    }
+
+def _load_user_roles(db: Session, pairs) -> dict:
+    """Существующие назначения для набора пар (user_id, role_id) одним запросом"""
+    if not pairs:
+        return {}
+    rows = db.query(UserRole.id, UserRole.user_id, UserRole.role_id, UserRole.is_active).filter(
+        tuple_(UserRole.user_id, UserRole.role_id).in_(pairs)
+    ).order_by(UserRole.is_active.desc(), UserRole.id)
+    found = {}
+    for row in rows:
+        # При дублях приоритет у активной записи
+        found.setdefault((row.user_id, row.role_id), row)
+    return found
+
+@router.post("/bulk/assign", response_model=BulkUserRoleResponse)
+def bulk_assign_roles(
+    bulk_data: BulkUserRoleRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Пакетное присвоение ролей пользователям в одной транзакции.
+
+    Существование пользователей и ролей проверяется запросами по множествам,
+    новые назначения вставляются одним многострочным INSERT, а ранее отозванные
+    восстанавливаются одним UPDATE. Результат возвращается по каждой паре.
+    """
+    pairs = bulk_data.pairs()
+    users = _existing_ids(db, User.id, {user_id for user_id, _ in pairs})
+    roles = _existing_ids(db, Role.id, {role_id for _, role_id in pairs})
+    valid_pairs = [(u, r) for u, r in pairs if u in users and r in roles]
+    existing = _load_user_roles(db, valid_pairs)
+
+    results = {}
+    to_insert, to_restore = [], []
+    for user_id, role_id in pairs:
+        row = existing.get((user_id, role_id))
+        if user_id not in users:
+            results[(user_id, role_id)] = {"status": "user_not_found"}
+        elif role_id not in roles:
+            results[(user_id, role_id)] = {"status": "role_not_found"}
+        elif row is None:
+            to_insert.append({"user_id": user_id, "role_id": role_id, "created_by": current_user.id,
+                              "created_at": datetime.utcnow(), "is_active": True})
+        elif row.is_active:
+            results[(user_id, role_id)] = {"status": "already_assigned", "id": row.id}
+        else:
+            to_restore.append({"b_id": row.id})
+            results[(user_id, role_id)] = {"status": "restored", "id": row.id}
+
+    table = UserRole.__table__
+    if to_insert:
+        inserted = db.execute(
+            insert(table).returning(table.c.id, table.c.user_id, table.c.role_id),
+            to_insert
+        )
+        for row in inserted:
+            results[(row.user_id, row.role_id)] = {"status": "assigned", "id": row.id}
+    if to_restore:
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(
+                is_active=True, deleted_at=None, deleted_by=None
+            ),
+            to_restore
+        )
+
+    changed_users = {pair[0] for pair, result in results.items() if result["status"] in ("assigned", "restored")}
+    if changed_users:
+        bump_versions(db, [POLICY_SCOPE] + [user_scope(user_id) for user_id in changed_users])
+    db.commit()
+
+    return BulkUserRoleResponse(
+        results=[{"user_id": u, "role_id": r, **results[(u, r)]} for u, r in pairs],
+        changed=len(to_insert) + len(to_restore)
+    )
+
+@router.post("/bulk/revoke", response_model=BulkUserRoleResponse)
+def bulk_revoke_roles(
+    bulk_data: BulkUserRoleRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """Пакетный (мягкий) отзыв ролей у пользователей одним UPDATE в одной транзакции"""
+    pairs = bulk_data.pairs()
+    existing = _load_user_roles(db, pairs)
+
+    results = {}
+    to_revoke = []
+    for pair in pairs:
+        row = existing.get(pair)
+        if row is not None and row.is_active:
+            to_revoke.append(row.id)
+            results[pair] = {"status": "revoked", "id": row.id}
+        else:
+            results[pair] = {"status": "not_assigned"}
+
+    if to_revoke:
+        db.query(UserRole).filter(UserRole.id.in_(to_revoke)).update({
+            "is_active": False,
+            "deleted_at": datetime.utcnow(),
+            "deleted_by": current_user.id
+        }, synchronize_session=False)
+        changed_users = {pair[0] for pair, result in results.items() if result["status"] == "revoked"}
+        bump_versions(db, [POLICY_SCOPE] + [user_scope(user_id) for user_id in changed_users])
+    db.commit()
+
+    return BulkUserRoleResponse(
+        results=[{"user_id": u, "role_id": r, **results[(u, r)]} for u, r in pairs],
+        changed=len(to_revoke)
+    )
\ No newline at end of file
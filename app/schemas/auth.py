@@ -1,35 +1,50 @@
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, validator, root_validator
 from datetime import date, datetime
 from typing import Optional, List
 import re
 
+def check_username(v: str) -> str:
+    """Правила имени пользователя (общие для входа, регистрации и импорта)"""
+    if len(v) < 7:
+        raise ValueError('Минимальная длина 7 символов')
+    if not v[0].isupper():
+        raise ValueError('Должен начинаться с большой буквы')
+    if not re.match(r'^[A-Za-z]+$', v):
+        raise ValueError('Только буквы латинского алфавита')
+    return v
+
+def check_password(v: str) -> str:
+    """Правила сложности пароля"""
+    if len(v) < 8:
+        raise ValueError('Минимальная длина 8 символов')
+    if not any(char.isdigit() for char in v):
+        raise ValueError('Должен содержать хотя бы одну цифру')
+    if not any(char.isalpha() for char in v):
+        raise ValueError('Должен содержать хотя бы одну букву')
+    if not any(char.isupper() for char in v):
+        raise ValueError('Должен содержать хотя бы одну заглавную букву')
+    if not any(char.islower() for char in v):
+        raise ValueError('Должен содержать хотя бы одну строчную букву')
+    return v
+
+def check_birthday(v: date) -> date:
+    """Проверка минимального возраста"""
+    age = (date.today() - v).days // 365
+    if age < 14:
+        raise ValueError('Возраст должен быть не менее 14 лет')
+    return v
+
 class LoginRequest(BaseModel):
     username: str
     password: str
     
     @validator('username')
     def validate_username(cls, v):
-        if len(v) < 7:
-            raise ValueError('Минимальная длина 7 символов')
-        if not v[0].isupper():
-            raise ValueError('Должен начинаться с большой буквы')
-        if not re.match(r'^[A-Za-z]+$', v):
-            raise ValueError('Только буквы латинского алфавита')
-        return v
+        return check_username(v)
     
     @validator('password')
     def validate_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Минимальная длина 8 символов')
-        if not any(char.isdigit() for char in v):
-            raise ValueError('Должен содержать хотя бы одну цифру')
-        if not any(char.isalpha() for char in v):
-            raise ValueError('Должен содержать хотя бы одну букву')
-        if not any(char.isupper() for char in v):
-            raise ValueError('Должен содержать хотя бы одну заглавную букву')
-        if not any(char.islower() for char in v):
-            raise ValueError('Должен содержать хотя бы одну строчную букву')
-        return v
+        return check_password(v)
 
 class RegisterRequest(BaseModel):
     username: str
@@ -40,27 +55,11 @@ class RegisterRequest(BaseModel):
     
     @validator('username')
     def validate_username(cls, v):
-        if len(v) < 7:
-            raise ValueError('Минимальная длина 7 символов')
-        if not v[0].isupper():
-            raise ValueError('Должен начинаться с большой буквы')
-        if not re.match(r'^[A-Za-z]+$', v):
-            raise ValueError('Только буквы латинского алфавита')
-        return v
+        return check_username(v)
     
     @validator('password')
     def validate_password(cls, v):
-        if len(v) < 8:
-            raise ValueError('Минимальная длина 8 символов')
-        if not any(char.isdigit() for char in v):
-            raise ValueError('Должен содержать хотя бы одну цифру')
-        if not any(char.isalpha() for char in v):
-            raise ValueError('Должен содержать хотя бы одну букву')
-        if not any(char.isupper() for char in v):
-            raise ValueError('Должен содержать хотя бы одну заглавную букву')
-        if not any(char.islower() for char in v):
-            raise ValueError('Должен содержать хотя бы одну строчную букву')
-        return v
+        return check_password(v)
     
     @validator('c_password')
     def validate_c_password(cls, v, values):
@@ -70,10 +69,39 @@ class RegisterRequest(BaseModel):
     
     @validator('birthday')
     def validate_birthday(cls, v):
-        age = (date.today() - v).days // 365
-        if age < 14:
-            raise ValueError('Возраст должен быть не менее 14 лет')
+        return check_birthday(v)
+
+class ImportUserRow(BaseModel):
+    """Строка массового импорта: пароль в открытом виде или готовый argon2-хеш"""
+    username: str
+    email: EmailStr
+    birthday: date
+    password: Optional[str] = None
+    password_hash: Optional[str] = None
+    
+    @validator('username')
+    def validate_username(cls, v):
+        return check_username(v)
+    
+    @validator('password')
+    def validate_password(cls, v):
+        return check_password(v) if v else v
+    
+    @validator('password_hash')
+    def validate_password_hash(cls, v):
+        if v and not v.startswith('$argon2'):
+            raise ValueError('Поддерживаются только argon2-хеши')
         return v
+    
+    @validator('birthday')
+    def validate_birthday(cls, v):
+        return check_birthday(v)
+    
+    @root_validator(skip_on_failure=True)
+    def validate_secret(cls, values):
+        if bool(values.get('password')) == bool(values.get('password_hash')):
+            raise ValueError('Требуется ровно одно из полей password / password_hash')
+        return values
 
 class UserResponse(BaseModel):
     id: int
@@ -83,6 +111,7 @@ class UserResponse(BaseModel):
     
     class Config:
         from_attributes = True
+        orm_mode = True  # pydantic 1.x (см. requirements.txt)
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -96,4 +125,14 @@ class TokenInfo(BaseModel):
     is_active: bool
 
 class MessageResponse(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+
+class ImportReport(BaseModel):
+    total: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[str] = []
\ No newline at end of file
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, root_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Tuple
+
+from app.core.config import settings
 
 class RoleBase(BaseModel):
     name: str
@@ -25,6 +27,7 @@ class RoleResponse(RoleBase):
     
     class Config:
         from_attributes = True
+        orm_mode = True  # pydantic 1.x (см. requirements.txt)
 
 class PermissionBase(BaseModel):
     name: str
@@ -49,6 +52,7 @@ class PermissionResponse(PermissionBase):
     
     class Config:
         from_attributes = True
+        orm_mode = True  # pydantic 1.x (см. requirements.txt)
 
 class UserRoleBase(BaseModel):
     user_id: int
@@ -67,6 +71,41 @@ class UserRoleResponse(UserRoleBase):
     
     class Config:
         from_attributes = True
+        orm_mode = True  # pydantic 1.x (см. requirements.txt)
+
+class BulkUserRoleRequest(BaseModel):
+    """Пакетное назначение/отзыв: список пар или одна роль для списка пользователей"""
+    items: List[UserRoleBase] = []
+    role_id: Optional[int] = None
+    user_ids: List[int] = []
+
+    @root_validator(skip_on_failure=True)
+    def validate_pairs(cls, values):
+        if values.get("user_ids") and values.get("role_id") is None:
+            raise ValueError('Для списка user_ids требуется role_id')
+        if values.get("role_id") is not None and not values.get("user_ids"):
+            raise ValueError('role_id используется только вместе со списком user_ids')
+        total = len(values.get("items") or []) + len(values.get("user_ids") or [])
+        if total == 0:
+            raise ValueError('Список назначений пуст')
+        if total > settings.MAX_BULK_ITEMS:
+            raise ValueError(f'Не более {settings.MAX_BULK_ITEMS} элементов за запрос')
+        return values
+
+    def pairs(self) -> List[Tuple[int, int]]:
+        """Уникальные пары (user_id, role_id) в порядке запроса"""
+        pairs = [(item.user_id, item.role_id) for item in self.items]
+        pairs.extend((user_id, self.role_id) for user_id in self.user_ids)
+        return list(dict.fromkeys(pairs))
+
+class BulkUserRoleResult(UserRoleBase):
+    # assigned, restored, already_assigned, revoked, not_assigned, user_not_found, role_not_found
+    status: str
+    id: Optional[int] = None
+
+class BulkUserRoleResponse(BaseModel):
+    results: List[BulkUserRoleResult]
+    changed: int
 
 class RolePermissionBase(BaseModel):
     role_id: int
@@ -84,4 +123,5 @@ class RolePermissionResponse(RolePermissionBase):
     is_active: bool
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+        orm_mode = True  # pydantic 1.x (см. requirements.txt)
\ No newline at end of file
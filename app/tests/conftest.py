@@ -5,6 +5,25 @@ import sys
 # Добавляем корневую директорию в путь
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Бюджеты SQL-запросов по маршрутам ("МЕТОД /шаблон/маршрута"), проверяемые фикстурой query_budget.
+# Каждый запрос с токеном выполняет запрос аутентификации (кэш принципалов по умолчанию отключен)
+QUERY_BUDGETS = {
+    "GET /auth/me": 2,
+    "GET /auth/tokens": 2,
+    "POST /auth/refresh": 5,
+    "POST /auth/logout": 2,
+    "GET /api/ref/policy/permission/": 3,
+    "POST /api/ref/policy/permission/": 5,
+    "GET /api/ref/policy/permission/{permission_id}": 4,
+    "PUT /api/ref/policy/permission/{permission_id}": 6,
+    "GET /api/ref/policy/role/{user_id}/role": 4,
+    "POST /api/ref/policy/role/{user_id}/role": 8,
+    "DELETE /api/ref/policy/role/{user_id}/role/{role_id}/soft": 6,
+    "POST /api/ref/policy/role/{user_id}/role/{role_id}/restore": 6,
+    "POST /api/ref/policy/role/bulk/assign": 5,
+}
+
+
 @pytest.fixture(autouse=True)
 def setup_test_environment():
     """Настройка тестового окружения"""
@@ -13,4 +32,94 @@ def setup_test_environment():
     yield
     # Очистка после тестов
     if os.path.exists("test.db"):
-        os.remove("test.db")
\ No newline at end of file
+        os.remove("test.db")
+
+@pytest.fixture(autouse=True)
+def slow_query_log_path(monkeypatch, tmp_path):
+    """Журнал медленных запросов пишется во временный каталог теста, а не в ./logs"""
+    from app.core.slow_query import slow_query_log
+
+    monkeypatch.setattr(slow_query_log, "path", str(tmp_path / "logs" / "slow.log"))
+    monkeypatch.setattr(slow_query_log, "summary", {})
+    slow_query_log.close()
+    yield slow_query_log
+    slow_query_log.close()
+
+@pytest.fixture(scope="function")
+def memory_session():
+    """Сессия изолированной БД в памяти"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.models.user import Base
+    from app.auth.session_store import clear_session_store
+    import app.models.role  # noqa: F401 - регистрация таблиц ролевой системы
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)()
+    # Токены хранилищ memory/kv живут дольше БД теста
+    clear_session_store()
+    try:
+        yield session
+    finally:
+        session.close()
+        clear_session_store()
+        engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def api_client(memory_session):
+    """Тестовый клиент API поверх БД в памяти"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.core.dependencies import get_db
+    from app.auth.principal import principal_cache
+
+    app.dependency_overrides[get_db] = lambda: memory_session
+    principal_cache.clear()
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+        principal_cache.clear()
+
+
+@pytest.fixture(scope="function")
+def auth_user(memory_session, api_client):
+    """Пользователь, от имени которого выполняются запросы api_client (настоящий access token)"""
+    from datetime import date
+    from app.auth.service import AuthService
+    from app.models.user import User
+
+    user = User(
+        username="TestUser",
+        email="test@example.com",
+        password_hash="hash",
+        birthday=date(2000, 1, 1)
+    )
+    memory_session.add(user)
+    memory_session.commit()
+    tokens = AuthService(memory_session).create_tokens(user)
+    api_client.headers["Authorization"] = f"Bearer {tokens.access_token}"
+    api_client.tokens = tokens
+    return user
+
+
+@pytest.fixture(scope="function")
+def query_budget():
+    """
+    Проверка бюджетов SQL-запросов и отсутствия N+1 для HTTP-запросов теста.
+
+    Бюджет маршрута можно переопределить в тесте: query_budget.limit("GET /auth/me", 1).
+    """
+    from app.core.query_counter import QueryBudget
+
+    budget = QueryBudget(QUERY_BUDGETS)
+    with budget.watch():
+        yield budget
+    budget.check()
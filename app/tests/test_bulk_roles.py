@@ -0,0 +1,86 @@
+from datetime import date
+
+from app.models.user import User
+from app.models.role import Role, UserRole
+
+
+def create_users_and_roles(db, users_count=3, roles_count=2):
+    """Создание тестовых пользователей и ролей"""
+    users = [
+        User(username=f"BulkUser{chr(65 + i)}", email=f"bulk{i}@example.com",
+             password_hash="hash", birthday=date(2000, 1, 1))
+        for i in range(users_count)
+    ]
+    roles = [Role(name=f"Role {i}", code=f"role-{i}", created_by=1) for i in range(roles_count)]
+    db.add_all(users + roles)
+    db.commit()
+    return users, roles
+
+
+class TestBulkAssign:
+    def test_assign_role_to_user_list(self, memory_session, api_client, auth_user):
+        """Тест назначения одной роли списку пользователей"""
+        users, roles = create_users_and_roles(memory_session)
+        user_ids = [user.id for user in users]
+
+        response = api_client.post("/api/ref/policy/role/bulk/assign", json={
+            "role_id": roles[0].id,
+            "user_ids": user_ids + [9999]
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["changed"] == 3
+        assert [item["status"] for item in data["results"]] == ["assigned"] * 3 + ["user_not_found"]
+        assert memory_session.query(UserRole).filter(UserRole.is_active == True).count() == 3
+
+    def test_assign_pairs_reports_per_item(self, memory_session, api_client, auth_user):
+        """Тест статусов по каждой паре: новая, уже назначенная, восстановленная"""
+        users, roles = create_users_and_roles(memory_session)
+        memory_session.add_all([
+            UserRole(user_id=users[0].id, role_id=roles[0].id, created_by=1),
+            UserRole(user_id=users[1].id, role_id=roles[0].id, created_by=1, is_active=False),
+        ])
+        memory_session.commit()
+
+        response = api_client.post("/api/ref/policy/role/bulk/assign", json={"items": [
+            {"user_id": users[0].id, "role_id": roles[0].id},
+            {"user_id": users[1].id, "role_id": roles[0].id},
+            {"user_id": users[2].id, "role_id": roles[1].id},
+            {"user_id": users[2].id, "role_id": 9999},
+        ]})
+
+        statuses = [item["status"] for item in response.json()["results"]]
+        assert statuses == ["already_assigned", "restored", "assigned", "role_not_found"]
+        assert memory_session.query(UserRole).count() == 3
+
+    def test_requires_role_for_user_list(self, api_client, auth_user):
+        """Тест валидации запроса без role_id"""
+        response = api_client.post("/api/ref/policy/role/bulk/assign", json={"user_ids": [1, 2]})
+        assert response.status_code == 422
+
+    def test_rejects_role_without_user_list(self, api_client, auth_user):
+        """Тест валидации: role_id без user_ids не игнорируется молча"""
+        response = api_client.post("/api/ref/policy/role/bulk/assign", json={
+            "role_id": 1, "items": [{"user_id": 1, "role_id": 2}]
+        })
+        assert response.status_code == 422
+
+
+class TestBulkRevoke:
+    def test_revoke(self, memory_session, api_client, auth_user):
+        """Тест пакетного отзыва ролей"""
+        users, roles = create_users_and_roles(memory_session)
+        api_client.post("/api/ref/policy/role/bulk/assign", json={
+            "role_id": roles[0].id, "user_ids": [user.id for user in users]
+        })
+
+        response = api_client.post("/api/ref/policy/role/bulk/revoke", json={
+            "role_id": roles[0].id, "user_ids": [users[0].id, users[1].id],
+            "items": [{"user_id": users[0].id, "role_id": roles[1].id}]
+        })
+
+        data = response.json()
+        assert [item["status"] for item in data["results"]] == ["not_assigned", "revoked", "revoked"]
+        active = memory_session.query(UserRole).filter(UserRole.is_active == True).all()
+        assert [ur.user_id for ur in active] == [users[2].id]
@@ -0,0 +1,81 @@
+from datetime import date
+
+import app.auth.service as auth_service_module
+from app.auth.service import AuthService
+from app.core.database import PoolMonitor
+from app.core.security import get_password_hash
+from app.models.user import User
+from app.schemas.auth import LoginRequest
+
+PASSWORD = "Password123"
+
+
+def create_user(db):
+    user = User(username="TestUser", email="test@example.com",
+                password_hash=get_password_hash(PASSWORD), birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    return user
+
+
+class TestConnectionRelease:
+    def test_no_connection_held_during_argon2(self, memory_session, monkeypatch):
+        """Тест: во время проверки пароля соединение возвращено в пул"""
+        monitor = PoolMonitor(memory_session.get_bind())
+        create_user(memory_session)
+        held_during_verify = []
+
+        original_verify = auth_service_module.verify_password
+
+        def tracking_verify(plain, hashed):
+            held_during_verify.append(monitor.checked_out)
+            return original_verify(plain, hashed)
+
+        monkeypatch.setattr(auth_service_module, "verify_password", tracking_verify)
+        user = AuthService(memory_session).authenticate_user(
+            LoginRequest(username="TestUser", password=PASSWORD)
+        )
+
+        assert held_during_verify == [0]
+        # Объект остается доступным после завершения читающей транзакции
+        assert user.email == "test@example.com"
+
+    def test_pool_released_after_request(self, memory_session, api_client):
+        """Тест: после запроса соединений не занято, пик - одно соединение"""
+        monitor = PoolMonitor(memory_session.get_bind())
+        response = api_client.post("/auth/register", json={
+            "username": "NewUserName", "email": "new@example.com",
+            "password": PASSWORD, "c_password": PASSWORD, "birthday": "2000-01-01"
+        })
+        assert response.status_code == 201
+
+        stats = monitor.stats()
+        assert stats["checked_out"] == 0
+        assert stats["peak"] == 1
+
+
+class TestRegisterRace:
+    REGISTER = {
+        "username": "NewUserName", "email": "new@example.com",
+        "password": PASSWORD, "c_password": PASSWORD, "birthday": "2000-01-01"
+    }
+
+    def test_concurrent_duplicate_is_bad_request(self, memory_session, api_client, monkeypatch):
+        """Тест: пользователь с тем же именем в другом регистре, созданный во время хеширования, - 400, а не 500"""
+        original_hash = auth_service_module.get_password_hash
+
+        def racing_hash(password):
+            # Параллельная регистрация между проверкой уникальности и вставкой
+            with memory_session.get_bind().begin() as conn:
+                conn.execute(User.__table__.insert(), {
+                    "username": "NEWUSERNAME", "email": "other@example.com",
+                    "password_hash": "hash", "birthday": date(2000, 1, 1)
+                })
+            return original_hash(password)
+
+        monkeypatch.setattr(auth_service_module, "get_password_hash", racing_hash)
+        response = api_client.post("/auth/register", json=self.REGISTER)
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Пользователь с таким именем уже существует"
+        assert memory_session.query(User).count() == 1
@@ -0,0 +1,103 @@
+from sqlalchemy import event
+
+from app.core.etag import POLICY_SCOPE, bump_versions, get_version, is_not_modified, user_scope
+from app.models.role import Role
+
+
+class TestPolicyVersion:
+    def test_bump_versions(self, memory_session):
+        """Тест монотонного увеличения версий"""
+        assert get_version(memory_session, POLICY_SCOPE) == 0
+        bump_versions(memory_session, [POLICY_SCOPE, user_scope(1)])
+        bump_versions(memory_session, [POLICY_SCOPE])
+        memory_session.commit()
+
+        assert get_version(memory_session, POLICY_SCOPE) == 2
+        assert get_version(memory_session, user_scope(1)) == 1
+
+    def test_bump_is_single_upsert(self, memory_session):
+        """Тест: новые и существующие области обновляются одним INSERT ... ON CONFLICT без SELECT"""
+        bump_versions(memory_session, [POLICY_SCOPE])
+        memory_session.commit()
+
+        statements = []
+        engine = memory_session.get_bind()
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            bump_versions(memory_session, [POLICY_SCOPE, user_scope(2)])
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        memory_session.commit()
+
+        assert len(statements) == 1
+        assert "ON CONFLICT" in statements[0]
+        assert get_version(memory_session, POLICY_SCOPE) == 2
+        assert get_version(memory_session, user_scope(2)) == 1
+
+
+class TestConditionalGet:
+    def test_permission_list_not_modified(self, memory_session, api_client, auth_user):
+        """Тест ответа 304 без обращения к таблице разрешений"""
+        response = api_client.get("/api/ref/policy/permission/")
+        etag = response.headers["ETag"]
+
+        statements = []
+        engine = memory_session.get_bind()
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = api_client.get("/api/ref/policy/permission/", headers={"If-None-Match": etag})
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert not any("FROM permissions" in statement for statement in statements)
+
+    def test_write_changes_etag(self, api_client, auth_user):
+        """Тест смены ETag после изменения политики"""
+        etag = api_client.get("/api/ref/policy/permission/").headers["ETag"]
+        response = api_client.post(
+            "/api/ref/policy/permission/",
+            json={"name": "Read report", "code": "read-report"}
+        )
+        assert response.status_code == 200
+
+        response = api_client.get("/api/ref/policy/permission/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_role_assignment_bumps_user_version(self, memory_session, api_client, auth_user):
+        """Тест смены версии пользователя при назначении роли"""
+        role = Role(name="Test Role", code="test_role", created_by=1)
+        memory_session.add(role)
+        memory_session.commit()
+
+        etag = api_client.get("/auth/me").headers["ETag"]
+        assert api_client.get("/auth/me", headers={"If-None-Match": etag}).status_code == 304
+
+        response = api_client.post(f"/api/ref/policy/role/{auth_user.id}/role", json={
+            "user_id": auth_user.id, "role_id": role.id
+        })
+        assert response.status_code == 200
+        assert api_client.get("/auth/me", headers={"If-None-Match": etag}).status_code == 200
+
+    def test_missing_permission_is_not_found_with_current_etag(self, api_client, auth_user):
+        """Тест: актуальный ETag не заменяет 404 для несуществующего разрешения на 304"""
+        etag = api_client.get("/api/ref/policy/permission/").headers["ETag"]
+
+        response = api_client.get("/api/ref/policy/permission/999999", headers={"If-None-Match": etag})
+        assert response.status_code == 404
+
+    def test_if_none_match_parsing(self):
+        """Тест разбора заголовка If-None-Match"""
+        class FakeRequest:
+            def __init__(self, value):
+                self.headers = {"if-none-match": value}
+
+        etag = 'W/"policy-3"'
+        assert is_not_modified(FakeRequest('"policy-3"'), etag)
+        assert is_not_modified(FakeRequest('W/"policy-2", W/"policy-3"'), etag)
+        assert is_not_modified(FakeRequest("*"), etag)
+        assert not is_not_modified(FakeRequest('W/"policy-2"'), etag)
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.core.export import stream_export
+from app.migrations.policy_loader import sync_policy
+from app.models.user import Token
+from app.models.role import Role, UserRole
+
+
+def fill_tokens(db, count, start=0):
+    """Массовая вставка токенов"""
+    expires = datetime.utcnow() + timedelta(days=1)
+    db.execute(insert(Token.__table__), [
+        {"user_id": i % 10, "token_hash": f"hash-{i}", "expires_at": expires,
+         "token_type": "access", "is_active": i % 2 == 0}
+        for i in range(start, start + count)
+    ])
+    db.commit()
+
+
+def grant_export(db, user):
+    """Выдача пользователю разрешения на выгрузку"""
+    sync_policy(db, {
+        "permissions": [{"code": "get-list-user", "name": "Get list user"}],
+        "roles": [{"code": "auditor", "name": "Аудитор", "permissions": "*"}],
+    })
+    role = db.query(Role).filter(Role.code == "auditor").one()
+    db.add(UserRole(user_id=user.id, role_id=role.id, created_by=1))
+    db.commit()
+
+
+def peak_memory(engine, table_name):
+    """Пиковая память при полной выгрузке таблицы"""
+    tracemalloc.start()
+    try:
+        for _ in stream_export(engine, table_name, "ndjson", batch_size=500):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class TestExport:
+    def test_ndjson_with_filters_and_resume(self, memory_session, api_client, auth_user):
+        """Тест NDJSON-выгрузки с фильтром и продолжением по курсору"""
+        grant_export(memory_session, auth_user)
+        fill_tokens(memory_session, 10)
+
+        response = api_client.get("/api/ref/export/tokens?is_active=true")
+        assert response.status_code == 200
+        # Токены сессии auth_user тоже активны: проверяются только вставленные строки
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        rows = [row for row in rows if row["user_id"] != auth_user.id]
+        assert len(rows) == 5
+        assert "token_hash" not in rows[0]
+
+        response = api_client.get(f"/api/ref/export/tokens?after_id={rows[2]['id']}&is_active=true")
+        resumed = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in resumed] == [row["id"] for row in rows[3:]]
+
+    def test_csv_excludes_password_hash(self, memory_session, api_client, auth_user):
+        """Тест CSV-выгрузки пользователей без хешей паролей"""
+        grant_export(memory_session, auth_user)
+
+        response = api_client.get("/api/ref/export/users?format=csv")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert rows[0]["username"] == auth_user.username
+        assert "password_hash" not in rows[0]
+
+    def test_requires_permission(self, api_client, auth_user):
+        """Тест запрета выгрузки без разрешения"""
+        assert api_client.get("/api/ref/export/users").status_code == 403
+
+    def test_unknown_table(self, api_client, auth_user):
+        """Тест неизвестной таблицы"""
+        assert api_client.get("/api/ref/export/secrets").status_code == 404
+
+    def test_memory_is_flat(self, memory_session):
+        """Тест постоянного расхода памяти при росте таблицы в 20 раз"""
+        engine = memory_session.get_bind()
+        fill_tokens(memory_session, 2000)
+        small = peak_memory(engine, "tokens")
+
+        fill_tokens(memory_session, 38000, start=2000)
+        large = peak_memory(engine, "tokens")
+
+        assert large < small * 2
@@ -0,0 +1,140 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+
+from app.auth.service import AuthService
+from app.core.group_commit import GroupCommitOverloaded, GroupCommitWriter
+from app.models.user import Base, User, Token
+import app.models.role  # noqa: F401
+
+TOKENS = Token.__table__
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """Файловая SQLite БД: писатель работает из своего потока"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'group.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def token_row(i, **overrides):
+    row = {"user_id": i, "token_hash": f"hash-{i}", "token_type": "access",
+           "expires_at": datetime.utcnow() + timedelta(hours=1)}
+    row.update(overrides)
+    return row
+
+
+def count_tokens(engine):
+    with engine.connect() as conn:
+        return conn.execute(TOKENS.select()).fetchall()
+
+
+class TestGroupCommitWriter:
+    def test_concurrent_writes_share_commits(self, file_engine):
+        """Тест: параллельные вставки объединяются в общие транзакции"""
+        commits = []
+        event.listen(file_engine, "commit", lambda conn: commits.append(1))
+        writer = GroupCommitWriter(file_engine, max_delay_ms=50, max_rows=1000).start()
+        try:
+            threads = [
+                threading.Thread(target=writer.write, args=(TOKENS, [token_row(i)]))
+                for i in range(20)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            writer.stop()
+
+        assert len(count_tokens(file_engine)) == 20
+        assert writer.rows == 20
+        assert len(commits) < 20
+
+    def test_batch_closes_at_max_rows(self, file_engine):
+        """Тест: пачка закрывается при наборе max_rows строк"""
+        writer = GroupCommitWriter(file_engine, max_delay_ms=10_000, max_rows=4)
+        futures = [writer.submit(TOKENS, [token_row(i)]) for i in range(4)]
+        writer.start()
+        try:
+            assert [future.result(timeout=5) for future in futures] == [1, 1, 1, 1]
+        finally:
+            writer.stop()
+        assert writer.batches == 1
+
+    def test_failed_row_does_not_fail_batch(self, file_engine):
+        """Тест: ошибочная строка не мешает остальным строкам пачки"""
+        writer = GroupCommitWriter(file_engine, max_delay_ms=10_000, max_rows=2)
+        good = writer.submit(TOKENS, [token_row(1)])
+        bad = writer.submit(TOKENS, [token_row(2, token_hash=None)])
+        writer.start()
+        try:
+            assert good.result(timeout=5) == 1
+            with pytest.raises(IntegrityError):
+                bad.result(timeout=5)
+        finally:
+            writer.stop()
+        assert len(count_tokens(file_engine)) == 1
+
+    def test_backpressure(self, file_engine):
+        """Тест: переполненная очередь отклоняет запись"""
+        writer = GroupCommitWriter(file_engine, queue_size=1, submit_timeout=0.05)
+        writer.submit(TOKENS, [token_row(1)])
+        with pytest.raises(GroupCommitOverloaded):
+            writer.submit(TOKENS, [token_row(2)])
+
+    def test_wait_timeout(self, file_engine):
+        """Тест: ожидание коммита ограничено, запись из очереди отменяется и не пишется"""
+        writer = GroupCommitWriter(file_engine, max_delay_ms=1)
+        with pytest.raises(GroupCommitOverloaded):
+            writer.write(TOKENS, [token_row(1)], timeout=0.05)
+
+        later = writer.submit(TOKENS, [token_row(2)])
+        writer.start()
+        try:
+            assert later.result(timeout=5) == 1
+        finally:
+            writer.stop()
+        assert [row.user_id for row in count_tokens(file_engine)] == [2]
+
+    def test_stop_drains_queue(self, file_engine):
+        """Тест: при остановке очередь дописывается, новые записи отклоняются"""
+        writer = GroupCommitWriter(file_engine, max_delay_ms=1, max_rows=2)
+        futures = [writer.submit(TOKENS, [token_row(i)]) for i in range(10)]
+        writer.start()
+        writer.stop()
+
+        assert all(future.done() for future in futures)
+        assert len(count_tokens(file_engine)) == 10
+        with pytest.raises(GroupCommitOverloaded):
+            writer.submit(TOKENS, [token_row(11)])
+
+
+class TestLoginWithGroupCommit:
+    def test_create_tokens_through_writer(self, file_engine):
+        """Тест: токены, записанные групповым коммитом, проходят аутентификацию"""
+        from sqlalchemy.orm import sessionmaker
+
+        db = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=file_engine)()
+        user = User(username="TestUser", email="test@example.com",
+                    password_hash="hash", birthday=date(2000, 1, 1))
+        db.add(user)
+        db.commit()
+
+        writer = GroupCommitWriter(file_engine, max_delay_ms=1).start()
+        try:
+            tokens = AuthService(db, token_writer=writer).create_tokens(user)
+        finally:
+            writer.stop()
+
+        # Семейство refresh-токенов и пара токенов - одна запись в очереди
+        assert writer.rows == 3
+        assert writer.batches == 1
+        assert not db.in_transaction()
+        assert AuthService(db).get_principal(tokens.access_token).id == user.id
+        db.close()
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.core.loop_watchdog import LoopWatchdog, LoopWatchdogMiddleware, BACKGROUND_ROUTE, event_loop_blocks
+
+
+def blocking_handler():
+    time.sleep(0.2)
+
+
+class TestLoopWatchdog:
+    def test_captures_route_and_stack_of_blocking_request(self):
+        """Тест: блокировка цикла дольше порога записывается с маршрутом и стеком виновника"""
+        watchdog = LoopWatchdog(threshold_ms=50, interval_ms=5)
+        scope = {"type": "http", "method": "POST", "route": SimpleNamespace(path="/auth/slow")}
+
+        async def endpoint(scope, receive, send):
+            blocking_handler()
+
+        async def main():
+            watchdog.start()
+            await asyncio.sleep(0.02)
+            await LoopWatchdogMiddleware(endpoint, watchdog)(scope, None, None)
+            await asyncio.sleep(0.05)
+            await watchdog.stop()
+
+        before = event_loop_blocks.value("/auth/slow")
+        asyncio.run(main())
+
+        assert len(watchdog.events) == 1
+        event = watchdog.events[0]
+        assert event["route"] == "/auth/slow"
+        assert event["method"] == "POST"
+        assert event["duration_ms"] >= 150
+        assert "blocking_handler" in "".join(event["stack"])
+        assert event_loop_blocks.value("/auth/slow") == before + 1
+        assert watchdog.culprits()[0]["route"] == "/auth/slow"
+        assert watchdog.requests == {}
+
+    def test_background_and_short_pauses(self):
+        """Тест: короткие паузы не считаются блокировкой, блокировка вне запроса - background"""
+        watchdog = LoopWatchdog(threshold_ms=50, interval_ms=5)
+
+        async def main():
+            watchdog.start()
+            await asyncio.sleep(0.02)
+            time.sleep(0.01)
+            await asyncio.sleep(0.02)
+            time.sleep(0.15)
+            await asyncio.sleep(0.05)
+            await watchdog.stop()
+
+        asyncio.run(main())
+
+        assert [event["route"] for event in watchdog.events] == [BACKGROUND_ROUTE]
+        assert not watchdog.running
@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.metrics import MetricsRegistry, Histogram
+from app.core.security import get_password_hash, verify_password
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        """Тест: корзины выдаются накопительно, с +Inf, суммой и количеством"""
+        histogram = Histogram("latency_seconds", "Задержка", ("route",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            histogram.observe(value, "/items")
+
+        assert histogram.samples() == [
+            'latency_seconds_bucket{route="/items",le="0.1"} 1',
+            'latency_seconds_bucket{route="/items",le="1.0"} 3',
+            'latency_seconds_bucket{route="/items",le="+Inf"} 4',
+            'latency_seconds_sum{route="/items"} 6.05',
+            'latency_seconds_count{route="/items"} 4',
+        ]
+
+    def test_registry_render(self):
+        """Тест: HELP/TYPE для каждой метрики, экранирование меток, запрет повторной регистрации"""
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "События", ("kind",))
+        counter.inc('say "hi"')
+        registry.callback("pool_size", "Размер пула", lambda: {(): 5})
+
+        text = registry.render()
+        assert "# TYPE events_total counter" in text
+        assert 'events_total{kind="say \\"hi\\""} 1' in text
+        assert "pool_size 5" in text
+        with pytest.raises(ValueError):
+            registry.counter("events_total", "Дубль")
+
+
+class TestMetricsEndpoint:
+    def test_route_templates_and_subsystems(self, api_client, auth_user):
+        """Тест: задержки по шаблону маршрута и статусу, метрики БД, JWT, кэша и пула"""
+        assert api_client.get("/auth/me").status_code == 200
+        assert api_client.get(f"/api/ref/user/{auth_user.id}/role").status_code == 200
+        assert api_client.get("/no-such-path").status_code == 404
+
+        response = api_client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        text = response.text
+        assert 'http_request_duration_seconds_count{method="GET",route="/api/ref/user/{user_id}/role",status="200"}' in text
+        assert 'route="unmatched",status="404"' in text
+        assert 'db_queries_per_request_count{route="/auth/me"}' in text
+        assert 'db_query_duration_seconds_count{tag="auth"}' in text
+        assert 'jwt_duration_seconds_count{operation="decode"}' in text
+        assert 'cache_requests_total{cache="principal",result="miss"}' in text
+        assert "db_pool_checkout_wait_seconds_count" in text
+        assert "# TYPE db_pool_connections_checked_out gauge" in text
+        for name in ("db_pool_checkouts_total", "db_pool_hold_seconds_total", "db_pool_wait_seconds_total"):
+            assert f"# TYPE {name} counter" in text
+        assert "db_pool_connections{" not in text
+
+    def test_password_hash_timings(self):
+        """Тест: хеширование и проверка пароля попадают в гистограмму argon2"""
+        from app.core.metrics import password_hash_duration
+
+        before = password_hash_duration.count("verify")
+        assert verify_password("Secret123", get_password_hash("Secret123"))
+        assert password_hash_duration.count("verify") == before + 1
+        assert password_hash_duration.count("hash") >= 1
@@ -0,0 +1,84 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select, text
+
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.core.security import hash_token
+from app.models.user import User, Token
+
+
+@pytest.fixture
+def opaque_mode(monkeypatch):
+    monkeypatch.setattr(settings, "TOKEN_MODE", "opaque")
+    monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 10)
+
+
+def create_user(db):
+    user = User(username="TestUser", email="test@example.com",
+                password_hash="hash", birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    return user
+
+
+class TestOpaqueTokens:
+    def test_issue_short_opaque_tokens(self, memory_session, opaque_mode):
+        """Тест: непрозрачные токены короче JWT и хранятся как SHA-256"""
+        user = create_user(memory_session)
+        tokens = AuthService(memory_session).create_tokens(user)
+
+        assert tokens.access_token.startswith("oat_")
+        assert tokens.refresh_token.startswith("ort_")
+        assert len(tokens.access_token) == 47
+        stored = {token.token_hash for token in memory_session.query(Token)}
+        assert stored == {hash_token(tokens.access_token), hash_token(tokens.refresh_token)}
+
+    def test_authenticate_refresh_and_logout(self, memory_session, api_client, opaque_mode):
+        """Тест: полный цикл непрозрачного токена через API"""
+        user = create_user(memory_session)
+        tokens = AuthService(memory_session).create_tokens(user)
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+
+        response = api_client.get("/auth/me", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == "TestUser"
+
+        response = api_client.post("/auth/refresh", json={"refresh_token": tokens.refresh_token})
+        assert response.status_code == 200
+        assert response.json()["refresh_token"].startswith("ort_")
+
+        assert api_client.post("/auth/logout", headers=headers).status_code == 200
+        assert api_client.get("/auth/me", headers=headers).status_code == 401
+
+    def test_token_type_checked_by_prefix(self, memory_session, opaque_mode):
+        """Тест: refresh token не принимается как access token и наоборот"""
+        tokens = AuthService(memory_session).create_tokens(create_user(memory_session))
+
+        with pytest.raises(ValueError, match="Требуется access token"):
+            AuthService(memory_session).get_principal(tokens.refresh_token)
+        with pytest.raises(ValueError, match="Требуется refresh token"):
+            AuthService(memory_session).refresh_tokens(tokens.access_token)
+
+    def test_unknown_opaque_token(self, memory_session, opaque_mode):
+        """Тест: неизвестный непрозрачный токен отклоняется"""
+        with pytest.raises(ValueError):
+            AuthService(memory_session).get_principal("oat_" + "x" * 43)
+        with pytest.raises(ValueError):
+            AuthService(memory_session).refresh_tokens("ort_" + "x" * 43)
+
+    def test_jwt_still_accepted_after_switch(self, memory_session, monkeypatch):
+        """Тест: JWT, выданные до переключения режима, продолжают работать"""
+        user = create_user(memory_session)
+        tokens = AuthService(memory_session).create_tokens(user)
+        monkeypatch.setattr(settings, "TOKEN_MODE", "opaque")
+
+        assert AuthService(memory_session).get_principal(tokens.access_token).id == user.id
+
+    def test_lookup_uses_token_hash_index(self, memory_session):
+        """Тест: поиск по хешу токена идет по индексу"""
+        query = select(Token.id).where(Token.token_hash == "digest")
+        compiled = query.compile(compile_kwargs={"literal_binds": True})
+        plan = memory_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        assert any("ix_tokens_token_hash" in row[-1] for row in plan)
@@ -0,0 +1,78 @@
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.role import Permission, Role, UserRole
+
+
+class TestCursor:
+    def test_cursor_roundtrip(self):
+        """Тест кодирования и декодирования курсора"""
+        assert decode_cursor(encode_cursor(42)) == 42
+
+    def test_invalid_cursor(self, api_client, auth_user):
+        """Тест отказа при поврежденном курсоре"""
+        response = api_client.get("/api/ref/policy/permission/?cursor=broken")
+        assert response.status_code == 400
+
+
+class TestPermissionPagination:
+    def test_pages_follow_next_link(self, memory_session, api_client, auth_user):
+        """Тест обхода всех страниц по курсору"""
+        for i in range(7):
+            memory_session.add(Permission(name=f"Perm {i}", code=f"perm-{i}", created_by=auth_user.id))
+        memory_session.commit()
+
+        codes = []
+        url = "/api/ref/policy/permission/?limit=3"
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == 200
+            codes.extend(item["code"] for item in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            url = f"/api/ref/policy/permission/?limit=3&cursor={cursor}" if cursor else None
+
+        assert codes == [f"perm-{i}" for i in range(7)]
+
+    def test_filters(self, memory_session, api_client, auth_user):
+        """Тест фильтров по префиксу кода, активности и автору"""
+        memory_session.add_all([
+            Permission(name="Read user", code="read-user", created_by=auth_user.id),
+            Permission(name="Read role", code="read-role", created_by=2),
+            Permission(name="Create user", code="create-user", created_by=auth_user.id),
+            Permission(name="Read_x", code="read_x", created_by=auth_user.id, is_active=False),
+        ])
+        memory_session.commit()
+
+        response = api_client.get("/api/ref/policy/permission/?code_prefix=read-")
+        assert [p["code"] for p in response.json()] == ["read-user", "read-role"]
+
+        response = api_client.get(f"/api/ref/policy/permission/?code_prefix=read&created_by={auth_user.id}")
+        assert [p["code"] for p in response.json()] == ["read-user"]
+
+        response = api_client.get("/api/ref/policy/permission/?is_active=false&code_prefix=read_")
+        assert [p["code"] for p in response.json()] == ["read_x"]
+        assert "Link" not in response.headers
+
+    def test_max_page_size(self, api_client, auth_user):
+        """Тест ограничения максимального размера страницы"""
+        response = api_client.get("/api/ref/policy/permission/?limit=100000")
+        assert response.status_code == 422
+
+
+class TestUserRolePagination:
+    def test_user_roles_paginated(self, memory_session, api_client, auth_user):
+        """Тест пагинации ролей пользователя"""
+        for i in range(3):
+            role = Role(name=f"Role {i}", code=f"role-{i}", created_by=1)
+            memory_session.add(role)
+            memory_session.flush()
+            memory_session.add(UserRole(user_id=auth_user.id, role_id=role.id, created_by=1))
+        memory_session.commit()
+
+        response = api_client.get(f"/api/ref/policy/role/{auth_user.id}/role?limit=2")
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+        assert 'rel="next"' in response.headers["Link"]
+
+        cursor = response.headers["X-Next-Cursor"]
+        response = api_client.get(f"/api/ref/policy/role/{auth_user.id}/role?limit=2&cursor={cursor}")
+        assert len(response.json()) == 1
+        assert "X-Next-Cursor" not in response.headers
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from app.core.etag import POLICY_SCOPE, get_version
+from app.migrations.policy_loader import build_plan, sync_policy, load_document
+from app.models.role import Role, Permission, RolePermission
+
+POLICY = {
+    "permissions": [
+        {"code": "read-user", "name": "Read user"},
+        {"code": "update-user", "name": "Update user"},
+        {"code": "read-role", "name": "Read role", "description": "Чтение ролей"},
+    ],
+    "roles": [
+        {"code": "admin", "name": "Администратор", "permissions": "*"},
+        {"code": "user", "name": "Пользователь", "permissions": ["read-user"]},
+    ],
+}
+
+
+def active_grants(db):
+    """Активные связи роль-разрешение в виде пар кодов"""
+    rows = db.query(Role.code, Permission.code).join(
+        RolePermission, RolePermission.role_id == Role.id
+    ).join(Permission, RolePermission.permission_id == Permission.id).filter(
+        RolePermission.is_active == True
+    )
+    return set(rows)
+
+
+class TestPolicyLoader:
+    def test_initial_apply(self, memory_session):
+        """Тест применения политики к пустой БД"""
+        plan = sync_policy(memory_session, POLICY)
+
+        assert len(plan.permissions.create) == 3
+        assert len(plan.roles.create) == 2
+        assert active_grants(memory_session) == {
+            ("admin", "read-user"), ("admin", "update-user"), ("admin", "read-role"),
+            ("user", "read-user"),
+        }
+        assert get_version(memory_session, POLICY_SCOPE) == 1
+
+    def test_reapply_is_noop(self, memory_session):
+        """Тест идемпотентности: повторное применение не дает изменений"""
+        sync_policy(memory_session, POLICY)
+        plan = sync_policy(memory_session, POLICY)
+
+        assert plan.is_empty
+        assert get_version(memory_session, POLICY_SCOPE) == 1
+
+    def test_dry_run_does_not_write(self, memory_session):
+        """Тест режима dry-run"""
+        plan = sync_policy(memory_session, POLICY, dry_run=True)
+
+        assert not plan.is_empty
+        assert any("+ read-user" in line for line in plan.describe())
+        assert memory_session.query(Permission).count() == 0
+
+    def test_update_and_prune(self, memory_session):
+        """Тест обновления полей и мягкого удаления лишнего при prune"""
+        sync_policy(memory_session, POLICY)
+        changed = {
+            "prune": True,
+            "permissions": [
+                {"code": "read-user", "name": "Read users"},
+                {"code": "update-user", "name": "Update user"},
+            ],
+            "roles": [{"code": "user", "name": "Пользователь", "permissions": ["update-user"]}],
+        }
+        plan = sync_policy(memory_session, changed)
+
+        assert [item["code"] for item in plan.permissions.update] == ["read-user"]
+        assert len(plan.permissions.delete) == 1
+        assert len(plan.roles.delete) == 1
+        # Связи удаленной роли admin и удаленного разрешения read-role отключены вместе с ними
+        assert active_grants(memory_session) == {("user", "update-user")}
+        read_role = memory_session.query(Permission).filter(Permission.code == "read-role").one()
+        assert read_role.is_active == False
+
+    def test_inactive_permission_rejected(self, memory_session):
+        """Тест отказа при ссылке на удаленное разрешение, которого нет в документе"""
+        sync_policy(memory_session, POLICY)
+        read_role = memory_session.query(Permission).filter(Permission.code == "read-role").one()
+        read_role.is_active = False
+        memory_session.commit()
+
+        with pytest.raises(ValueError):
+            build_plan(memory_session, {"roles": [{"code": "user", "name": "Пользователь",
+                                                   "permissions": ["read-role"]}]})
+
+        # Разрешение из документа восстанавливается вместе со связью
+        sync_policy(memory_session, {
+            "permissions": [{"code": "read-role", "name": "Read role", "description": "Чтение ролей"}],
+            "roles": [{"code": "user", "name": "Пользователь", "permissions": ["read-role"]}],
+        })
+        memory_session.refresh(read_role)
+        assert read_role.is_active == True
+        assert ("user", "read-role") in active_grants(memory_session)
+
+    def test_unknown_permission_rejected(self, memory_session):
+        """Тест отказа при ссылке на несуществующее разрешение"""
+        with pytest.raises(ValueError):
+            build_plan(memory_session, {"roles": [{"code": "x", "name": "X", "permissions": ["nope"]}]})
+
+    def test_load_json_and_yaml(self, tmp_path):
+        """Тест чтения документа из JSON и YAML"""
+        json_path = tmp_path / "policy.json"
+        json_path.write_text(json.dumps(POLICY), encoding="utf-8")
+        assert load_document(str(json_path)) == POLICY
+
+        yaml = pytest.importorskip("yaml")
+        yaml_path = tmp_path / "policy.yaml"
+        yaml_path.write_text(yaml.safe_dump(POLICY, allow_unicode=True), encoding="utf-8")
+        assert load_document(str(yaml_path)) == POLICY
@@ -0,0 +1,149 @@
+import dataclasses
+import threading
+
+import pytest
+
+from app.auth.principal import Principal, principal_cache
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.migrations.policy_loader import sync_policy
+from app.models.role import Role, UserRole
+
+PASSWORD = "Password123"
+
+
+def grant_roles(db, user):
+    """Две роли: активная с разрешением и отключенная"""
+    sync_policy(db, {
+        "permissions": [
+            {"code": "get-list-user", "name": "Get list user"},
+            {"code": "delete-user", "name": "Delete user"},
+        ],
+        "roles": [
+            {"code": "auditor", "name": "Аудитор", "permissions": ["get-list-user"]},
+            {"code": "admin", "name": "Администратор", "permissions": "*"},
+        ],
+    })
+    roles = {role.code: role for role in db.query(Role)}
+    roles["admin"].is_active = False
+    for role in roles.values():
+        db.add(UserRole(user_id=user.id, role_id=role.id, created_by=1))
+    db.commit()
+    return roles
+
+
+class TestPrincipal:
+    def test_principal_contains_active_roles_and_permissions(self, memory_session, api_client, auth_user):
+        """Тест: принципал содержит только активные роли и их разрешения"""
+        roles = grant_roles(memory_session, auth_user)
+
+        principal = AuthService(memory_session).get_principal(api_client.tokens.access_token)
+
+        assert principal.id == auth_user.id
+        assert principal.username == "TestUser"
+        assert principal.email == "test@example.com"
+        assert principal.role_ids == frozenset({roles["auditor"].id})
+        assert principal.permissions == frozenset({"get-list-user"})
+        assert principal.has_permission("get-list-user")
+        assert not principal.has_permission("delete-user")
+
+    def test_principal_is_immutable_and_slotted(self, memory_session, api_client, auth_user):
+        """Тест: принципал неизменяем и не имеет __dict__"""
+        principal = AuthService(memory_session).get_principal(api_client.tokens.access_token)
+
+        assert not hasattr(principal, "__dict__")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            principal.username = "Other"
+
+    def test_refresh_token_rejected(self, api_client, auth_user):
+        """Тест: refresh token не принимается как access token"""
+        response = api_client.get("/auth/me", headers={
+            "Authorization": f"Bearer {api_client.tokens.refresh_token}"
+        })
+        assert response.status_code == 401
+
+    def test_logout_revokes_current_token(self, api_client, auth_user):
+        """Тест: выход отзывает именно токен запроса (и сбрасывает кэш)"""
+        assert api_client.get("/auth/me").status_code == 200
+        assert api_client.post("/auth/logout").status_code == 200
+        assert api_client.get("/auth/me").status_code == 401
+
+    def test_change_password_loads_orm_user(self, memory_session, api_client, auth_user):
+        """Тест: смена пароля работает через ORM-объект и отзывает токены"""
+        from app.core.security import get_password_hash
+
+        auth_user.password_hash = get_password_hash(PASSWORD)
+        memory_session.commit()
+
+        response = api_client.post("/auth/change_password", json={
+            "currentPassword": PASSWORD, "newPassword": "NewPassword456"
+        })
+        assert response.status_code == 200
+        assert api_client.get("/auth/me").status_code == 401
+
+
+class TestPrincipalCache:
+    @pytest.fixture(autouse=True)
+    def enable_cache(self, monkeypatch):
+        """Кэш по умолчанию отключен - тесты включают его явно"""
+        monkeypatch.setattr(principal_cache, "ttl", 30)
+
+    def test_disabled_by_default(self, memory_session, api_client, auth_user, monkeypatch):
+        """Тест: с TTL по умолчанию (0) каждый запрос аутентифицируется по БД"""
+        monkeypatch.setattr(principal_cache, "ttl", settings.PRINCIPAL_CACHE_TTL)
+        monkeypatch.setattr(settings, "QUERY_COUNT_HEADERS", True)
+        assert settings.PRINCIPAL_CACHE_TTL == 0
+
+        for _ in range(2):
+            response = api_client.get("/auth/me")
+            assert response.headers["X-DB-Auth-Queries"] == "1"
+        assert len(principal_cache) == 0
+
+    def test_single_auth_query_then_cache_hit(self, memory_session, api_client, auth_user, monkeypatch):
+        """Тест: первый запрос - один запрос аутентификации, повторный - из кэша"""
+        monkeypatch.setattr(settings, "QUERY_COUNT_HEADERS", True)
+        grant_roles(memory_session, auth_user)
+
+        response = api_client.get("/api/ref/export/users")
+        assert response.status_code == 200
+        assert response.headers["X-DB-Auth-Queries"] == "1"
+
+        response = api_client.post("/auth/logout")
+        assert response.status_code == 200
+        assert response.headers["X-DB-Auth-Queries"] == "0"
+
+    def test_missing_permission(self, api_client, auth_user, monkeypatch):
+        """Тест: отказ в доступе без дополнительных запросов проверки разрешения"""
+        monkeypatch.setattr(settings, "QUERY_COUNT_HEADERS", True)
+        response = api_client.get("/api/ref/export/users")
+        assert response.status_code == 403
+        assert response.headers["X-DB-Queries"] == "1"
+
+    def test_role_change_invalidates_after_commit(self, memory_session, api_client, auth_user):
+        """Тест: назначение роли сбрасывает закэшированный принципал"""
+        assert api_client.get("/api/ref/export/users").status_code == 403
+        assert len(principal_cache) == 1
+
+        grant_roles(memory_session, auth_user)
+        assert len(principal_cache) == 0
+        assert api_client.get("/api/ref/export/users").status_code == 200
+
+    def test_concurrent_access(self, memory_session, api_client, auth_user):
+        """Тест: один экземпляр принципала безопасно разделяется между потоками"""
+        token = api_client.tokens.access_token
+        AuthService(memory_session).get_principal(token)
+        results = []
+
+        def worker():
+            for _ in range(100):
+                results.append(AuthService(memory_session).get_principal(token))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 400
+        assert all(principal is results[0] for principal in results)
+        assert isinstance(results[0], Principal)
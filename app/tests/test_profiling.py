@@ -0,0 +1,110 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore, SamplingProfiler, profile_store, route_slug
+from app.migrations.policy_loader import sync_policy
+from app.models.role import Role, UserRole
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def grant_profiles(db, user):
+    sync_policy(db, {
+        "permissions": [{"code": "view-profiles", "name": "View profiles"}],
+        "roles": [{"code": "admin", "name": "Администратор", "permissions": "*"}],
+    })
+    role = db.query(Role).filter(Role.code == "admin").one()
+    db.add(UserRole(user_id=user.id, role_id=role.id, created_by=1))
+    db.commit()
+
+
+@pytest.fixture
+def profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "admin-secret")
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path / "profiles"))
+    return profile_store
+
+
+class TestSamplingProfiler:
+    def test_collects_busy_thread(self):
+        """Тест: стеки занятого потока попадают в профиль, простаивающие - нет"""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,))
+        worker.start()
+        profiler = SamplingProfiler(0.001).start()
+        time.sleep(0.05)
+        stacks = profiler.stop()
+        stop.set()
+        worker.join()
+
+        assert profiler.samples > 0
+        assert any("busy_loop (test_profiling.py" in stack for stack in stacks)
+        assert not any(stack.rsplit(";", 1)[-1].startswith("wait (threading.py") for stack in stacks)
+
+    def test_store(self, tmp_path):
+        """Тест: файлы по маршрутам, ограничение числа, слияние и защита путей"""
+        store = ProfileStore(str(tmp_path), max_per_route=2)
+        for count in (1, 2, 3):
+            store.save("/auth/me", "GET", 200, 0.01, Counter({"main;handler": count}))
+            time.sleep(0.001)
+
+        profiles = store.list()
+        assert len(profiles) == 2
+        assert {profile["route"] for profile in profiles} == {"auth_me"}
+        assert store.merged("auth_me") == "main;handler 5\n"
+        assert store.path("auth_me", profiles[0]["name"])
+        assert store.path("..", profiles[0]["name"]) is None
+        assert store.path("auth_me", "../../etc/passwd") is None
+        assert route_slug("/roles/{role_id}") == "roles_role_id"
+
+
+class TestProfilingMiddleware:
+    def test_header_triggers_profile(self, api_client, auth_user, profiling):
+        """Тест: профиль снимается только по секрету администратора"""
+        assert api_client.get("/auth/me", headers={"X-Profile": "wrong"}).status_code == 200
+        assert profiling.list() == []
+
+        assert api_client.get("/auth/me", headers={"X-Profile": "admin-secret"}).status_code == 200
+        profiles = profiling.list()
+        assert len(profiles) == 1
+        assert profiles[0]["route"] == "auth_me"
+        assert "-GET-200-" in profiles[0]["name"]
+
+    def test_sampling(self, api_client, auth_user, profiling, monkeypatch):
+        """Тест: при выборке 100% профилируется каждый запрос"""
+        monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+        api_client.get("/auth/me")
+        api_client.get("/auth/me")
+        assert len(profiling.list()) == 2
+
+    def test_disabled(self, api_client, auth_user, profiling, monkeypatch):
+        """Тест: без PROFILING_ENABLED заголовок игнорируется"""
+        monkeypatch.setattr(settings, "PROFILING_ENABLED", False)
+        api_client.get("/auth/me", headers={"X-Profile": "admin-secret"})
+        assert profiling.list() == []
+
+    def test_endpoints_require_permission(self, memory_session, api_client, auth_user, profiling):
+        """Тест: список и скачивание профилей доступны только с разрешением view-profiles"""
+        api_client.get("/auth/me", headers={"X-Profile": "admin-secret"})
+        assert api_client.get("/api/debug/profiles/").status_code == 403
+
+        grant_profiles(memory_session, auth_user)
+        from app.auth.principal import principal_cache
+        principal_cache.clear()
+
+        listed = api_client.get("/api/debug/profiles/")
+        assert listed.status_code == 200
+        profile = listed.json()[0]
+        downloaded = api_client.get(f"/api/debug/profiles/{profile['route']}/{profile['name']}")
+        assert downloaded.status_code == 200
+        assert api_client.get(f"/api/debug/profiles/{profile['route']}").status_code == 200
+        assert api_client.get("/api/debug/profiles/auth_me/missing.collapsed").status_code == 404
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.query_counter import QueryBudget, QueryBudgetExceeded, count_queries
+from app.models.role import Role
+from app.models.user import User
+
+
+class TestQueryCounter:
+    def test_repeated_statements(self, memory_session):
+        """Тест: один и тот же запрос с разными параметрами считается повтором (N+1)"""
+        with count_queries() as counter:
+            for user_id in range(3):
+                memory_session.execute(select(User).where(User.id == user_id)).all()
+            memory_session.execute(select(Role)).all()
+
+        assert counter.total == 4
+        assert counter.seconds > 0
+        assert list(counter.repeated(3).values()) == [3]
+        assert counter.repeated(4) == {}
+
+    def test_budget_violations(self):
+        """Тест: превышение бюджета маршрута и N+1 попадают в отчет"""
+        budget = QueryBudget({"GET /items": 2}, repeat_threshold=3)
+        with count_queries() as counter:
+            pass
+        counter.total = 3
+        counter.statements = {"SELECT 1": 3}
+        budget.observe("GET", "/items", counter)
+
+        problems = budget.violations()
+        assert len(problems) == 2
+        assert "бюджете 2" in problems[0]
+        assert "N+1" in problems[1]
+        with pytest.raises(QueryBudgetExceeded):
+            budget.check()
+
+
+class TestRouteBudgets:
+    """Основные маршруты укладываются в бюджеты QUERY_BUDGETS (conftest) без N+1"""
+
+    def test_policy_routes(self, api_client, auth_user, memory_session, query_budget):
+        role = Role(name="Role", code="role-x", created_by=auth_user.id)
+        memory_session.add(role)
+        memory_session.commit()
+
+        assert api_client.get("/auth/me").status_code == 200
+        assert api_client.get("/auth/tokens").status_code == 200
+        assert api_client.get("/api/ref/policy/permission/").status_code == 200
+        created = api_client.post("/api/ref/policy/permission/",
+                                  json={"name": "Perm", "code": "perm-x", "description": "d"})
+        permission_id = created.json()["id"]
+        assert api_client.get(f"/api/ref/policy/permission/{permission_id}").status_code == 200
+        assert api_client.put(f"/api/ref/policy/permission/{permission_id}",
+                              json={"name": "Perm 2", "code": "perm-x"}).status_code == 200
+
+        user_roles = f"/api/ref/policy/role/{auth_user.id}/role"
+        assert api_client.post(user_roles, json={"user_id": auth_user.id, "role_id": role.id}).status_code == 200
+        assert api_client.get(user_roles).status_code == 200
+        assert api_client.delete(f"{user_roles}/{role.id}/soft").status_code == 200
+        assert api_client.post(f"{user_roles}/{role.id}/restore").status_code == 200
+        assert api_client.post("/api/ref/policy/role/bulk/assign",
+                               json={"role_id": role.id, "user_ids": [auth_user.id]}).status_code == 200
+
+        refreshed = api_client.post("/auth/refresh", json={"refresh_token": api_client.tokens.refresh_token})
+        assert refreshed.status_code == 200
+        assert api_client.post("/auth/logout").status_code == 200
+
+        assert len(query_budget.requests) == 13
+        assert query_budget.violations() == []
+
+    def test_debug_headers(self, api_client, auth_user, monkeypatch):
+        """Тест: в отладочном режиме счетчики отдаются в заголовках"""
+        monkeypatch.setattr(settings, "QUERY_COUNT_HEADERS", True)
+        response = api_client.get("/auth/me")
+
+        assert response.headers["X-DB-Queries"] == "2"
+        assert response.headers["X-DB-Auth-Queries"] == "1"
+        assert float(response.headers["X-DB-Time-Ms"]) > 0
+        assert response.headers["X-DB-Max-Repeats"] == "1"
@@ -0,0 +1,102 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.core.security import verify_token
+from app.models.user import User, Token, RefreshFamily
+
+
+@pytest.fixture(autouse=True)
+def token_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 20)
+
+
+def create_user(db):
+    user = User(username="TestUser", email="test@example.com",
+                password_hash="hash", birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def active_tokens(db, family_id):
+    return db.query(Token).filter(Token.family_id == family_id, Token.is_active == True).count()
+
+
+class TestRefreshFamilies:
+    def test_claims_and_rotation(self, memory_session):
+        """Тест: refresh token содержит семейство и номер ротации"""
+        service = AuthService(memory_session)
+        tokens = service.create_tokens(create_user(memory_session))
+        claims = verify_token(tokens.refresh_token)
+        assert claims["seq"] == 0
+
+        rotated = verify_token(service.refresh_tokens(tokens.refresh_token).refresh_token)
+        assert rotated["fam"] == claims["fam"]
+        assert rotated["seq"] == 1
+        assert memory_session.get(RefreshFamily, claims["fam"]).seq == 1
+
+    def test_reuse_revokes_only_compromised_family(self, memory_session):
+        """Тест: повторное использование отзывает только свое семейство"""
+        user = create_user(memory_session)
+        service = AuthService(memory_session)
+        stolen = service.create_tokens(user)
+        other_session = service.create_tokens(user)
+        service.refresh_tokens(stolen.refresh_token)
+
+        with pytest.raises(ValueError):
+            service.refresh_tokens(stolen.refresh_token)
+
+        stolen_family = verify_token(stolen.refresh_token)["fam"]
+        other_family = verify_token(other_session.refresh_token)["fam"]
+        assert not memory_session.get(RefreshFamily, stolen_family).is_active
+        assert active_tokens(memory_session, stolen_family) == 0
+        assert active_tokens(memory_session, other_family) == 2
+        assert service.refresh_tokens(other_session.refresh_token).access_token
+
+    def test_rotation_uses_constant_statements(self, memory_session):
+        """Тест: ротация не зависит от числа токенов пользователя"""
+        user = create_user(memory_session)
+        service = AuthService(memory_session)
+        for _ in range(5):
+            service.create_tokens(user)
+        tokens = service.create_tokens(user)
+
+        statements = []
+        engine = memory_session.get_bind()
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            service.refresh_tokens(tokens.refresh_token)
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        # пользователь, ротация семейства, отзыв прежнего refresh, лимит, вставка пары
+        assert len(statements) == 5
+
+    def test_opaque_reuse(self, memory_session, monkeypatch):
+        """Тест: повторное использование непрозрачного токена отзывает семейство"""
+        monkeypatch.setattr(settings, "TOKEN_MODE", "opaque")
+        service = AuthService(memory_session)
+        tokens = service.create_tokens(create_user(memory_session))
+        fresh = service.refresh_tokens(tokens.refresh_token)
+
+        with pytest.raises(ValueError):
+            service.refresh_tokens(tokens.refresh_token)
+        with pytest.raises(ValueError):
+            service.refresh_tokens(fresh.refresh_token)
+        assert memory_session.query(Token).filter(Token.is_active == True).count() == 0
+
+    def test_logout_all_revokes_families(self, memory_session):
+        """Тест: выход со всех устройств отзывает все семейства"""
+        user = create_user(memory_session)
+        service = AuthService(memory_session)
+        tokens = service.create_tokens(user)
+        service.logout_all(user.id)
+
+        assert memory_session.query(RefreshFamily).filter(RefreshFamily.is_active == True).count() == 0
+        with pytest.raises(ValueError):
+            service.refresh_tokens(tokens.refresh_token)
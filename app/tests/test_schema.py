@@ -0,0 +1,35 @@
+import os
+
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+
+from app.core.database import ALEMBIC_INI, SCHEMA_REVISION, ensure_schema, get_schema_revision
+from app.models.user import Base
+import app.models.role  # noqa: F401
+
+
+class TestSchemaMigrations:
+    def test_schema_revision_is_head(self):
+        """Тест: SCHEMA_REVISION совпадает с последней миграцией"""
+        config = Config(ALEMBIC_INI)
+        config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "app/migrations/alembic"))
+        assert ScriptDirectory.from_config(config).get_current_head() == SCHEMA_REVISION
+
+    def test_migrations_match_models(self, tmp_path):
+        """Тест: схема после миграций совпадает с моделями"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+        assert ensure_schema(engine) is True
+        assert get_schema_revision(engine) == SCHEMA_REVISION
+
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        # Индексы по выражениям (lower(...)) autogenerate не сравнивает
+        diff = [item for item in diff if not (item[0] == "add_index" and "lower" in item[1].name)]
+        assert diff == []
+
+        # Повторная проверка не выполняет DDL
+        assert ensure_schema(engine) is False
+        engine.dispose()
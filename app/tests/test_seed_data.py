@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.query_counter import count_queries
+from app.migrations import seed_data
+from app.migrations.policy_loader import sync_policy
+from app.migrations.seed_data import (
+    SEED_PERMISSIONS,
+    assign_permissions_to_roles,
+    create_admin_user,
+    create_initial_permissions,
+    create_initial_roles,
+    restore_snapshot,
+    run_all_seeds,
+    save_snapshot,
+    seed_fingerprint,
+    seed_policy,
+)
+from app.models.role import Permission, Role, RolePermission, UserRole
+from app.models.user import Base, User
+
+
+def seed_all(db):
+    create_initial_roles(db)
+    create_initial_permissions(db)
+    assign_permissions_to_roles(db)
+    create_admin_user(db)
+
+
+def row_counts(db):
+    return {model.__tablename__: db.query(model).count() for model in (Role, Permission, RolePermission, UserRole, User)}
+
+
+class TestSeedData:
+    def test_idempotent(self, memory_session):
+        """Тест: повторный запуск сидов ничего не меняет"""
+        seed_all(memory_session)
+        first = row_counts(memory_session)
+        seed_all(memory_session)
+
+        assert row_counts(memory_session) == first
+        assert first["permissions"] == len(SEED_PERMISSIONS)
+        assert first["users_and_roles"] == 1
+
+    def test_admin_gets_permissions_created_outside_seeds(self, memory_session):
+        """Тест: роль admin получает и разрешения, созданные не сидами"""
+        seed_all(memory_session)
+        sync_policy(memory_session, {"permissions": [{"code": "export-audit", "name": "Export audit"}]})
+        assign_permissions_to_roles(memory_session)
+
+        admin = memory_session.query(Role).filter(Role.code == "admin").one()
+        codes = {grant.permission.code for grant in admin.role_permissions if grant.is_active}
+        assert "export-audit" in codes
+
+    def test_policy_uses_constant_queries(self, memory_session):
+        """Тест: сверка политики с БД - фиксированное число запросов, без SELECT на каждую запись"""
+        seed_all(memory_session)
+        with count_queries() as counter:
+            plan = sync_policy(memory_session, seed_policy(memory_session))
+
+        assert plan.is_empty
+        assert counter.total <= 5
+
+
+class TestSnapshot:
+    def test_run_all_seeds_is_one_transaction(self, memory_session, monkeypatch):
+        """Тест: ошибка сидов откатывает и политику, и возвращается вызывающему (снимок не снимается)"""
+        monkeypatch.setattr(seed_data, "SessionLocal", sessionmaker(bind=memory_session.get_bind()))
+        original_admin = seed_data.create_admin_user
+
+        def broken_admin(db, commit=True):
+            raise RuntimeError("сбой")
+
+        monkeypatch.setattr(seed_data, "create_admin_user", broken_admin)
+        assert run_all_seeds() is False
+        assert memory_session.query(Role).count() == 0
+
+        monkeypatch.setattr(seed_data, "create_admin_user", original_admin)
+        assert run_all_seeds() is True
+        assert memory_session.query(UserRole).count() == 1
+
+    def test_fingerprint_includes_admin_password(self, monkeypatch):
+        """Тест: смена пароля администратора делает снимок устаревшим"""
+        before = seed_fingerprint()
+        monkeypatch.setattr(seed_data, "ADMIN_PASSWORD", "Other123!")
+        assert seed_fingerprint() != before
+
+    def test_save_and_restore(self, tmp_path):
+        """Тест: восстановление из снимка возвращает БД к сохраненному состоянию"""
+        engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        db = Session()
+        seed_all(db)
+        expected = row_counts(db)
+        db.close()
+
+        snapshot = str(tmp_path / "snapshots" / "seed.db")
+        save_snapshot(snapshot, engine)
+
+        db = Session()
+        db.query(UserRole).delete()
+        db.query(User).delete()
+        db.commit()
+        db.close()
+
+        assert restore_snapshot(snapshot, engine)
+        db = Session()
+        assert row_counts(db) == expected
+        db.close()
+        assert not restore_snapshot(str(tmp_path / "missing.db"), engine)
+        engine.dispose()
+
+    def test_sqlite_only(self):
+        """Тест: снимки поддерживаются только для SQLite"""
+        bind = SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+        with pytest.raises(ValueError):
+            save_snapshot("unused.db", bind)
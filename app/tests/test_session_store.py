@@ -0,0 +1,224 @@
+import threading
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.auth.service import AuthService
+from app.auth.session_store import (
+    SqlSessionStore, MemorySessionStore, KvSessionStore, TimingWheel, create_session_store
+)
+from app.core.config import settings
+from app.models.user import User
+
+BACKENDS = ("sql", "memory", "kv")
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, memory_session, tmp_path):
+    if request.param == "sql":
+        yield SqlSessionStore(memory_session)
+        memory_session.commit()
+    elif request.param == "memory":
+        yield MemorySessionStore()
+    else:
+        kv = KvSessionStore(str(tmp_path / "sessions.db"))
+        yield kv
+        kv.close()
+
+
+def create_user(db, username="TestUser"):
+    user = User(username=username, email=f"{username.lower()}@example.com",
+                password_hash="hash", birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def row(user_id, token_hash, token_type="access", family_id="fam-1", ttl=timedelta(minutes=30)):
+    return {
+        "user_id": user_id,
+        "token_hash": token_hash,
+        "token_type": token_type,
+        "family_id": family_id,
+        "expires_at": datetime.utcnow() + ttl,
+    }
+
+
+class TestSessionStoreConformance:
+    """Общие требования ко всем реализациям SessionStore"""
+
+    def test_create_and_lookup(self, store, memory_session):
+        """Тест: созданная запись находится по хешу"""
+        user = create_user(memory_session)
+        store.create([row(user.id, "a1"), row(user.id, "r1", "refresh")])
+
+        record = store.lookup("r1")
+        assert record.user_id == user.id
+        assert record.token_type == "refresh"
+        assert record.family_id == "fam-1"
+        assert record.is_valid()
+        assert store.lookup("missing") is None
+
+    def test_revoke_is_compare_and_set(self, store, memory_session):
+        """Тест: отзыв срабатывает один раз, отозванная запись остается видимой"""
+        user = create_user(memory_session)
+        store.create([row(user.id, "a1")])
+        token_id = store.lookup("a1").id
+
+        assert store.revoke(token_id) is True
+        assert store.revoke(token_id) is False
+        assert not store.lookup("a1").is_active
+        assert store.revoke(10 ** 9) is False
+
+    def test_restore_undoes_revoke(self, store, memory_session):
+        """Тест: компенсация возвращает отозванный токен, активный не затрагивает"""
+        user = create_user(memory_session)
+        store.create([row(user.id, "a1")])
+        token_id = store.lookup("a1").id
+
+        assert store.restore(token_id) is False
+        store.revoke(token_id)
+        assert store.restore(token_id) is True
+        assert store.lookup("a1").is_valid()
+
+    def test_revoke_family_by_type(self, store, memory_session):
+        """Тест: отзыв семейства (целиком или одного типа) не затрагивает другие семейства"""
+        user = create_user(memory_session)
+        store.create([
+            row(user.id, "a1"), row(user.id, "r1", "refresh"),
+            row(user.id, "a2", family_id="fam-2"),
+        ])
+
+        assert store.revoke_family("fam-1", "refresh") == 1
+        assert store.lookup("a1").is_active
+        assert store.revoke_family("fam-1") == 1
+        assert store.lookup("a2").is_active
+
+    def test_revoke_all_and_list(self, store, memory_session):
+        """Тест: список содержит только действующие токены своего пользователя"""
+        user = create_user(memory_session)
+        other = create_user(memory_session, "Other")
+        store.create([
+            row(user.id, "a1"), row(user.id, "a2", family_id="fam-2"),
+            row(user.id, "old", ttl=timedelta(seconds=-1)),
+            row(other.id, "b1", family_id="fam-3"),
+        ])
+
+        assert [record.token_hash for record in store.list(user.id)] == ["a1", "a2"]
+        assert store.count_active(user.id) == 2
+
+        assert store.revoke_all(user.id) == 3
+        assert store.list(user.id) == []
+        assert store.count_active(other.id) == 1
+
+    def test_expire_removes_expired(self, store, memory_session):
+        """Тест: expire удаляет истекшие записи и оставляет действующие"""
+        user = create_user(memory_session)
+        store.create([row(user.id, "a1"), row(user.id, "r1", "refresh", ttl=timedelta(days=7))])
+
+        assert store.expire(datetime.utcnow() + timedelta(hours=1)) == 1
+        assert store.lookup("a1") is None
+        assert store.lookup("r1").is_valid()
+        assert store.expire(datetime.utcnow() + timedelta(days=8)) == 1
+        assert store.lookup("r1") is None
+
+
+class TestKvSessionStore:
+    def test_concurrent_reads_and_writes(self, tmp_path):
+        """Тест: потоки на общем соединении видят только свои строки результата"""
+        kv = KvSessionStore(str(tmp_path / "sessions.db"))
+        errors = []
+
+        def worker(user_id):
+            try:
+                for i in range(50):
+                    kv.create([row(user_id, f"{user_id}-{i}", family_id=f"fam-{user_id}")])
+                    assert kv.lookup(f"{user_id}-{i}").user_id == user_id
+                    assert {record.user_id for record in kv.list(user_id)} == {user_id}
+                    assert kv.count_active(user_id) == i + 1
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(user_id,)) for user_id in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        kv.close()
+
+        assert errors == []
+
+
+class TestTimingWheel:
+    def test_advance_returns_due_keys(self):
+        """Тест: ключи со сроком дальше одного оборота колеса не истекают раньше времени"""
+        wheel = TimingWheel(tick_seconds=1, slots=8)
+        now = datetime.utcnow()
+        wheel.add("soon", now + timedelta(seconds=2))
+        wheel.add("later", now + timedelta(seconds=10))
+
+        assert wheel.advance(now + timedelta(seconds=3)) == ["soon"]
+        assert wheel.advance(now + timedelta(seconds=9)) == []
+        assert wheel.advance(now + timedelta(seconds=11)) == ["later"]
+
+    def test_discard(self):
+        """Тест: удаленный ключ не возвращается при истечении"""
+        wheel = TimingWheel(tick_seconds=1, slots=8)
+        expires_at = datetime.utcnow() + timedelta(seconds=1)
+        wheel.add("key", expires_at)
+        wheel.discard("key", expires_at)
+        assert wheel.advance(expires_at + timedelta(seconds=1)) == []
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+class TestAuthFlowOnStore:
+    """Вход, проверка, ротация и выход через API для каждого хранилища"""
+
+    @pytest.fixture(autouse=True)
+    def session_store(self, backend, monkeypatch, tmp_path):
+        monkeypatch.setattr(settings, "SESSION_STORE", backend)
+        monkeypatch.setattr(settings, "SESSION_KV_PATH", str(tmp_path / "sessions.db"))
+
+    def test_factory(self, backend, memory_session):
+        """Тест: фабрика возвращает хранилище по настройке"""
+        store = create_session_store(memory_session)
+        assert type(store) is {"sql": SqlSessionStore, "memory": MemorySessionStore, "kv": KvSessionStore}[backend]
+
+    def test_login_refresh_logout(self, api_client, memory_session):
+        """Тест: полный цикл жизни токенов"""
+        user = create_user(memory_session)
+        tokens = AuthService(memory_session).create_tokens(user)
+        headers = {"Authorization": f"Bearer {tokens.access_token}"}
+
+        listed = api_client.get("/auth/tokens", headers=headers)
+        assert listed.status_code == 200
+        assert {token["token_type"] for token in listed.json()} == {"access", "refresh"}
+
+        refreshed = api_client.post("/auth/refresh", json={"refresh_token": tokens.refresh_token})
+        assert refreshed.status_code == 200
+        reused = api_client.post("/auth/refresh", json={"refresh_token": tokens.refresh_token})
+        assert reused.status_code == 401
+
+        # Повторное использование отозвало семейство вместе с access token
+        assert api_client.get("/auth/me", headers=headers).status_code == 401
+
+        fresh = AuthService(memory_session).create_tokens(user)
+        headers = {"Authorization": f"Bearer {fresh.access_token}"}
+        assert api_client.get("/auth/me", headers=headers).status_code == 200
+        assert api_client.post("/auth/logout", headers=headers).status_code == 200
+        assert api_client.get("/auth/me", headers=headers).status_code == 401
+
+    @pytest.mark.parametrize("token_mode", ("jwt", "opaque"))
+    def test_rejected_refresh_keeps_session(self, api_client, memory_session, monkeypatch, token_mode):
+        """Тест: отказ по лимиту токенов при обновлении не отзывает текущий refresh token"""
+        monkeypatch.setattr(settings, "TOKEN_MODE", token_mode)
+        user = create_user(memory_session)
+        tokens = AuthService(memory_session).create_tokens(user)
+
+        monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 1)
+        rejected = api_client.post("/auth/refresh", json={"refresh_token": tokens.refresh_token})
+        assert rejected.status_code == 401
+
+        monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 5)
+        refreshed = api_client.post("/auth/refresh", json={"refresh_token": tokens.refresh_token})
+        assert refreshed.status_code == 200
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+import app.core.query_counter  # noqa: F401 - регистрация событий движка
+from app.core.security import hash_token
+from app.core.slow_query import (
+    SlowQueryLog, fingerprint, normalize_statement, read_log, redact_parameters, slow_query_log, summarize
+)
+from app.models.user import Token
+
+
+@pytest.fixture
+def capture_all(monkeypatch, slow_query_log_path):
+    """Глобальный журнал, в который попадает каждый запрос (путь - из conftest)"""
+    monkeypatch.setattr(slow_query_log, "threshold", 1e-9)
+    return slow_query_log
+
+
+def entries(path):
+    return [json.loads(line) for line in read_log(path)]
+
+
+class TestFingerprint:
+    def test_normalize(self):
+        """Тест: литералы и длина списка IN не влияют на отпечаток"""
+        first = "SELECT * FROM tokens WHERE id IN (?, ?, ?) AND token_type = 'access' LIMIT 10"
+        second = "SELECT *  FROM tokens\nWHERE id IN (?, ?) AND token_type = 'refresh' LIMIT 5"
+        assert normalize_statement(first) == "SELECT * FROM tokens WHERE id IN (?...) AND token_type = ? LIMIT ?"
+        assert fingerprint(first) == fingerprint(second)
+
+    def test_redact_parameters(self):
+        """Тест: в журнал попадают только типы и длины"""
+        token_hash = hash_token("secret")
+        assert redact_parameters((token_hash, 5, None)) == ["str[64]", "int", "null"]
+        assert redact_parameters([(1, "a"), (2, "b")]) == {"rows": 2, "first": ["int", "str[1]"]}
+
+
+class TestSlowQueryLog:
+    def test_entry_with_plan(self, memory_session, capture_all):
+        """Тест: запись содержит план, длительность и не содержит значений параметров"""
+        token_hash = hash_token("secret")
+        memory_session.execute(select(Token).where(Token.token_hash == token_hash)).all()
+
+        logged = [entry for entry in entries(capture_all.path) if "FROM tokens" in entry["statement"]]
+        assert len(logged) == 1
+        entry = logged[0]
+        assert entry["duration_ms"] >= 0
+        assert entry["route"] is None
+        assert any("ix_tokens_token_hash" in step for step in entry["plan"])
+        assert token_hash not in open(capture_all.path, encoding="utf-8").read()
+
+    def test_route_and_summary(self, api_client, auth_user, capture_all):
+        """Тест: маршрут HTTP-запроса и сводка по отпечаткам"""
+        for _ in range(2):
+            api_client.get("/api/ref/policy/permission/")
+
+        routes = {entry["route"] for entry in entries(capture_all.path)}
+        assert "/api/ref/policy/permission/" in routes
+
+        summary = summarize(read_log(capture_all.path))
+        permissions = [item for item in summary if "FROM permissions" in item["statement"]]
+        assert permissions[0]["count"] == 2
+        assert permissions[0]["routes"] == ["/api/ref/policy/permission/"]
+        assert capture_all.summary[permissions[0]["fingerprint"]]["count"] == 2
+
+    def test_threshold_and_rotation(self, memory_session, tmp_path):
+        """Тест: быстрые запросы не пишутся, файл ротируется и читается целиком"""
+        log = SlowQueryLog(threshold_ms=0, path=str(tmp_path / "slow.log"))
+        assert not log.enabled
+
+        log = SlowQueryLog(threshold_ms=1, path=str(tmp_path / "slow.log"), max_bytes=300, backups=3,
+                           capture_plan=False)
+        assert log.observe(None, "SELECT 1", (), 0.0001, None, "sqlite") is None
+        for i in range(4):
+            log.observe(None, f"SELECT {i} FROM users", (), 0.5, "/auth/me", "sqlite")
+        log.close()
+
+        assert len(list(tmp_path.glob("slow.log.*"))) >= 1
+        summary = summarize(read_log(str(tmp_path / "slow.log")))
+        assert summary[0]["count"] == 4
+
+    def test_read_log_skips_foreign_files(self, tmp_path):
+        """Тест: файлы рядом с журналом без числового суффикса не читаются и не ломают разбор"""
+        path = tmp_path / "slow.log"
+        path.write_text("current\n", encoding="utf-8")
+        (tmp_path / "slow.log.2").write_text("oldest\n", encoding="utf-8")
+        (tmp_path / "slow.log.1").write_text("older\n", encoding="utf-8")
+        (tmp_path / "slow.log.bak").write_text("backup\n", encoding="utf-8")
+
+        assert list(read_log(str(path))) == ["oldest\n", "older\n", "current\n"]
@@ -0,0 +1,57 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import StaticPool
+
+from app.migrations.synthetic_data import DatasetConfig, load
+from app.models.user import Base, Token, User
+from app.models.role import UserRole
+import app.models.role  # noqa: F401
+
+CONFIG = DatasetConfig(users=300, roles=40, permissions=30, tokens=600, reference_date=date(2026, 1, 1))
+
+
+def fresh_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def snapshot(engine):
+    with engine.connect() as conn:
+        return {
+            "users": conn.execute(select(User.username, User.birthday).order_by(User.id)).all(),
+            "memberships": conn.execute(select(UserRole.user_id, UserRole.role_id).order_by(UserRole.id)).all(),
+            "tokens": conn.execute(select(Token.user_id, Token.token_hash, Token.expires_at).order_by(Token.id)).all(),
+        }
+
+
+class TestSyntheticData:
+    def test_reproducible_counts(self):
+        """Тест: одинаковый seed дает одинаковый набор, число строк соответствует конфигурации"""
+        first, second = fresh_engine(), fresh_engine()
+        counts = load(first, CONFIG, "hash", batch_size=100, commit_every=250)
+        load(second, CONFIG, "hash")
+
+        assert counts["users"] == 300 and counts["roles"] == 40
+        assert counts["permissions"] == 30 and counts["tokens"] == 600
+        assert counts["users_and_roles"] >= 300
+        assert snapshot(first) == snapshot(second)
+
+    def test_skewed_membership(self):
+        """Тест: членство в ролях скошено - самая популярная роль намного чаще медианной"""
+        engine = fresh_engine()
+        load(engine, CONFIG, "hash")
+        with engine.connect() as conn:
+            sizes = sorted(conn.execute(
+                select(func.count()).select_from(UserRole).group_by(UserRole.role_id)
+            ).scalars(), reverse=True)
+        assert sizes[0] > 5 * sizes[len(sizes) // 2]
+
+    def test_refuses_non_empty_tables(self):
+        """Тест: генератор не дописывает в заполненные таблицы"""
+        engine = fresh_engine()
+        load(engine, CONFIG, "hash")
+        with pytest.raises(ValueError):
+            load(engine, CONFIG, "hash")
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+from app.core.tracing import (
+    NOOP_SPAN, JsonLinesSink, parse_traceparent, span, traced, tracer
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+REGISTER_DATA = {
+    "username": "Tracinguser",
+    "email": "tracing@example.com",
+    "password": "Secret123",
+    "c_password": "Secret123",
+    "birthday": "2000-01-01",
+}
+
+
+@traced("test.add")
+def add(a, b):
+    return a + b
+
+
+@pytest.fixture
+def tracing(monkeypatch, tmp_path):
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(tracer, "sink", JsonLinesSink(str(tmp_path / "traces.jsonl")))
+    return tmp_path / "traces.jsonl"
+
+
+def read_spans(path):
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestTraceparent:
+    def test_parse(self):
+        """Тест: разбор traceparent, флаг sampled, отказ от некорректных значений"""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID, True)
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-00") == (TRACE_ID, PARENT_ID, False)
+        assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+        assert parse_traceparent("garbage") is None
+        assert parse_traceparent(None) is None
+
+    def test_noop_outside_trace(self):
+        """Тест: вне трассы span() возвращает пустой спан, traced() не меняет результат"""
+        assert span("anything") is NOOP_SPAN
+        assert add(2, 3) == 5
+
+
+class TestRequestTracing:
+    def test_login_spans_share_incoming_trace(self, api_client, tracing):
+        """Тест: спаны входа (AuthService, argon2, JWT, SQL) - потомки родителя из traceparent"""
+        assert api_client.post("/auth/register", json=REGISTER_DATA).status_code == 201
+        tracing.unlink()
+
+        response = api_client.post(
+            "/auth/login",
+            json={"username": REGISTER_DATA["username"], "password": REGISTER_DATA["password"]},
+            headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01"}
+        )
+        assert response.status_code == 200
+        assert response.headers["traceparent"].startswith(f"00-{TRACE_ID}-")
+
+        spans = read_spans(tracing)
+        by_id = {s["span_id"]: s for s in spans}
+        names = {s["name"] for s in spans}
+        assert {s["trace_id"] for s in spans} == {TRACE_ID}
+        assert {"POST /auth/login", "AuthService.authenticate_user", "AuthService.create_tokens",
+                "security.verify_password", "jwt.encode", "db.statement"} <= names
+
+        root = next(s for s in spans if s["name"] == "POST /auth/login")
+        assert root["parent_span_id"] == PARENT_ID
+        assert root["attributes"]["http.status_code"] == 200
+        for s in spans:
+            if s is not root:
+                assert s["parent_span_id"] in by_id
+        verify = next(s for s in spans if s["name"] == "security.verify_password")
+        assert by_id[verify["parent_span_id"]]["name"] == "AuthService.authenticate_user"
+        statement = next(s for s in spans if s["name"] == "db.statement")
+        assert statement["attributes"]["db.statement"].startswith(("SELECT", "INSERT", "UPDATE"))
+
+    def test_head_sampling(self, api_client, tracing, monkeypatch):
+        """Тест: решение родителя (sampled=0) соблюдается, без заголовка - доля TRACE_SAMPLE_RATE"""
+        response = api_client.get("/health", headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-00"})
+        assert "traceparent" not in response.headers
+        monkeypatch.setattr(tracer, "sample_rate", 0.0)
+        api_client.get("/health")
+        assert read_spans(tracing) == []
+
+        monkeypatch.setattr(tracer, "sample_rate", 1.0)
+        api_client.get("/health")
+        spans = read_spans(tracing)
+        assert [s["name"] for s in spans] == ["GET /health"]
+        assert spans[0]["parent_span_id"] is None
@@ -0,0 +1,120 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.auth.service import AuthService
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.core.unit_of_work import unit_of_work
+from app.models.role import Permission
+from app.models.user import User, Token
+
+PASSWORD = "Password123"
+
+
+class CommitCounter:
+    """Подсчет коммитов на уровне соединения"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_commit(self, conn):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "commit", self._on_commit)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "commit", self._on_commit)
+
+
+def create_user(db, password_hash="hash"):
+    user = User(username="TestUser", email="test@example.com",
+                password_hash=password_hash, birthday=date(2000, 1, 1))
+    db.add(user)
+    db.commit()
+    return user
+
+
+class TestUnitOfWork:
+    def test_nested_blocks_commit_once(self, memory_session):
+        """Тест: вложенные блоки присоединяются к внешней транзакции"""
+        with CommitCounter(memory_session.get_bind()) as commits:
+            with unit_of_work(memory_session):
+                memory_session.add(Permission(name="A", code="a", created_by=1))
+                with unit_of_work(memory_session):
+                    memory_session.add(Permission(name="B", code="b", created_by=1))
+                assert commits.count == 0
+
+        assert commits.count == 1
+        assert memory_session.query(Permission).count() == 2
+
+    def test_error_rolls_back_whole_operation(self, memory_session):
+        """Тест: исключение во вложенном блоке откатывает всю операцию"""
+        with pytest.raises(ValueError):
+            with unit_of_work(memory_session):
+                memory_session.add(Permission(name="A", code="a", created_by=1))
+                with unit_of_work(memory_session):
+                    raise ValueError("ошибка")
+
+        assert memory_session.query(Permission).count() == 0
+
+    def test_savepoint_rolls_back_only_inner_block(self, memory_session):
+        """Тест: откат точки сохранения не затрагивает внешнюю транзакцию"""
+        with unit_of_work(memory_session):
+            memory_session.add(Permission(name="A", code="a", created_by=1))
+            memory_session.flush()
+            try:
+                with unit_of_work(memory_session, savepoint=True):
+                    memory_session.add(Permission(name="B", code="b", created_by=1))
+                    memory_session.flush()
+                    raise ValueError("ошибка")
+            except ValueError:
+                pass
+
+        assert [p.code for p in memory_session.query(Permission)] == ["a"]
+
+
+class TestAuthFlows:
+    def test_refresh_single_commit(self, memory_session, monkeypatch):
+        """Тест: обновление токенов - одна транзакция"""
+        monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 10)
+        service = AuthService(memory_session)
+        tokens = service.create_tokens(create_user(memory_session))
+
+        with CommitCounter(memory_session.get_bind()) as commits:
+            new_tokens = service.refresh_tokens(tokens.refresh_token)
+
+        assert commits.count == 1
+        assert new_tokens.refresh_token != tokens.refresh_token
+        with pytest.raises(ValueError):
+            service.refresh_tokens(tokens.refresh_token)
+
+    def test_refresh_failure_keeps_refresh_token(self, memory_session, monkeypatch):
+        """Тест: при ошибке выдачи новой пары использованный токен не отзывается"""
+        service = AuthService(memory_session)
+        tokens = service.create_tokens(create_user(memory_session))
+
+        monkeypatch.setattr(settings, "MAX_ACTIVE_TOKENS", 1)
+        with pytest.raises(ValueError, match="Превышено"):
+            service.refresh_tokens(tokens.refresh_token)
+
+        active = memory_session.query(Token).filter(
+            Token.token_type == "refresh", Token.is_active == True
+        ).count()
+        assert active == 1
+
+    def test_change_password_single_commit(self, memory_session):
+        """Тест: смена пароля и отзыв токенов - одна транзакция"""
+        user = create_user(memory_session, get_password_hash(PASSWORD))
+        service = AuthService(memory_session)
+        service.create_tokens(user)
+
+        with CommitCounter(memory_session.get_bind()) as commits:
+            service.change_password(user, PASSWORD, "NewPassword456")
+
+        assert commits.count == 1
+        assert memory_session.query(Token).filter(Token.is_active == True).count() == 0
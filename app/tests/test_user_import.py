@@ -0,0 +1,112 @@
+import io
+import json
+from datetime import date
+
+from app.core.security import get_password_hash, verify_password
+from app.migrations.user_import import UserImporter, import_users, read_rows
+from app.models.user import User
+
+CSV_DATA = """username,email,password,birthday
+Alexander,alex@example.com,Password123,2000-01-01
+Benjamin,ben@example.com,Password123,1999-05-05
+ALEXANDER,other@example.com,Password123,2000-01-01
+Charlotte,BEN@example.com,Password123,2000-01-01
+short,short@example.com,Password123,2000-01-01
+Danielle,dani@example.com,weak,2000-01-01
+"""
+
+
+class TestUserImport:
+    def test_csv_import_with_dedupe_and_validation(self, memory_session):
+        """Тест импорта CSV: валидация, дедупликация без учета регистра"""
+        report = import_users(memory_session.get_bind(), io.StringIO(CSV_DATA), "csv", batch_size=2)
+
+        assert report.total == 6
+        assert report.imported == 2
+        assert report.duplicates == 2
+        assert report.invalid == 2
+        assert len(report.errors) == 4
+
+        user = memory_session.query(User).filter(User.username == "Alexander").one()
+        assert verify_password("Password123", user.password_hash)
+
+    def test_dedupe_against_existing_users(self, memory_session):
+        """Тест пропуска пользователей, уже существующих в БД"""
+        memory_session.add(User(username="Benjamin", email="b@example.com",
+                                password_hash="hash", birthday=date(2000, 1, 1)))
+        memory_session.commit()
+
+        report = import_users(memory_session.get_bind(), io.StringIO(CSV_DATA), "csv")
+
+        assert report.duplicates == 2
+        assert report.imported == 2
+        assert memory_session.query(User).count() == 3
+
+    def test_prehashed_ndjson_with_process_pool(self, memory_session):
+        """Тест NDJSON с готовыми хешами и хешированием в пуле процессов"""
+        prehashed = get_password_hash("Secret123")
+        lines = [
+            {"username": "Francesca", "email": "f@example.com", "birthday": "2000-01-01",
+             "password_hash": prehashed},
+            {"username": "Gabrielle", "email": "g@example.com", "birthday": "2000-01-01",
+             "password": "Password123"},
+        ]
+        stream = io.StringIO("\n".join(json.dumps(line) for line in lines))
+
+        report = import_users(memory_session.get_bind(), stream, "ndjson", workers=2)
+
+        assert report.imported == 2
+        users = {u.username: u for u in memory_session.query(User)}
+        assert users["Francesca"].password_hash == prehashed
+        assert verify_password("Password123", users["Gabrielle"].password_hash)
+
+    def test_malformed_ndjson_lines_are_invalid(self, memory_session):
+        """Тест: нечитаемая строка и JSON-массив учитываются как невалидные, импорт продолжается"""
+        valid = {"username": "Francesca", "email": "f@example.com", "birthday": "2000-01-01",
+                 "password": "Password123"}
+        other = dict(valid, username="Gabrielle", email="g@example.com")
+        stream = io.StringIO("\n".join([json.dumps(valid), '{"username": ', "[1, 2]", json.dumps(other)]))
+
+        report = import_users(memory_session.get_bind(), stream, "ndjson", batch_size=2)
+
+        assert report.total == 4
+        assert report.imported == 2
+        assert report.invalid == 2
+        assert [error.split(":")[0] for error in report.errors] == ["Строка 2", "Строка 3"]
+        assert memory_session.query(User).count() == 2
+
+    def test_row_fallback_on_batch_conflict(self, memory_session):
+        """Тест: конфликт одной строки пачки не отменяет остальные строки"""
+        importer = UserImporter(memory_session.get_bind())
+        rows = importer._validate(list(enumerate(read_rows(io.StringIO(CSV_DATA), "csv"), start=1))[:2])
+        # Пользователь появился после проверки дублей (параллельная регистрация)
+        memory_session.add(User(username="Benjamin", email="ben@example.com",
+                                password_hash="hash", birthday=date(2000, 1, 1)))
+        memory_session.commit()
+
+        importer._insert(rows, importer._hash(None, rows))
+
+        assert importer.report.imported == 1
+        assert importer.report.failed == 1
+        assert importer.report.errors[0].startswith("Строка 2:")
+        assert memory_session.query(User).filter(User.username == "Alexander").count() == 1
+
+    def test_import_endpoint(self, memory_session, api_client, auth_user):
+        """Тест эндпоинта импорта с проверкой разрешения"""
+        from app.migrations.policy_loader import sync_policy
+        from app.models.role import Role, UserRole
+
+        files = {"file": ("users.csv", CSV_DATA.encode(), "text/csv")}
+        assert api_client.post("/auth/import", files=files).status_code == 403
+
+        sync_policy(memory_session, {
+            "permissions": [{"code": "create-user", "name": "Create user"}],
+            "roles": [{"code": "admin", "name": "Администратор", "permissions": "*"}],
+        })
+        role = memory_session.query(Role).filter(Role.code == "admin").one()
+        memory_session.add(UserRole(user_id=auth_user.id, role_id=role.id, created_by=1))
+        memory_session.commit()
+
+        response = api_client.post("/auth/import?format=csv", files=files)
+        assert response.status_code == 200
+        assert response.json()["imported"] == 2
@@ -1,8 +1,15 @@
-from fastapi import FastAPI
-from app.core.database import create_tables
+import time
 
-# Создаем таблицы при запуске
-create_tables()
+from fastapi import FastAPI, Request, Response
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import engine, ensure_schema, pool_monitor
+from app.core.group_commit import start_group_writer, stop_group_writer
+from app.core.query_counter import count_queries, notify_request
+from app.core import metrics
+from app.core.profiling import PROFILE_HEADER, should_profile, start_profiler, profile_store
+from app.core.loop_watchdog import LoopWatchdogMiddleware, loop_watchdog
+from app.core.tracing import TRACEPARENT_HEADER, tracer
 
 app = FastAPI(
     title="Role-Based API", 
@@ -15,12 +22,106 @@ from app.auth.router import router as auth_router
 from app.routers.roles import router as roles_router
 from app.routers.permissions import router as permissions_router
 from app.routers.user_roles import router as user_roles_router
+from app.routers.export import router as export_router
+from app.routers.profiles import router as profiles_router
 
 # Регистрируем роутеры
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
 app.include_router(roles_router, tags=["roles"])
 app.include_router(permissions_router, tags=["permissions"])
 app.include_router(user_roles_router, tags=["user-roles"])
+app.include_router(export_router, tags=["export"])
+app.include_router(profiles_router, tags=["profiling"])
+
+# Добавляется первой, чтобы оказаться внутри остальных прослоек (маршрут блокирующей задачи)
+app.add_middleware(LoopWatchdogMiddleware)
+
+@app.middleware("http")
+async def count_db_queries(request: Request, call_next):
+    # Учет SQL-запросов и длительности запроса; в заголовках - только при QUERY_COUNT_HEADERS=true
+    started = time.perf_counter()
+    status_code = 500
+    with count_queries() as counter:
+        request.state.query_counter = counter
+        counter.scope = request.scope
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            route = metrics.route_template(request.scope)
+            metrics.http_request_duration.observe(
+                time.perf_counter() - started, request.method, route, str(status_code)
+            )
+            metrics.db_queries_per_request.observe(counter.total, route)
+            metrics.db_time_per_request.observe(counter.seconds, route)
+    notify_request(request.method, route, counter, settings.N_PLUS_ONE_THRESHOLD)
+    if settings.QUERY_COUNT_HEADERS:
+        response.headers["X-DB-Queries"] = str(counter.total)
+        response.headers["X-DB-Auth-Queries"] = str(counter.count("auth"))
+        response.headers["X-DB-Time-Ms"] = f"{counter.seconds * 1000:.2f}"
+        response.headers["X-DB-Max-Repeats"] = str(max(counter.statements.values(), default=0))
+    return response
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    # Профилирование по заголовку администратора или по выборке (PROFILING_ENABLED=true)
+    if not should_profile(request.headers.get(PROFILE_HEADER)):
+        return await call_next(request)
+    started = time.perf_counter()
+    profiler = start_profiler()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        stacks = profiler.stop()
+        await run_in_threadpool(
+            profile_store.save, metrics.route_template(request.scope), request.method,
+            status_code, time.perf_counter() - started, stacks
+        )
+
+@app.middleware("http")
+async def trace_request(request: Request, call_next):
+    # Корневой спан запроса (TRACING_ENABLED=true); спаны внутренних вызовов - его потомки
+    root = tracer.start_request(
+        request.headers.get(TRACEPARENT_HEADER), f"{request.method} {request.url.path}",
+        {"http.method": request.method}
+    )
+    if root is None:
+        return await call_next(request)
+    try:
+        with root:
+            try:
+                response = await call_next(request)
+            finally:
+                root.name = f"{request.method} {metrics.route_template(request.scope)}"
+            root.set("http.status_code", response.status_code)
+            response.headers[TRACEPARENT_HEADER] = root.traceparent
+    finally:
+        await run_in_threadpool(tracer.export, root)
+    return response
+
+@app.on_event("startup")
+def check_schema():
+    # Проверка ревизии схемы (один SELECT); миграции применяются только при расхождении
+    ensure_schema()
+    start_group_writer(engine)
+
+@app.on_event("startup")
+async def start_loop_watchdog():
+    # Пульс должен работать на цикле событий сервера, поэтому обработчик асинхронный
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+
+@app.on_event("shutdown")
+def drain_group_writer():
+    # Дозапись очереди группового коммита перед остановкой
+    stop_group_writer()
+
+@app.on_event("shutdown")
+async def stop_loop_watchdog():
+    await loop_watchdog.stop()
 
 @app.get("/")
 def read_root():
@@ -28,7 +129,12 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "message": "API is working correctly"}
+    return {"status": "healthy", "message": "API is working correctly", "db_pool": pool_monitor.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    # Метрики процесса в текстовом формате Prometheus
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/test")
 def test_endpoint():
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
 """
 Пересоздание БД и заполнение начальными данными
+
+После первого заполнения БД сохраняется снимок (.seed_snapshots/seed-<отпечаток>.db);
+следующие запуски восстанавливают БД из него копированием страниц SQLite
+за миллисекунды. Отпечаток зависит от ревизии схемы и данных сидов, поэтому
+после миграции или изменения сидов снимок создается заново.
+
+Запуск: python reset_and_seed.py [--rebuild] [--no-snapshot]
 """
 
+import argparse
 import os
 import sys
+import time
 
 def reset_database():
     """Пересоздание базы данных"""
@@ -23,14 +32,17 @@ def reset_database():
     create_tables()
     print("✅ Таблицы созданы")
 
-def run_seeds():
-    """Запуск сидов"""
+def run_seeds() -> bool:
+    """Запуск сидов (False при ошибке)"""
     print("\n🌱 ЗАПУСК НАЧАЛЬНЫХ ДАННЫХ")
     print("-" * 40)
     
     from app.migrations.seed_data import run_all_seeds
-    run_all_seeds()
+    if not run_all_seeds():
+        print("❌ Сиды завершились с ошибкой, снимок не сохраняется")
+        return False
     print("✅ Начальные данные загружены")
+    return True
 
 def verify_data():
     """Проверка данных"""
@@ -71,17 +83,47 @@ def verify_data():
     finally:
         db.close()
 
+def restore_from_snapshot(path: str) -> bool:
+    """Восстановление БД из снимка сидов (False, если снимка нет)"""
+    from app.migrations.seed_data import restore_snapshot
+
+    started = time.perf_counter()
+    if not restore_snapshot(path):
+        return False
+    print(f"⚡ БД восстановлена из снимка {path} за {(time.perf_counter() - started) * 1000:.0f} мс")
+    return True
+
+def save_seed_snapshot(path: str):
+    """Снимок заполненной БД для следующих запусков"""
+    from app.migrations.seed_data import save_snapshot
+
+    save_snapshot(path)
+    print(f"📸 Снимок сохранен: {path}")
+
 def main():
     """Основная функция"""
+    parser = argparse.ArgumentParser(description="Пересоздание БД и заполнение начальными данными")
+    parser.add_argument("--rebuild", action="store_true", help="Миграции и сиды заново, даже если есть снимок")
+    parser.add_argument("--no-snapshot", action="store_true", help="Не использовать и не сохранять снимок")
+    args = parser.parse_args()
+
     print("🚀 ПЕРЕСОЗДАНИЕ И НАСТРОЙКА БАЗЫ ДАННЫХ")
     print("=" * 50)
-    
-    # Пересоздаем БД
-    reset_database()
-    
-    # Запускаем сиды
-    run_seeds()
-    
+
+    from app.migrations.seed_data import snapshot_path
+    snapshot = snapshot_path()
+    restored = not (args.rebuild or args.no_snapshot) and restore_from_snapshot(snapshot)
+    if not restored:
+        # Пересоздаем БД
+        reset_database()
+
+        # Запускаем сиды; частично заполненную БД не сохраняем в снимок
+        if not run_seeds():
+            sys.exit(1)
+
+        if not args.no_snapshot:
+            save_seed_snapshot(snapshot)
+
     # Проверяем данные
     verify_data()
     